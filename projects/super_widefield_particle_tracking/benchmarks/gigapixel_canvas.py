@@ -0,0 +1,63 @@
+"""Peak memory of the canvas backends versus field size.
+
+Blits a growing square field of tiles (the bundled 25% overlap tiles, reused
+across the field) at their stage positions into an in-memory canvas and into
+a chunked on-disk canvas, builds the overview pyramid of the latter, and
+reports the peak resident memory of each run (measured in a fresh process).
+
+Run from the project folder:  python benchmarks/gigapixel_canvas.py
+"""
+import resource
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+from os.path import dirname, abspath, join
+
+import numpy as np
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from stitching import load_grid
+from stitching.canvas import allocate_canvas, blit
+
+IMAGE_DIR = join(dirname(dirname(abspath(__file__))), "Images", "full_field", "overlap_25percent")
+GRID_SIZES = (8, 16, 32, 64)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(n, backend, queue):
+    tiles = list(load_grid(IMAGE_DIR).values())
+    tile_shape = np.array(tiles[0].shape)
+    step = (tile_shape * 0.75).astype(int)
+    shape = tuple(step * (n - 1) + tile_shape)
+    base = peak_rss_mb()
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        canvas = allocate_canvas(shape, np.uint16, None if backend == "memory" else join(tmp, "field"))
+        for j in range(n):
+            for i in range(n):
+                blit(canvas, tiles[(i + j * n) % len(tiles)], (j * step[0], i * step[1]))
+        levels = len(canvas.build_pyramid()) - 1 if backend == "chunked" else 0
+        elapsed = time.perf_counter() - t0
+    queue.put((shape, elapsed, levels, peak_rss_mb() - base))
+
+
+def main():
+    ctx = get_context("spawn")
+    for n in GRID_SIZES:
+        for backend in ("memory", "chunked"):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=run, args=(n, backend, queue))
+            proc.start()
+            shape, elapsed, levels, rss = queue.get()
+            proc.join()
+            print("{:3d}x{:<3d} tiles  {:>13}  {:>7}: {:7.2f} s, {} pyramid levels, peak RSS +{:7.1f} MB".format(
+                n, n, "{}x{}".format(*shape), backend, elapsed, levels, rss))
+
+
+if __name__ == "__main__":
+    main()
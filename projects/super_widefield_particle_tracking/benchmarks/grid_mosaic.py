@@ -0,0 +1,49 @@
+"""Benchmark of the full-grid mosaicking pipeline.
+
+Mosaics the bundled ``overlap_25percent`` and ``overlap_50percent`` grids,
+scores them against ``full_field/full.tif`` and reports the time per tile on
+growing sub-grids to check that the cost stays linear in the tile count.
+
+Run from the project folder:  python benchmarks/grid_mosaic.py
+"""
+import os
+import sys
+import time
+from os.path import dirname, abspath, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from stitching import load_grid, read_tile
+from stitching.mosaic import mosaic_grid, nominal_positions, score_mosaic
+
+IMAGE_DIR = join(dirname(dirname(abspath(__file__))), "Images", "full_field")
+OVERLAPS = {"overlap_25percent": 0.25, "overlap_50percent": 0.5}
+
+
+def main():
+    reference = read_tile(join(IMAGE_DIR, "full_field", "full.tif"))
+    workers = os.cpu_count()
+
+    for name, overlap in OVERLAPS.items():
+        tiles = load_grid(join(IMAGE_DIR, name))
+        size = max(i for i, _ in tiles) + 1
+        tile_shape = next(iter(tiles.values())).shape
+        print("{}: {} tiles".format(name, len(tiles)))
+
+        for n in range(2, size + 1):
+            sub = {k: v for k, v in tiles.items() if k[0] < n and k[1] < n}
+            timings = []
+            for w in (None, workers):
+                t0 = time.perf_counter()
+                mosaic, positions = mosaic_grid(sub, overlap, workers=w)
+                timings.append(time.perf_counter() - t0)
+            print("  {}x{}: serial {:7.2f} ms/tile, {} threads {:7.2f} ms/tile".format(
+                n, n, 1e3 * timings[0] / len(sub), workers, 1e3 * timings[1] / len(sub)))
+
+        score = score_mosaic(mosaic, reference, positions, nominal_positions(tiles, tile_shape, overlap))
+        print("  vs full.tif: psnr {psnr:.2f} dB, ssim {ssim:.4f}, "
+              "max position error {max_position_error:.3f} px".format(**score))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark of the offset search used by ``stitched_img``.
+
+Stitches every row of the bundled ``overlap_25percent`` and
+``overlap_50percent`` tile grids with the original Python loop and the
+vectorized searches, checks that they agree on every ``final_offset`` and
+reports tiles/second.
+
+Run from the project folder:  python benchmarks/offset_search.py
+"""
+import sys
+import time
+from os.path import dirname, abspath, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from stitching import load_grid, grid_row, detect_keypoints, edge_keypoints, match_locations, find_offset
+
+IMAGE_DIR = join(dirname(dirname(abspath(__file__))), "Images", "full_field")
+OVERLAPS = ("overlap_25percent", "overlap_50percent")
+
+
+def pair_points(img0, img1, direction="H", denominate_faction=3, min_dist=5):
+    corner_list = [detect_keypoints(img, "DoG", min_dist) for img in (img0, img1)]
+    corner_list[0] = edge_keypoints(corner_list[0], direction, trailing=True)
+    corner_list[1] = edge_keypoints(corner_list[1], direction, trailing=False)
+    fraction = int(len(corner_list[1]) / denominate_faction) + 1
+    coords0 = corner_list[0][0:fraction]
+    pt = match_locations(img0, img0, coords0, corner_list[0][0:fraction], min_dist)
+    ref_pt = match_locations(img0, img1, coords0, corner_list[1][0:fraction], min_dist)
+    return ref_pt, pt
+
+
+def main():
+    for overlap in OVERLAPS:
+        tiles = load_grid(join(IMAGE_DIR, overlap))
+        rows = sorted({j for _, j in tiles})
+        pairs = []
+        for j in rows:
+            row = grid_row(tiles, j)
+            for img0, img1 in zip(row[:-1], row[1:]):
+                pairs.append((pair_points(img0, img1), img0.shape[1], img1.shape[1]))
+
+        print("{}: {} tile pairs".format(overlap, len(pairs)))
+        reference = None
+        for method in ("loop", "dense", "kdtree"):
+            t0 = time.perf_counter()
+            offsets = [find_offset(ref_pt, pt, width, bound, "H", method) for (ref_pt, pt), width, bound in pairs]
+            elapsed = time.perf_counter() - t0
+            if reference is None:
+                reference = offsets
+            assert offsets == reference, "{} disagrees with the loop".format(method)
+            print("  {:>6}: {:8.4f} s  {:10.1f} tiles/s".format(method, elapsed, len(pairs) / elapsed))
+        print("  final offsets: {}".format(sorted(set(reference))))
+
+
+if __name__ == "__main__":
+    main()
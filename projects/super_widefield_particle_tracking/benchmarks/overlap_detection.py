@@ -0,0 +1,92 @@
+"""Benchmark of overlap-only keypoint detection against whole-tile detection.
+
+Every neighbour pair of the bundled grids is registered with keypoints
+detected on the whole tiles (the notebook's scheme) and with keypoints
+detected in the overlap bands only. The shift found is compared with the grid
+step. A sweep over `min_dist` is then run with and without a `KeypointCache`:
+with the cache each tile band is filtered once for the whole sweep.
+Finally every row and column of 3+ tiles is stitched sequentially, each tile
+after the growing mosaic: the bands filtered on the mosaic must stay the width
+of one tile overlap.
+
+Run from the project folder:  python benchmarks/overlap_detection.py
+"""
+import sys
+import time
+from os.path import dirname, abspath, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from stitching import load_grid, grid_row, grid_column, pair_offset, stitch_at_offset, KeypointCache
+from stitching.features import DETECTORS, edge_band
+from stitching.mosaic import neighbour_pairs
+
+IMAGE_DIR = join(dirname(dirname(abspath(__file__))), "Images", "full_field")
+GRIDS = (("overlap_25percent", 0.25), ("overlap_50percent", 0.5))
+SWEEP = (3, 5, 7)
+
+
+def run(tiles, pairs, overlap, detector, min_dist=5, **kwargs):
+    # number of pairs registered at the grid step, and time
+    step = round(tiles[pairs[0][0]].shape[1] * (1 - overlap))
+    t0 = time.perf_counter()
+    correct = 0
+    for a, b, direction in pairs:
+        axis = 1 if direction == "H" else 0
+        offset = pair_offset(tiles[a], tiles[b], direction, detector, min_dist=min_dist, overlap=overlap,
+                             keys=(a, b), **kwargs)
+        correct += tiles[a].shape[axis] - offset == step
+    return correct, time.perf_counter() - t0
+
+
+def sequences(tiles):
+    # rows ("H") and columns ("V") of at least 3 tiles
+    rows = [(grid_row(tiles, j), "H") for j in sorted({k[1] for k in tiles})]
+    columns = [(grid_column(tiles, i), "V") for i in sorted({k[0] for k in tiles})]
+    return [(seq, direction) for seq, direction in rows + columns if len(seq) >= 3]
+
+
+def check_sequence(seq, direction, overlap, detector):
+    # stitch each tile after the mosaic, return the mosaic length and the widest band filtered
+    axis = 1 if direction == "H" else 0
+    cache = KeypointCache()
+    sti = seq[0]
+    for k, img in enumerate(seq[1:]):
+        offset = pair_offset(sti, img, direction, detector, overlap=overlap, overlap_only=True, cache=cache,
+                             keys=(("mosaic", k), ("tile", k)))
+        sti = stitch_at_offset(img, sti, offset, direction)
+    widest = max(stop - start for (_, _, band) in cache.keys() for start, stop in [band[axis]])
+    return sti.shape[axis], widest
+
+
+def main():
+    for name, overlap in GRIDS:
+        tiles = load_grid(join(IMAGE_DIR, name))
+        pairs = neighbour_pairs(tiles)
+        for detector in DETECTORS:
+            whole, t_whole = run(tiles, pairs, overlap, detector)
+            band, t_band = run(tiles, pairs, overlap, detector, overlap_only=True)
+            print("{} {} ({} pairs): whole tile {} correct {:.3f} s, overlap only {} correct {:.3f} s".format(
+                name, detector, len(pairs), whole, t_whole, band, t_band))
+
+            t_uncached = sum(run(tiles, pairs, overlap, detector, d, overlap_only=True)[1] for d in SWEEP)
+            cache = KeypointCache()
+            t_cached = sum(run(tiles, pairs, overlap, detector, d, overlap_only=True, cache=cache)[1]
+                           for d in SWEEP)
+            print("    min_dist sweep {}: {:.3f} s uncached, {:.3f} s cached ({} band responses)".format(
+                SWEEP, t_uncached, t_cached, len(cache)))
+
+            expected = 0
+            for seq, direction in sequences(tiles):
+                axis = 1 if direction == "H" else 0
+                length, widest = check_sequence(seq, direction, overlap, detector)
+                band = edge_band(seq[0].shape, direction, overlap=overlap)[axis]
+                assert widest <= band.stop - band.start, "band grew with the mosaic: {} px".format(widest)
+                step = round(seq[0].shape[axis] * (1 - overlap))
+                expected += length == seq[0].shape[axis] + (len(seq) - 1) * step
+            print("    sequences of 3+ tiles: {} of {} at the grid length, bands of one tile overlap".format(
+                expected, len(sequences(tiles))))
+
+
+if __name__ == "__main__":
+    main()
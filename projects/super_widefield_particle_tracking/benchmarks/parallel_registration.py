@@ -0,0 +1,46 @@
+"""Wall-clock speedup of the parallel pair registration versus core count.
+
+Registers every neighbour pair of the bundled grids with the process-pool
+scheduler for 1..N processes, with the DoG keypoint pipeline and with phase
+correlation, and checks the mosaic against the serial ``mosaic_grid``.
+
+Run from the project folder:  python benchmarks/parallel_registration.py
+"""
+import os
+import sys
+import time
+from os.path import dirname, abspath, join
+
+import numpy as np
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from stitching import load_grid
+from stitching.mosaic import mosaic_grid
+from stitching.scheduler import mosaic_grid_parallel
+
+IMAGE_DIR = join(dirname(dirname(abspath(__file__))), "Images", "full_field")
+OVERLAPS = {"overlap_25percent": 0.25, "overlap_50percent": 0.5}
+
+
+def main():
+    cores = os.cpu_count()
+    counts = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+    for name, overlap in OVERLAPS.items():
+        tiles = load_grid(join(IMAGE_DIR, name))
+        serial, _ = mosaic_grid(tiles, overlap)
+        print("{}: {} tiles, {} cores".format(name, len(tiles), cores))
+        for detector in ("DoG", "phase"):
+            base = None
+            for processes in counts:
+                t0 = time.perf_counter()
+                mosaic, _ = mosaic_grid_parallel(tiles, overlap, detector, processes)
+                elapsed = time.perf_counter() - t0
+                base = base or elapsed
+                if detector == "phase":
+                    assert np.array_equal(mosaic, serial), "parallel mosaic differs from mosaic_grid"
+                print("  {:>5} x{:<2}: {:7.3f} s  speedup {:4.2f}".format(detector, processes, elapsed, base / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Throughput and accuracy of the particle tracking stage.
+
+Renders a time series of synthetic fields (Gaussian particle images like
+those of ``full_field/full.tif``, with Brownian motion, background and
+noise), tracks them and reports particles/second, the localization error
+against the known positions and the fraction of correct frame-to-frame links.
+Also reports the localization throughput on the bundled ``full.tif``.
+
+Run from the project folder:  python benchmarks/particle_tracking.py
+"""
+import sys
+import time
+from os.path import dirname, abspath, join
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from stitching import read_tile
+from tracking import detect_particles, localize_particles, track_series
+
+IMAGE_DIR = join(dirname(dirname(abspath(__file__))), "Images", "full_field")
+
+FIELD = 1024
+PARTICLES = 2000
+FRAMES = 10
+SIGMA = 1.3        # particle image size of full.tif
+AMPLITUDE = 45000
+BACKGROUND = 5000
+NOISE = 300
+DIFFUSION = 1.0    # rms displacement per frame and axis, in pixels
+
+
+def render(positions, rng):
+    # sum of Gaussian spots, rendered on 9x9 patches around each particle
+    frame = np.full((FIELD, FIELD), BACKGROUND, dtype=np.float64)
+    offsets = np.arange(-4, 5)
+    centre = np.round(positions).astype(int)
+    rows = centre[:, 0, None, None] + offsets[None, :, None]
+    cols = centre[:, 1, None, None] + offsets[None, None, :]
+    spots = AMPLITUDE * np.exp(-((rows - positions[:, 0, None, None]) ** 2 +
+                                 (cols - positions[:, 1, None, None]) ** 2) / (2 * SIGMA ** 2))
+    np.add.at(frame, (rows, cols), spots)
+    frame += rng.normal(0, NOISE, frame.shape)
+    return np.clip(frame, 0, 65535).astype(np.uint16)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    truth = [rng.uniform(10, FIELD - 10, (PARTICLES, 2))]
+    for _ in range(FRAMES - 1):
+        truth.append(np.clip(truth[-1] + rng.normal(0, DIFFUSION, (PARTICLES, 2)), 10, FIELD - 10))
+    frames = [render(p, rng) for p in truth]
+
+    for method in ("gaussian", "centroid"):
+        tracks, stats = track_series(frames, max_displacement=4 * DIFFUSION, method=method)
+
+        # localization error and link accuracy against the rendered particles
+        errors, correct, links = [], 0, 0
+        owner = []
+        for t, true in enumerate(truth):
+            found = tracks[tracks[:, 0] == t]
+            dist, idx = cKDTree(true).query(found[:, 2:], distance_upper_bound=2)
+            errors.append(dist[np.isfinite(dist)])
+            owner.append(dict(zip(found[:, 1].astype(int), np.where(np.isfinite(dist), idx, -1))))
+            if t > 0:
+                for track_id, particle in owner[t].items():
+                    if track_id in owner[t - 1]:
+                        links += 1
+                        correct += particle >= 0 and owner[t - 1][track_id] == particle
+        errors = np.concatenate(errors)
+        print("{:>8}: {particles} particles in {frames} frames, {particles_per_second:,.0f} particles/s, "
+              "rms error {:.3f} px, {:.1%} correct links".format(method, np.sqrt(np.mean(errors ** 2)),
+                                                                   correct / max(links, 1), **stats))
+
+    full = read_tile(join(IMAGE_DIR, "full_field", "full.tif"))
+    t0 = time.perf_counter()
+    positions = localize_particles(full, detect_particles(full))
+    elapsed = time.perf_counter() - t0
+    print("full.tif: {} particles detected and localized, {:,.0f} particles/s".format(len(positions),
+                                                                                    len(positions) / elapsed))
+
+
+if __name__ == "__main__":
+    main()
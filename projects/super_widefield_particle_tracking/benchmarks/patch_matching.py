@@ -0,0 +1,57 @@
+"""Benchmark of the batched patch matcher against the original loop.
+
+For every horizontal and vertical neighbour pair of the bundled grids, DoG
+keypoints are matched with the original per-point ``match_locations`` and
+with the batched matcher; the matches must be identical (on the tiles cast to
+float, see the notes of ``match_locations``). Timings are reported for the
+notebook's edge fraction of keypoints and for all keypoints of the tiles.
+
+Run from the project folder:  python benchmarks/patch_matching.py
+"""
+import sys
+import time
+from os.path import dirname, abspath, join
+
+import numpy as np
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from stitching import load_grid, detect_keypoints, edge_keypoints
+from stitching.mosaic import neighbour_pairs
+from stitching.matching import match_locations, match_locations_filtered, _match_locations_loop
+
+IMAGE_DIR = join(dirname(dirname(abspath(__file__))), "Images", "full_field")
+OVERLAPS = ("overlap_25percent", "overlap_50percent")
+
+
+def timed(fn, jobs):
+    t0 = time.perf_counter()
+    out = [fn(*job) for job in jobs]
+    return out, time.perf_counter() - t0
+
+
+def main():
+    for name in OVERLAPS:
+        tiles = load_grid(join(IMAGE_DIR, name))
+        keypoints = {key: detect_keypoints(tile) for key, tile in tiles.items()}
+        for label, denominate_faction in (("edge 1/3", 3), ("all", 1)):
+            jobs = []
+            for a, b, direction in neighbour_pairs(tiles):
+                c0 = edge_keypoints(keypoints[a], direction, trailing=True)
+                c1 = edge_keypoints(keypoints[b], direction, trailing=False)
+                fraction = int(len(c1) / denominate_faction) + (denominate_faction > 1)
+                jobs.append((tiles[a].astype(np.float64), tiles[b].astype(np.float64),
+                             np.array(c0[:fraction]), np.array(c1[:fraction])))
+
+            loop, t_loop = timed(_match_locations_loop, jobs)
+            batched, t_batched = timed(match_locations, jobs)
+            _, t_filtered = timed(match_locations_filtered, jobs)
+            assert all(np.array_equal(x, y) for x, y in zip(loop, batched)), "matches differ"
+            points = sum(len(job[2]) for job in jobs)
+            print("{} ({}, {} pairs, {} points): loop {:.3f} s, batched {:.4f} s ({:.0f}x), "
+                  "batched + ratio/mutual filter {:.4f} s".format(name, label, len(jobs), points, t_loop,
+                                                                 t_batched, t_loop / t_batched, t_filtered))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Benchmark of the seam blending compositor.
+
+The bundled grids are composited at their true positions with a random gain
+per tile (uneven illumination / exposure between tiles), by hard cut, linear
+feather and multi-band blending. The seam step is the largest gradient of the
+smoothed ratio between the mosaic and ``full.tif``: intensity steps at tile
+borders show up there. Without gains every method must reproduce ``full.tif``
+exactly. The time per tile is reported for an in-memory canvas.
+
+Run from the project folder:  python benchmarks/seam_blending.py
+"""
+import sys
+import time
+from os.path import dirname, abspath, join
+
+import numpy as np
+from scipy import ndimage
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from stitching import load_grid, read_tile, composite
+from stitching.mosaic import nominal_positions
+
+IMAGE_DIR = join(dirname(dirname(abspath(__file__))), "Images", "full_field")
+GRIDS = (("overlap_25percent", 0.25), ("overlap_50percent", 0.5))
+METHODS = (None, "feather", "multiband")
+
+
+def seam_step(mosaic, reference):
+    ratio = ndimage.gaussian_filter(mosaic / np.maximum(reference, 1.0), 3)
+    return float(np.hypot(*np.gradient(ratio))[8:-8, 8:-8].max())
+
+
+def main():
+    reference = read_tile(join(IMAGE_DIR, "full_field", "full.tif")).astype(np.float64)
+    rng = np.random.default_rng(0)
+    for name, overlap in GRIDS:
+        tiles = load_grid(join(IMAGE_DIR, name))
+        positions = nominal_positions(sorted(tiles), tiles[(0, 0)].shape, overlap)
+        gains = {key: rng.uniform(0.8, 1.2) for key in tiles}
+        uneven = {key: np.clip(np.rint(tile * gains[key]), 0, 65535).astype(np.uint16) for key, tile in tiles.items()}
+        for blend in METHODS:
+            exact, _ = composite(tiles, positions, blend=blend)
+            t0 = time.perf_counter()
+            mosaic, _ = composite(uneven, positions, blend=blend)
+            elapsed = time.perf_counter() - t0
+            assert np.array_equal(exact, reference[:exact.shape[0], :exact.shape[1]]), "mosaic differs from full.tif"
+            print("{} {}: seam step {:.4f}, {:.1f} ms per tile".format(
+                name, blend or "hard cut", seam_step(mosaic, reference[:mosaic.shape[0], :mosaic.shape[1]]),
+                1e3 * elapsed / len(tiles)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Per-tile latency of the streaming stitcher.
+
+Feeds the bundled grids tile by tile in acquisition (raster) order to a
+``StreamingStitcher`` with an in-memory and a memory-mapped canvas, reports
+the per-tile latency and scores the field against ``full_field/full.tif``.
+
+Run from the project folder:  python benchmarks/streaming_stitch.py
+"""
+import sys
+import tempfile
+from os.path import dirname, abspath, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from stitching import load_grid, read_tile
+from stitching.mosaic import score_mosaic
+from stitching.streaming import StreamingStitcher
+
+IMAGE_DIR = join(dirname(dirname(abspath(__file__))), "Images", "full_field")
+OVERLAPS = {"overlap_25percent": 0.25, "overlap_50percent": 0.5}
+
+
+def main():
+    reference = read_tile(join(IMAGE_DIR, "full_field", "full.tif"))
+    for name, overlap in OVERLAPS.items():
+        tiles = load_grid(join(IMAGE_DIR, name))
+        grid_shape = tuple(max(k[n] for k in tiles) + 1 for n in (0, 1))
+        tile_shape = next(iter(tiles.values())).shape
+        for backend in ("memory", "memmap"):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = join(tmp, "canvas.npy") if backend == "memmap" else None
+                stitcher = StreamingStitcher(grid_shape, tile_shape, overlap, path=path)
+                for key in sorted(tiles, key=lambda k: (k[1], k[0])):
+                    stitcher.add(key, tiles[key])
+                report = stitcher.latency_report()
+                score = score_mosaic(stitcher.field(), reference)
+                del stitcher
+            print("{} ({}): {tiles} tiles, latency mean {:.2f} ms, p95 {:.2f} ms, max {:.2f} ms, "
+                  "psnr {:.2f} dB".format(name, backend, 1e3 * report["mean"], 1e3 * report["p95"],
+                                           1e3 * report["max"], score["psnr"], **report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""Stitching tools for super widefield particle tracking.
+
+The functions here are the packaged versions of the steps prototyped in
+``horizontal_stitch_example.ipynb``: keypoint detection, patch matching,
+offset search and compositing of overlapping tiles.
+"""
+from stitching.tiles import read_tile, load_grid, grid_row, grid_column
+from stitching.features import detect_keypoints, detect_edge_keypoints, edge_keypoints, KeypointCache
+from stitching.matching import match_locations
+from stitching.offsets import offset_costs, find_offset, stitched_img, stitch_at_offset
+from stitching.registration import register_pair, phase_correlation_offset
+from stitching.pipeline import pair_offset, stitch_pair, stitch_sequence
+from stitching.mosaic import mosaic_grid, pairwise_shifts, solve_positions, composite, score_mosaic
+from stitching.canvas import allocate_canvas, blit, ChunkedCanvas
+from stitching.blending import blend_tile, feather_alpha
+from stitching.streaming import StreamingStitcher, watch_directory
@@ -0,0 +1,212 @@
+"""Output canvases that tiles are written into in place.
+
+A canvas is allocated once for the whole field and is never re-copied: tiles
+are blitted into it as they are placed. Three backends are available:
+
+- in memory (``np.zeros``),
+- a memory-mapped ``.npy`` file or a memory-mapped (uncompressed, contiguous)
+  BigTIFF, readable by ImageJ/Fiji. The TIFF is not tiled: only contiguous
+  image data can be mapped as one writable array, which in-place blits need;
+  the chunked store below is the tiled layout,
+- a chunked directory store (`ChunkedCanvas`, laid out like a Zarr array:
+  one ``.npy`` file per chunk) for gigapixel fields. Only the chunks touched
+  by a write are mapped, and only for the duration of the write, so the
+  resident memory stays at a few chunks whatever the size of the field. It
+  can also build a downsampled overview pyramid for fast previews.
+"""
+import json
+import os
+import re
+import shutil
+from os.path import exists, isdir, join
+
+import numpy as np
+
+CANVAS_META = "canvas.json"
+# files of a store: chunks "row.col.npy" and pyramid levels "level<k>/"
+CHUNK_PATTERN = re.compile(r"\d+\.\d+\.npy$")
+LEVEL_PATTERN = re.compile(r"level\d+$")
+
+
+class ChunkedCanvas:
+    """2-D canvas stored as a directory of fixed-size chunks.
+
+    Supports numpy-style reads and writes with 2-D slices
+    (``canvas[r0:r1, c0:c1]``), so `blit` works on it unchanged. Chunks that
+    were never written read as zeros and take no disk space.
+
+    Parameters:
+    -----------
+    path : str
+        Directory of the store.
+    shape : (int, int), optional
+        Canvas shape of a new, zero-filled store: the chunks and pyramid
+        levels of a previous store in `path` are removed and its metadata
+        rewritten. ``None`` reopens the store in `path` from its metadata.
+    dtype : dtype
+        Pixel type.
+    chunks : (int, int)
+        Chunk shape.
+    """
+
+    ndim = 2
+
+    def __init__(self, path, shape=None, dtype=np.uint16, chunks=(1024, 1024)):
+        self.path = path
+        meta_path = join(path, CANVAS_META)
+        create = shape is not None
+        if not create:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            shape, dtype, chunks = meta["shape"], meta["dtype"], meta["chunks"]
+        self.shape = tuple(int(n) for n in shape)
+        self.dtype = np.dtype(dtype)
+        self.chunks = tuple(int(n) for n in chunks)
+        if create:
+            self._clear()
+            os.makedirs(path, exist_ok=True)
+            with open(meta_path, "w") as f:
+                json.dump({"shape": self.shape, "dtype": self.dtype.str, "chunks": self.chunks}, f)
+
+    def _clear(self):
+        # remove the chunks and pyramid levels of a previous store (other files are left alone)
+        if not isdir(self.path):
+            return
+        for name in os.listdir(self.path):
+            if CHUNK_PATTERN.match(name):
+                os.remove(join(self.path, name))
+            elif LEVEL_PATTERN.match(name) and isdir(join(self.path, name)):
+                shutil.rmtree(join(self.path, name))
+
+    def _chunk_path(self, cr, cc):
+        return join(self.path, "{}.{}.npy".format(cr, cc))
+
+    def _region(self, key):
+        if not (isinstance(key, tuple) and len(key) == 2 and all(isinstance(k, slice) for k in key)):
+            raise TypeError("ChunkedCanvas only supports 2-D slice indexing")
+        bounds = []
+        for k, n in zip(key, self.shape):
+            start, stop, step = k.indices(n)
+            if step != 1:
+                raise TypeError("ChunkedCanvas does not support strided slices")
+            bounds.append((start, max(start, stop)))
+        return bounds
+
+    def _overlapping_chunks(self, rows, cols):
+        # yields chunk index and the slices of the region and of the chunk
+        (r0, r1), (c0, c1) = rows, cols
+        ch, cw = self.chunks
+        for cr in range(r0 // ch, (r1 - 1) // ch + 1 if r1 > r0 else 0):
+            for cc in range(c0 // cw, (c1 - 1) // cw + 1 if c1 > c0 else 0):
+                a0, a1 = max(r0, cr * ch), min(r1, (cr + 1) * ch)
+                b0, b1 = max(c0, cc * cw), min(c1, (cc + 1) * cw)
+                yield ((cr, cc), (slice(a0 - r0, a1 - r0), slice(b0 - c0, b1 - c0)),
+                       (slice(a0 - cr * ch, a1 - cr * ch), slice(b0 - cc * cw, b1 - cc * cw)))
+
+    def __getitem__(self, key):
+        rows, cols = self._region(key)
+        out = np.zeros((rows[1] - rows[0], cols[1] - cols[0]), dtype=self.dtype)
+        for (cr, cc), region, inner in self._overlapping_chunks(rows, cols):
+            path = self._chunk_path(cr, cc)
+            if exists(path):
+                chunk = np.load(path, mmap_mode="r")
+                out[region] = chunk[inner]
+                del chunk
+        return out
+
+    def __setitem__(self, key, value):
+        rows, cols = self._region(key)
+        value = np.broadcast_to(np.asarray(value), (rows[1] - rows[0], cols[1] - cols[0]))
+        for (cr, cc), region, inner in self._overlapping_chunks(rows, cols):
+            path = self._chunk_path(cr, cc)
+            if exists(path):
+                chunk = np.load(path, mmap_mode="r+")
+            else:
+                chunk = np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype, shape=self.chunks)
+            chunk[inner] = value[region]
+            chunk.flush()
+            del chunk
+
+    def pyramid_level(self, level):
+        """Overview canvas downsampled by ``2**level`` (built by `build_pyramid`)."""
+        if level == 0:
+            return self
+        return ChunkedCanvas(join(self.path, "level{}".format(level)))
+
+    def build_pyramid(self, levels=None, min_size=256):
+        """Write 2x2-mean downsampled overviews, one level after the other.
+
+        Each output chunk is computed from the (at most four) source chunks it
+        covers, so memory use is bounded by a few chunks. Every level is
+        written into a fresh store, so a rebuild after a region was cleared
+        leaves no stale overview; all-zero chunks are not stored.
+
+        Parameters:
+        -----------
+        levels : int, optional
+            Number of levels above the full resolution; by default halve until
+            the largest side is below `min_size`.
+
+        Returns:
+        --------
+        pyramid : list of ChunkedCanvas
+            Full resolution first.
+        """
+        if levels is None:
+            levels = max(0, int(np.ceil(np.log2(max(self.shape) / min_size))))
+        pyramid = [self]
+        for level in range(1, levels + 1):
+            src = pyramid[-1]
+            shape = ((src.shape[0] + 1) // 2, (src.shape[1] + 1) // 2)
+            dst = ChunkedCanvas(join(self.path, "level{}".format(level)), shape, self.dtype, self.chunks)
+            ch, cw = self.chunks
+            for r0 in range(0, shape[0], ch):
+                for c0 in range(0, shape[1], cw):
+                    block = src[2 * r0:2 * (r0 + ch), 2 * c0:2 * (c0 + cw)]
+                    h, w = (block.shape[0] + 1) // 2, (block.shape[1] + 1) // 2
+                    if block.shape != (2 * h, 2 * w):
+                        block = np.pad(block, ((0, 2 * h - block.shape[0]), (0, 2 * w - block.shape[1])), mode="edge")
+                    # 2x2 mean of the four strided views, accumulated in place
+                    total = block[0::2, 0::2].astype(np.float64)
+                    total += block[1::2, 0::2]
+                    total += block[0::2, 1::2]
+                    total += block[1::2, 1::2]
+                    if np.any(total):
+                        total *= 0.25
+                        dst[r0:r0 + h, c0:c0 + w] = np.round(total).astype(self.dtype)
+            pyramid.append(dst)
+        return pyramid
+
+
+def allocate_canvas(shape, dtype=np.uint16, path=None, chunks=(1024, 1024)):
+    """Zero-filled canvas of `shape`.
+
+    A directory store already in `path` is started afresh (see
+    `ChunkedCanvas`); open it with ``ChunkedCanvas(path)`` to keep it.
+
+    Parameters:
+    -----------
+    path : str, optional
+        ``None`` keeps the canvas in memory; a ``.npy`` path memory-maps a numpy
+        file, a ``.tif``/``.tiff`` path memory-maps a BigTIFF, any other path is
+        used as the directory of a `ChunkedCanvas`.
+    chunks : (int, int)
+        Chunk shape of a `ChunkedCanvas`.
+    """
+    if path is None:
+        return np.zeros(shape, dtype=dtype)
+    if path.endswith(".npy"):
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=tuple(shape))
+    if path.endswith((".tif", ".tiff")):
+        import tifffile
+        return tifffile.memmap(path, shape=tuple(shape), dtype=dtype, bigtiff=True)
+    return ChunkedCanvas(path, shape, dtype, chunks)
+
+
+def blit(canvas, tile, corner):
+    """Paste `tile` with its origin at `corner` (row, col), clipped to the canvas."""
+    r0, c0 = max(corner[0], 0), max(corner[1], 0)
+    r1 = min(corner[0] + tile.shape[0], canvas.shape[0])
+    c1 = min(corner[1] + tile.shape[1], canvas.shape[1])
+    if r1 > r0 and c1 > c0:
+        canvas[r0:r1, c0:c1] = tile[r0 - corner[0]:r1 - corner[0], c0 - corner[1]:c1 - corner[1]]
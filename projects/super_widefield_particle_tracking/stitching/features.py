@@ -0,0 +1,164 @@
+"""Keypoint detection used to find the overlap between tiles.
+
+Only keypoints near the shared edge are used to stitch a pair, so detection
+can be restricted to the band of expected overlap (`detect_edge_keypoints`).
+The detector response is computed on the band plus a margin covering the
+filter support, so the response inside the band is the same as on the whole
+tile. The peaks can differ from whole-tile detection though: the relative
+threshold applies to the band's maximum unless the tile's is given, and peaks
+within `min_dist` of the inner edge of the band are dropped. A `KeypointCache`
+keeps the responses, so a tile band used by several pairs or runs (H and V
+passes, parameter sweeps) is filtered once.
+"""
+import numpy as np
+from skimage import feature
+from skimage.filters import difference_of_gaussians
+
+from stitching.registration import BAND_MARGIN
+
+DETECTORS = ("harris", "hessian", "DoG")
+# "phase" (phase correlation, see registration.py) is accepted by the pipeline only
+
+# half width (pixels) of the filters behind each detector response: Gaussian
+# windows are truncated at 4 sigma (sigma 1 for Harris/Hessian, 2.6 for DoG)
+FILTER_SUPPORT = {"harris": 5, "hessian": 5, "DoG": 11}
+
+
+def detector_response(img, detector="DoG"):
+    """Corner/blob response map of one of the notebook's detectors."""
+    if detector == "harris":
+        return feature.corner_harris(img)
+    if detector == "hessian":
+        return feature.hessian_matrix_det(img)
+    if detector == "DoG":
+        return difference_of_gaussians(image=img, low_sigma=2, high_sigma=2.6)
+    raise ValueError("[error] detector setting wrong: {}".format(detector))
+
+
+def response_peaks(response, detector="DoG", min_dist=5, reference=None):
+    """Keypoints of a detector response, with the notebook's thresholds.
+
+    The threshold is relative to `reference`, the maximum of the response the
+    peaks are taken from by default.
+    """
+    threshold_rel = {"harris": 0.001, "hessian": 0.2, "DoG": 0.6}[detector]
+    if reference is None:
+        return feature.corner_peaks(response, threshold_rel=threshold_rel, min_distance=min_dist)
+    return feature.corner_peaks(response, threshold_abs=threshold_rel * reference, threshold_rel=0,
+                                min_distance=min_dist)
+
+
+def detect_keypoints(img, detector="DoG", min_dist=5):
+    """Detect corner-like keypoints with one of the notebook's detectors.
+
+    Parameters:
+    -----------
+    img : 2D array
+        Input tile.
+    detector : str
+        One of ``"harris"``, ``"hessian"`` or ``"DoG"``.
+    min_dist : int
+        Minimum distance between peaks.
+
+    Returns:
+    --------
+    coords : (k, 2) array
+        (row, col) keypoint locations.
+    """
+    return response_peaks(detector_response(img, detector), detector, min_dist)
+
+
+def edge_band(shape, direction="H", trailing=True, overlap=0.25, margin=BAND_MARGIN, extent=None):
+    """Slices of the band along the edge shared with a neighbour.
+
+    The band is ``round(overlap * extent) + margin`` wide, along the right
+    ("H") or bottom ("V") edge of the `trailing` image, the left or top edge
+    otherwise. `extent` is the size of the incoming tile along `direction`
+    (default: the image's own), so that the band of a growing mosaic stays
+    the width of one tile overlap.
+    """
+    axis = 1 if direction == "H" else 0
+    extent = shape[axis] if extent is None else extent
+    width = min(shape[axis], int(round(overlap * extent)) + margin)
+    band = [slice(0, shape[0]), slice(0, shape[1])]
+    band[axis] = slice(shape[axis] - width, shape[axis]) if trailing else slice(0, width)
+    return tuple(band)
+
+
+class KeypointCache:
+    """Detector responses of tile bands, keyed by tile and band.
+
+    Responses are kept rather than peaks, so changing the peak parameters
+    (e.g. `min_dist`) does not filter the tile again.
+    """
+
+    def __init__(self):
+        self._responses = {}
+
+    def response(self, key, img, detector, band):
+        """Response on `band` (plus filter support) and the origin of the region."""
+        cache_key = (key, detector, tuple((s.start, s.stop) for s in band))
+        if key is None or cache_key not in self._responses:
+            support = FILTER_SUPPORT[detector]
+            region = tuple(slice(max(s.start - support, 0), min(s.stop + support, n)) for s, n in zip(band, img.shape))
+            origin = np.array([region[0].start, region[1].start])
+            result = (detector_response(img[region], detector), origin)
+            if key is None:
+                return result
+            self._responses[cache_key] = result
+        return self._responses[cache_key]
+
+    def keys(self):
+        """``(key, detector, ((row start, stop), (col start, stop)))`` of the cached band responses."""
+        return list(self._responses)
+
+    def __len__(self):
+        return len(self._responses)
+
+    def clear(self):
+        self._responses.clear()
+
+
+def detect_edge_keypoints(img, detector="DoG", direction="H", trailing=True, overlap=0.25, min_dist=5, cache=None,
+                          key=None, extent=None, tile_max=None):
+    """Keypoints in the band of expected overlap only.
+
+    Parameters:
+    -----------
+    img : 2D array
+        Input tile.
+    detector : str
+        One of ``"harris"``, ``"hessian"`` or ``"DoG"``.
+    direction, trailing, overlap, extent : see `edge_band`.
+    min_dist : int
+        Minimum distance between peaks.
+    cache : KeypointCache, optional
+        Cache of detector responses.
+    key : hashable, optional
+        Identifier of the tile in `cache` (e.g. its grid index).
+    tile_max : float, optional
+        Maximum of the detector response on the whole tile. The relative
+        threshold then matches whole-tile detection; by default it applies to
+        the band's maximum, which can keep more peaks.
+
+    Returns:
+    --------
+    coords : (k, 2) array
+        (row, col) keypoint locations in tile coordinates.
+    """
+    band = edge_band(img.shape, direction, trailing, overlap, extent=extent)
+    response, origin = (KeypointCache() if cache is None else cache).response(key, img, detector, band)
+    coords = response_peaks(response, detector, min_dist, tile_max) + origin
+    inside = ((coords[:, 0] >= band[0].start) & (coords[:, 0] < band[0].stop) &
+              (coords[:, 1] >= band[1].start) & (coords[:, 1] < band[1].stop))
+    return coords[inside]
+
+
+def edge_keypoints(coords, stitch_dir, trailing):
+    """Sort keypoints so those closest to the shared edge come first.
+
+    The trailing image of a pair (the one on the left/top) is sorted from its
+    right/bottom edge, the leading one from its left/top edge.
+    """
+    axis = 1 if stitch_dir == "H" else 0
+    return sorted(coords, key=lambda s: s[axis], reverse=trailing)
@@ -0,0 +1,166 @@
+# ref: https://scikit-image.org/docs/dev/auto_examples/registration/plot_stitching.html
+"""Patch matching between keypoints of two tiles.
+
+All patches are gathered once into contiguous ``(n, (2r+1)**2)`` arrays and
+the Gaussian-weighted SSD between every reference and candidate patch is
+computed with one expanded matrix product:
+
+    SSD_ij = sum_k w_k p_ik**2 + sum_k w_k q_jk**2 - 2 sum_k (w_k p_ik) q_jk
+"""
+import numpy as np
+
+
+def gaussian_weights(radius=5, sigma=3):
+    """Gaussian weights of a ``(2 * radius + 1)`` square patch."""
+    y, x = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    weights = np.exp(-0.5 * (x ** 2 + y ** 2) / sigma ** 2)
+    weights /= 2 * np.pi * sigma * sigma
+    return weights
+
+
+def extract_patches(img, coords, radius=5):
+    """Gather the patches centred on `coords` in a single indexing operation.
+
+    Parameters:
+    -----------
+    img : 2D array
+        Input image.
+    coords : (n, 2) array_like
+        (row, col) patch centres. Patches reaching outside the image are
+        completed with the nearest edge pixels.
+    radius : int
+        Radius of the patches.
+
+    Returns:
+    --------
+    patches : (n, 2 * radius + 1, 2 * radius + 1) float64 array
+    """
+    coords = np.asarray(coords, dtype=np.intp).reshape(-1, 2)
+    offsets = np.arange(-radius, radius + 1)
+    rows = np.clip(coords[:, 0, None, None] + offsets[None, :, None], 0, img.shape[0] - 1)
+    cols = np.clip(coords[:, 1, None, None] + offsets[None, None, :], 0, img.shape[1] - 1)
+    return img[rows, cols].astype(np.float64)
+
+
+def weighted_ssd(patches0, patches1, weights, chunk_size=None):
+    """Gaussian-weighted SSD between every pair of patches.
+
+    Parameters:
+    -----------
+    patches0 : (m, h, w) array
+        Reference patches.
+    patches1 : (n, h, w) array
+        Candidate patches.
+    weights : (h, w) array
+        Patch weights.
+    chunk_size : int, optional
+        Number of reference patches processed at once, to bound the memory of
+        the ``(chunk_size, n)`` block; all at once by default.
+
+    Returns:
+    --------
+    ssd : (m, n) float64 array
+    """
+    w = weights.ravel()
+    p0 = patches0.reshape(len(patches0), w.size)
+    p1 = patches1.reshape(len(patches1), w.size)
+    energy1 = (p1 * p1) @ w
+    chunk_size = chunk_size or max(len(p0), 1)
+
+    ssd = np.empty((len(p0), len(p1)), dtype=np.float64)
+    for start in range(0, len(p0), chunk_size):
+        block = p0[start:start + chunk_size]
+        weighted = block * w
+        ssd[start:start + chunk_size] = (weighted * block).sum(axis=1)[:, None] + energy1[None, :] \
+            - 2 * (weighted @ p1.T)
+    # the expansion can go slightly negative by rounding for identical patches
+    return np.maximum(ssd, 0, out=ssd)
+
+
+def match_locations(img0, img1, coords0, coords1, radius=5, sigma=3, chunk_size=None):
+    """Match image locations using SSD minimization.
+
+    Areas from `img0` are matched with areas from `img1`. These areas
+    are defined as patches located around pixels with Gaussian
+    weights.
+
+    Parameters:
+    -----------
+    img0, img1 : 2D array
+        Input images.
+    coords0 : (2, m) array_like
+        Centers of the reference patches in `img0`.
+    coords1 : (2, n) array_like
+        Centers of the candidate patches in `img1`.
+    radius : int
+        Radius of the considered patches.
+    sigma : float
+        Standard deviation of the Gaussian kernel centered over the patches.
+    chunk_size : int, optional
+        Bound on the reference patches compared at once, see `weighted_ssd`.
+
+    Returns:
+    --------
+    match_coords: (2, m) array
+        The points in `coords1` that are the closest corresponding matches to
+        those in `coords0` as determined by the (Gaussian weighted) sum of
+        squared differences between patches surrounding each point.
+
+    Notes:
+    ------
+    Patches are compared in floating point. The notebook version subtracted
+    the raw patches, which wraps around for unsigned (e.g. 16-bit) tiles; on
+    floating point images both give the same matches.
+    """
+    coords1 = np.asarray(coords1).reshape(-1, 2)
+    ssd = weighted_ssd(extract_patches(img0, coords0, radius), extract_patches(img1, coords1, radius),
+                       gaussian_weights(radius, sigma), chunk_size)
+    return coords1[np.argmin(ssd, axis=1)] if ssd.size else np.empty((ssd.shape[0], 2), dtype=coords1.dtype)
+
+
+def match_locations_filtered(img0, img1, coords0, coords1, radius=5, sigma=3, ratio=0.8, mutual=True,
+                             chunk_size=None):
+    """Matches that pass a ratio test and/or a mutual-best check.
+
+    Parameters:
+    -----------
+    ratio : float or None
+        Keep a match only if its SSD is below `ratio` times the SSD of the
+        second best candidate (Lowe's ratio test on squared distances).
+    mutual : bool
+        Keep a match only if the reference point is also the best match of
+        its candidate.
+
+    Returns:
+    --------
+    idx0, idx1 : (k,) int arrays
+        Indices into `coords0` and `coords1` of the kept matches.
+    """
+    ssd = weighted_ssd(extract_patches(img0, coords0, radius), extract_patches(img1, coords1, radius),
+                       gaussian_weights(radius, sigma), chunk_size)
+    if ssd.size == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    idx0 = np.arange(ssd.shape[0])
+    idx1 = np.argmin(ssd, axis=1)
+    keep = np.ones(len(idx0), dtype=bool)
+    if ratio is not None and ssd.shape[1] > 1:
+        two_best = np.partition(ssd, 1, axis=1)[:, :2]
+        keep &= two_best[:, 0] < ratio * two_best[:, 1]
+    if mutual:
+        keep &= np.argmin(ssd, axis=0)[idx1] == idx0
+    return idx0[keep], idx1[keep]
+
+
+def _match_locations_loop(img0, img1, coords0, coords1, radius=5, sigma=3):
+    # original per-point implementation from the notebook, kept as a reference
+    weights = gaussian_weights(radius, sigma)
+
+    match_list = []
+    for r0, c0 in coords0:
+        roi0 = img0[r0 - radius:r0 + radius + 1, c0 - radius:c0 + radius + 1]
+        roi1_list = [img1[r1 - radius:r1 + radius + 1, c1 - radius:c1 + radius + 1] for r1, c1 in coords1]
+        # sum of squared differences
+        ssd_list = [np.sum(weights * (roi0 - roi1) ** 2) for roi1 in roi1_list]
+        match_list.append(coords1[np.argmin(ssd_list)])
+
+    return np.array(match_list)
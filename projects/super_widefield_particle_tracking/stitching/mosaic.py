@@ -0,0 +1,222 @@
+"""Mosaicking of a full 2-D grid of tiles.
+
+Instead of merging tiles one after another (which accumulates the error of
+every pairwise offset), all neighbour shifts are measured first, then a single
+weighted least-squares problem places every tile at once:
+
+    minimize  sum_ab  w_ab * || p_b - p_a - t_ab ||^2
+
+where ``t_ab`` is the measured translation from tile ``a`` to its right or
+lower neighbour ``b`` and ``w_ab`` the phase-correlation peak. The normal
+matrix is the (sparse) weighted Laplacian of the grid graph, so the solve
+scales linearly with the number of tiles.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import splu
+from skimage import metrics
+
+from stitching.blending import blend_tile
+from stitching.registration import register_pair
+
+
+def neighbour_pairs(keys):
+    """Right ("H") and lower ("V") neighbour pairs of a set of ``(i, j)`` keys."""
+    keys = set(keys)
+    pairs = []
+    for i, j in sorted(keys):
+        if (i + 1, j) in keys:
+            pairs.append(((i, j), (i + 1, j), "H"))
+        if (i, j + 1) in keys:
+            pairs.append(((i, j), (i, j + 1), "V"))
+    return pairs
+
+
+def nominal_positions(keys, tile_shape, overlap=0.25):
+    """(row, col) positions of the tiles if the stage moved exactly as planned."""
+    step = np.round(np.array(tile_shape) * (1 - overlap))
+    return {(i, j): np.array([j * step[0], i * step[1]]) for i, j in keys}
+
+
+def _register(args):
+    tiles, (a, b, direction), overlap = args
+    return register_pair(tiles[a], tiles[b], direction, overlap)
+
+
+def pairwise_shifts(tiles, overlap=0.25, workers=None):
+    """Measure the translation of every neighbour pair.
+
+    Parameters:
+    -----------
+    tiles : dict
+        ``(i, j)`` -> tile, as returned by ``load_grid``.
+    overlap : float
+        Expected overlap fraction between neighbours.
+    workers : int or None
+        Number of threads used to register pairs concurrently (the FFTs
+        release the GIL). ``None`` or 1 registers serially.
+
+    Returns:
+    --------
+    pairs : list
+        ``(a, b, direction)`` for each neighbour pair.
+    shifts : (n_pairs, 2) array
+        Translation of ``b`` relative to ``a``.
+    peaks : (n_pairs,) array
+        Correlation peak height of each pair.
+    """
+    pairs = neighbour_pairs(tiles)
+    jobs = [(tiles, pair, overlap) for pair in pairs]
+    if workers is None or workers <= 1:
+        results = [_register(job) for job in jobs]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_register, jobs))
+
+    shifts = np.array([shift for shift, _ in results], dtype=np.float64).reshape(-1, 2)
+    peaks = np.array([peak for _, peak in results], dtype=np.float64)
+    return pairs, shifts, peaks
+
+
+def solve_positions(keys, pairs, shifts, weights=None, anchor=None):
+    """Global weighted least-squares layout of the tiles.
+
+    Parameters:
+    -----------
+    keys : iterable
+        Tile keys.
+    pairs : list
+        ``(a, b, direction)`` neighbour pairs.
+    shifts : (n_pairs, 2) array
+        Measured translation of ``b`` relative to ``a``.
+    weights : (n_pairs,) array, optional
+        Confidence of each shift (defaults to 1).
+    anchor : key, optional
+        Tile fixed at (0, 0); defaults to the first key.
+
+    Returns:
+    --------
+    positions : dict
+        Key -> (row, col) float position of the tile origin.
+    """
+    keys = sorted(keys)
+    anchor = keys[0] if anchor is None else anchor
+    index = {key: n for n, key in enumerate(k for k in keys if k != anchor)}
+    if weights is None:
+        weights = np.ones(len(pairs))
+    weights = np.maximum(np.asarray(weights, dtype=np.float64), 1e-6)
+
+    # incidence matrix of the pair graph, with the anchor column dropped
+    rows, cols, vals = [], [], []
+    for e, (a, b, _) in enumerate(pairs):
+        for key, sign in ((a, -1.0), (b, 1.0)):
+            if key != anchor:
+                rows.append(e)
+                cols.append(index[key])
+                vals.append(sign)
+    incidence = sparse.csr_matrix((vals, (rows, cols)), shape=(len(pairs), len(index)))
+
+    positions = {anchor: np.zeros(2)}
+    if len(index) == 0:
+        return positions
+    normal = (incidence.T @ sparse.diags(weights) @ incidence).tocsc()
+    rhs = incidence.T @ (weights[:, None] * np.asarray(shifts, dtype=np.float64))
+    solution = splu(normal).solve(rhs)
+    for key, n in index.items():
+        positions[key] = solution[n]
+    return positions
+
+
+def composite(tiles, positions, out=None, blend=None, levels=4):
+    """Paste every tile at its (rounded) position into one canvas.
+
+    Parameters:
+    -----------
+    tiles : dict
+        Key -> tile.
+    positions : dict
+        Key -> (row, col) position, as returned by `solve_positions`.
+    out : 2D array, optional
+        Preallocated canvas; allocated to fit all tiles if not given.
+    blend : str, optional
+        ``"feather"`` or ``"multiband"`` to blend the overlaps (see
+        ``blending.blend_tile``); by default each tile overwrites the previous
+        ones.
+    levels : int
+        Levels of the multi-band blend.
+
+    Returns:
+    --------
+    mosaic : 2D array
+        The composited field.
+    origin : (2,) int array
+        Canvas coordinates of position (0, 0).
+    """
+    keys = sorted(tiles)
+    corners = np.round(np.array([positions[key] for key in keys])).astype(int)
+    origin = -corners.min(axis=0)
+    corners += origin
+    if out is None:
+        extent = np.max([c + tiles[key].shape[:2] for c, key in zip(corners, keys)], axis=0)
+        out = np.zeros(tuple(extent) + tiles[keys[0]].shape[2:], dtype=tiles[keys[0]].dtype)
+    covered = []
+    for (r, c), key in zip(corners, keys):
+        if blend is not None:
+            covered.append(blend_tile(out, tiles[key], (r, c), covered, blend, levels))
+            continue
+        h, w = tiles[key].shape[:2]
+        out[r:r + h, c:c + w] = tiles[key]
+    return out, origin
+
+
+def score_mosaic(mosaic, reference, positions=None, truth=None):
+    """Compare a mosaic with the ground-truth full field.
+
+    Parameters:
+    -----------
+    mosaic, reference : 2D arrays
+        Stitched and ground-truth fields; compared over their common extent.
+    positions, truth : dict, optional
+        Estimated and true tile positions (e.g. from `nominal_positions`).
+
+    Returns:
+    --------
+    score : dict
+        ``psnr``, ``ssim`` and, when positions are given, ``max_position_error``
+        and ``rms_position_error`` in pixels.
+    """
+    h = min(mosaic.shape[0], reference.shape[0])
+    w = min(mosaic.shape[1], reference.shape[1])
+    a = mosaic[:h, :w].astype(np.float64)
+    b = reference[:h, :w].astype(np.float64)
+    data_range = float(np.iinfo(reference.dtype).max) if reference.dtype.kind in "ui" else float(b.max() - b.min())
+    score = {
+        "psnr": metrics.peak_signal_noise_ratio(b, a, data_range=data_range) if np.any(a != b) else np.inf,
+        "ssim": metrics.structural_similarity(b, a, data_range=data_range),
+    }
+    if positions is not None and truth is not None:
+        anchor = sorted(positions)[0]
+        err = np.array([(positions[k] - positions[anchor]) - (truth[k] - truth[anchor]) for k in positions])
+        score["max_position_error"] = float(np.abs(err).max())
+        score["rms_position_error"] = float(np.sqrt(np.mean(err ** 2)))
+    return score
+
+
+def mosaic_grid(tiles, overlap=0.25, workers=None, blend=None):
+    """Register, lay out and composite a full grid of tiles.
+
+    `blend` selects the seam blending of `composite`.
+
+    Returns:
+    --------
+    mosaic : 2D array
+        The composited field.
+    positions : dict
+        Key -> (row, col) position of each tile relative to the first tile.
+    """
+    pairs, shifts, peaks = pairwise_shifts(tiles, overlap, workers)
+    positions = solve_positions(tiles.keys(), pairs, shifts, peaks)
+    mosaic, _ = composite(tiles, positions, blend=blend)
+    return mosaic, positions
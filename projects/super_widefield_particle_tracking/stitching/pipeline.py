@@ -0,0 +1,78 @@
+"""Sequential stitching of a row or column of tiles (the notebook's main loop)."""
+from stitching.features import detect_keypoints, detect_edge_keypoints, edge_keypoints
+from stitching.matching import match_locations
+from stitching.offsets import find_offset, stitch_at_offset
+from stitching.registration import phase_correlation_offset
+
+
+def pair_offset(img0, img1, direction="H", detector="DoG", denominate_faction=3, min_dist=5, method="dense",
+                overlap=0.25, overlap_only=False, cache=None, keys=(None, None)):
+    """``final_offset`` of `img1` stitched after `img0`.
+
+    Keypoints are detected on both images, the ``1/denominate_faction``
+    closest to the shared edge are matched and the best offset is searched.
+    With ``overlap_only=True`` keypoints are only detected in the band of
+    expected `overlap` (see ``features.detect_edge_keypoints``) and all of
+    them are matched: the band replaces the ``1/denominate_faction`` edge
+    fraction; both bands are sized from the extent of `img1`, the incoming
+    tile. Detector responses are kept in `cache` under `keys` when given.
+    With ``detector="phase"`` no keypoints are used: the offset is measured by
+    phase correlation on the band of expected `overlap` instead.
+    """
+    if detector == "phase":
+        return phase_correlation_offset(img0, img1, direction, overlap)
+
+    axis = 1 if direction == "H" else 0
+    if overlap_only:
+        # bands sized from the incoming tile: img0 may be the growing mosaic
+        corner_list = [detect_edge_keypoints(img, detector, direction, trailing, overlap, min_dist, cache, key,
+                                             extent=img1.shape[axis])
+                       for img, trailing, key in zip((img0, img1), (True, False), keys)]
+    else:
+        corner_list = [detect_keypoints(img, detector, min_dist) for img in (img0, img1)]
+    corner_list[0] = edge_keypoints(corner_list[0], direction, trailing=True)
+    corner_list[1] = edge_keypoints(corner_list[1], direction, trailing=False)
+
+    if overlap_only:
+        fraction = max(len(corner_list[0]), len(corner_list[1]))
+    else:
+        fraction = int(len(corner_list[1]) / denominate_faction) + 1
+    coords0 = corner_list[0][0:fraction]
+
+    matching_corners = [match_locations(img0, img, coords0, corners[0:fraction], min_dist)
+                        for img, corners in zip((img0, img1), corner_list)]
+
+    return find_offset(matching_corners[1], matching_corners[0], img0.shape[axis], img1.shape[axis], direction,
+                       method)
+
+
+def stitch_pair(img0, img1, direction="H", detector="DoG", denominate_faction=3, min_dist=5, method="dense",
+                overlap=0.25, overlap_only=False, blend=None):
+    """Stitch `img1` after `img0`, see `pair_offset` for the parameters.
+
+    `blend` selects the seam blending of ``offsets.stitch_at_offset``.
+
+    Returns:
+    --------
+    output_img : 2D uint16 array
+        The stitched image.
+    """
+    final_offset = pair_offset(img0, img1, direction, detector, denominate_faction, min_dist, method, overlap,
+                               overlap_only)
+    return stitch_at_offset(img1, img0, final_offset, direction, blend)
+
+
+def stitch_sequence(img_list, direction="H", detector="DoG", denominate_faction=3, min_dist=5, method="dense",
+                    overlap=0.25, overlap_only=False, blend=None):
+    """Stitch the images of `img_list` iteratively into a single image.
+
+    Each image is stitched after the mosaic of all previous ones.
+    """
+    if direction != "V" and direction != "H":
+        raise AssertionError("[error] stitch direction setting wrong")
+
+    sti = img_list[0]
+    for img in img_list[1:]:
+        sti = stitch_pair(sti, img, direction, detector, denominate_faction, min_dist, method, overlap, overlap_only,
+                          blend)
+    return sti
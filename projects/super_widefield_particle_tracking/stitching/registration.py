@@ -0,0 +1,108 @@
+"""Keypoint-free tile registration by phase correlation.
+
+Neighbouring tiles of a field share a known fraction of their extent (25% or
+50% for the bundled sets), so the translation between them can be measured
+directly on the overlap band: the normalized cross-power spectrum of the two
+bands has a sharp peak at their relative shift. A parabolic fit around the
+peak gives the sub-pixel position.
+"""
+from functools import lru_cache
+
+import numpy as np
+from scipy import fft
+
+# extra pixels taken beyond the expected overlap so that the true overlap
+# falls inside the band even if the stage overshoots
+BAND_MARGIN = 16
+
+
+@lru_cache(maxsize=16)
+def _hann_window(shape):
+    """2D Hann apodization window, shared by every tile pair of the same band shape."""
+    window = np.outer(np.hanning(shape[0]), np.hanning(shape[1])).astype(np.float32)
+    window.setflags(write=False)
+    return window
+
+
+def overlap_bands(img0, img1, direction="H", overlap=0.25, margin=BAND_MARGIN):
+    """Trailing band of `img0` and leading band of `img1` along `direction`.
+
+    Returns:
+    --------
+    band0, band1 : 2D arrays
+        Bands of equal width ``round(overlap * extent) + margin`` (clipped to
+        the tile size).
+    """
+    axis = 1 if direction == "H" else 0
+    extent = min(img0.shape[axis], img1.shape[axis])
+    width = min(extent, int(round(overlap * img1.shape[axis])) + margin)
+    cross = min(img0.shape[1 - axis], img1.shape[1 - axis])
+    if axis == 1:
+        return img0[:cross, img0.shape[1] - width:], img1[:cross, :width]
+    return img0[img0.shape[0] - width:, :cross], img1[:width, :cross]
+
+
+def _subpixel(corr, peak, axis):
+    # parabolic interpolation of the correlation peak along one axis
+    n = corr.shape[axis]
+    idx_m, idx_p = list(peak), list(peak)
+    idx_m[axis] = (peak[axis] - 1) % n
+    idx_p[axis] = (peak[axis] + 1) % n
+    c_m, c_0, c_p = corr[tuple(idx_m)], corr[peak], corr[tuple(idx_p)]
+    denom = c_m - 2 * c_0 + c_p
+    if denom == 0:
+        return 0.0
+    return float(0.5 * (c_m - c_p) / denom)
+
+
+def phase_correlation(band0, band1):
+    """Sub-pixel shift ``(dy, dx)`` such that ``band0(x) ~ band1(x - shift)``.
+
+    Returns:
+    --------
+    shift : (2,) float array
+        Shift in (row, col), wrapped to ``(-n/2, n/2]``.
+    peak : float
+        Height of the normalized correlation peak (1 for a perfect match).
+    """
+    shape = band0.shape
+    window = _hann_window(shape)
+    f0 = fft.rfft2(window * band0.astype(np.float32), workers=-1)
+    f1 = fft.rfft2(window * band1.astype(np.float32), workers=-1)
+    cross = f0 * np.conj(f1)
+    cross /= np.maximum(np.abs(cross), np.finfo(np.float32).eps)
+    corr = fft.irfft2(cross, s=shape, workers=-1)
+
+    peak = np.unravel_index(np.argmax(corr), corr.shape)
+    shift = np.array([peak[0] + _subpixel(corr, peak, 0), peak[1] + _subpixel(corr, peak, 1)])
+    dims = np.array(shape)
+    shift[shift > dims / 2] -= dims[shift > dims / 2]
+    return shift, float(corr[peak])
+
+
+def register_pair(img0, img1, direction="H", overlap=0.25, margin=BAND_MARGIN):
+    """Translation of `img1` relative to `img0` by phase correlation.
+
+    `img1` follows `img0` to the right ("H") or below ("V") with roughly
+    `overlap` of its extent shared.
+
+    Returns:
+    --------
+    translation : (2,) float array
+        Sub-pixel (row, col) position of the origin of `img1` in `img0`.
+    peak : float
+        Correlation peak height, usable as a confidence of the match.
+    """
+    band0, band1 = overlap_bands(img0, img1, direction, overlap, margin)
+    shift, peak = phase_correlation(band0, band1)
+    axis = 1 if direction == "H" else 0
+    translation = shift.copy()
+    translation[axis] += img0.shape[axis] - band0.shape[axis]
+    return translation, peak
+
+
+def phase_correlation_offset(img0, img1, direction="H", overlap=0.25, margin=BAND_MARGIN):
+    """Integer ``final_offset`` (overlap in pixels) as used by ``stitched_img``."""
+    translation, _ = register_pair(img0, img1, direction, overlap, margin)
+    axis = 1 if direction == "H" else 0
+    return int(np.clip(np.round(img0.shape[axis] - translation[axis]), 0, img1.shape[axis]))
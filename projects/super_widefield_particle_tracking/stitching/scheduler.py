@@ -0,0 +1,184 @@
+"""Parallel registration of tile pairs across CPU cores.
+
+The neighbour pairs of a tile grid are independent, so they are registered in
+a process pool. Tile pixels are copied once into a shared memory block that
+every worker maps, so a job only carries two tile indices instead of two
+pickled 16-bit arrays. Shifts are handed to the compositor as soon as each
+pair completes: tiles are placed on the canvas as soon as they are connected
+to the anchor tile, and the global least-squares layout is applied once all
+pairs are in.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from stitching.canvas import allocate_canvas, blit
+from stitching.features import KeypointCache
+from stitching.mosaic import neighbour_pairs, nominal_positions, solve_positions, composite
+from stitching.pipeline import pair_offset
+from stitching.registration import register_pair, BAND_MARGIN
+
+
+class SharedTiles:
+    """Tiles of a grid stored in one shared memory block.
+
+    Use as a context manager in the parent process; workers rebuild views on
+    the same block with `attach` from the picklable `spec`.
+    """
+
+    def __init__(self, tiles):
+        self.keys = sorted(tiles)
+        layout, nbytes = [], 0
+        for key in self.keys:
+            tile = np.ascontiguousarray(tiles[key])
+            layout.append((nbytes, tile.shape, tile.dtype.str))
+            nbytes += tile.nbytes
+        self._shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        for key, (start, shape, dtype) in zip(self.keys, layout):
+            view = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf, offset=start)
+            view[...] = tiles[key]
+        self.spec = (self._shm.name, layout)
+
+    @staticmethod
+    def attach(spec):
+        """Views on the shared tiles, in key order, plus the handle to keep alive."""
+        name, layout = spec
+        shm = shared_memory.SharedMemory(name=name)
+        views = [np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start) for start, shape, dtype in layout]
+        return views, shm
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# per worker process state, set by _init_worker
+_worker_tiles = None
+_worker_shm = None
+_worker_cache = None
+
+
+def _init_worker(spec):
+    global _worker_tiles, _worker_shm, _worker_cache
+    _worker_tiles, _worker_shm = SharedTiles.attach(spec)
+    _worker_cache = KeypointCache()
+
+
+def _register_job(a, b, direction, overlap, detector, overlap_only=False):
+    img0, img1 = _worker_tiles[a], _worker_tiles[b]
+    if detector == "phase":
+        shift, peak = register_pair(img0, img1, direction, overlap)
+        return shift, peak
+    axis = 1 if direction == "H" else 0
+    shift = np.zeros(2)
+    shift[axis] = img0.shape[axis] - pair_offset(img0, img1, direction, detector, overlap=overlap,
+                                                 overlap_only=overlap_only, cache=_worker_cache, keys=(a, b))
+    return shift, 1.0
+
+
+def iter_pair_shifts(tiles, overlap=0.25, detector="phase", processes=None, overlap_only=False):
+    """Register all neighbour pairs in a process pool.
+
+    Parameters:
+    -----------
+    tiles : dict
+        ``(i, j)`` -> tile.
+    overlap : float
+        Expected overlap fraction between neighbours.
+    detector : str
+        ``"phase"`` or one of the keypoint detectors of ``detect_keypoints``.
+    processes : int, optional
+        Pool size, defaults to the number of CPUs.
+    overlap_only : bool
+        Detect keypoints in the overlap bands only, see ``pipeline.pair_offset``.
+
+    Yields:
+    -------
+    (a, b, direction), shift, peak
+        One neighbour pair as soon as its registration completes.
+    """
+    pairs = neighbour_pairs(tiles)
+    with SharedTiles(tiles) as shared:
+        index = {key: n for n, key in enumerate(shared.keys)}
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), initializer=_init_worker,
+                                 initargs=(shared.spec,)) as pool:
+            futures = {pool.submit(_register_job, index[a], index[b], direction, overlap, detector,
+                                   overlap_only): (a, b, direction)
+                       for a, b, direction in pairs}
+            for future in as_completed(futures):
+                shift, peak = future.result()
+                yield futures[future], shift, peak
+
+
+def mosaic_grid_parallel(tiles, overlap=0.25, detector="phase", processes=None, on_tile=None, overlap_only=False,
+                         blend=None):
+    """Mosaic a grid with pair registrations running in a process pool.
+
+    While results arrive, each tile connected to the anchor tile through
+    completed pairs is placed on the canvas (preview). Once every pair is in,
+    the global least-squares layout of ``mosaic.solve_positions`` is
+    composited into the same canvas, so the result matches
+    ``mosaic.mosaic_grid``.
+
+    Parameters:
+    -----------
+    on_tile : callable, optional
+        Called as ``on_tile(key, canvas)`` each time a preview tile is placed.
+    blend : str, optional
+        Seam blending of the final composite, see ``mosaic.composite``.
+
+    Returns:
+    --------
+    mosaic : 2D array
+        The composited field.
+    positions : dict
+        Key -> (row, col) position of each tile relative to the first tile.
+    """
+    keys = sorted(tiles)
+    anchor = keys[0]
+    tile_shape = tiles[anchor].shape[:2]
+    nominal = nominal_positions(keys, tile_shape, overlap)
+    extent = np.max([nominal[k] for k in keys], axis=0).astype(int) + tile_shape + 2 * BAND_MARGIN
+    canvas = allocate_canvas(tuple(extent) + tiles[anchor].shape[2:], tiles[anchor].dtype)
+
+    placed = {anchor: np.zeros(2)}
+    blit(canvas, tiles[anchor], (BAND_MARGIN, BAND_MARGIN))
+    links = {key: [] for key in keys}
+    pairs, shifts, peaks = [], [], []
+    for (a, b, direction), shift, peak in iter_pair_shifts(tiles, overlap, detector, processes, overlap_only):
+        pairs.append((a, b, direction))
+        shifts.append(shift)
+        peaks.append(peak)
+        links[a].append((b, shift))
+        links[b].append((a, -shift))
+
+        # place every tile newly connected to the placed component
+        queue = deque(key for key in (a, b) if key in placed)
+        while queue:
+            key = queue.popleft()
+            for other, step in links[key]:
+                if other not in placed:
+                    placed[other] = placed[key] + step
+                    blit(canvas, tiles[other], np.round(placed[other]).astype(int) + BAND_MARGIN)
+                    if on_tile is not None:
+                        on_tile(other, canvas)
+                    queue.append(other)
+
+    positions = solve_positions(keys, pairs, np.array(shifts).reshape(-1, 2), np.array(peaks))
+    corners = np.round(np.array([positions[k] for k in keys])).astype(int)
+    needed = (corners.max(axis=0) - corners.min(axis=0)) + tile_shape
+    if np.all(needed <= canvas.shape[:2]):
+        canvas[...] = 0
+        mosaic, _ = composite(tiles, positions, out=canvas[:needed[0], :needed[1]], blend=blend)
+    else:
+        mosaic, _ = composite(tiles, positions, blend=blend)
+    return mosaic, positions
@@ -0,0 +1,161 @@
+"""Streaming stitching: composite tiles as they arrive from the acquisition.
+
+Each new tile is registered only against its already-placed grid neighbours
+(at most four phase correlations) and blitted into a canvas allocated once for
+the whole field, so the work per tile does not grow with the number of tiles
+already stitched.
+"""
+import time
+from os import listdir
+from os.path import getsize, join
+
+import numpy as np
+
+from stitching.blending import blend_tile
+from stitching.canvas import allocate_canvas, blit
+from stitching.registration import register_pair, BAND_MARGIN
+from stitching.tiles import TILE_PATTERN, read_tile
+
+# (di, dj, direction, new tile trails the neighbour)
+_NEIGHBOURS = ((-1, 0, "H", False), (1, 0, "H", True), (0, -1, "V", False), (0, 1, "V", True))
+
+
+class StreamingStitcher:
+    """Incremental stitcher for a grid acquired tile by tile.
+
+    Parameters:
+    -----------
+    grid_shape : (int, int)
+        Number of tile columns and rows (``i`` and ``j`` ranges).
+    tile_shape : (int, int)
+        Shape of one tile.
+    overlap : float
+        Expected overlap fraction between neighbours.
+    dtype : dtype
+        Pixel type of the canvas.
+    path : str, optional
+        Write the canvas to disk instead of RAM, see ``canvas.allocate_canvas``
+        (``.npy`` or BigTIFF memory map, or a chunked directory store for
+        fields larger than memory).
+    min_peak : float
+        Registrations with a lower correlation peak are ignored; a tile with no
+        usable neighbour is placed at its nominal stage position.
+    blend : str, optional
+        ``"feather"`` or ``"multiband"`` to blend each tile with the placed
+        tiles it overlaps (see ``blending.blend_tile``) instead of overwriting
+        them.
+    """
+
+    def __init__(self, grid_shape, tile_shape, overlap=0.25, dtype=np.uint16, path=None, min_peak=0.05, blend=None):
+        self.grid_shape = tuple(grid_shape)
+        self.tile_shape = tuple(tile_shape)
+        self.overlap = overlap
+        self.min_peak = min_peak
+        self.blend = blend
+        self.step = np.round(np.array(self.tile_shape) * (1 - overlap))
+        extent = self.step * (np.array(self.grid_shape[::-1]) - 1) + self.tile_shape + 2 * BAND_MARGIN
+        self.canvas = allocate_canvas(tuple(extent.astype(int)), dtype, path)
+        self.positions = {}
+        self.latencies = []
+        self._tiles = {}
+        self._rects = {}
+
+    def nominal_position(self, key):
+        i, j = key
+        return np.array([j * self.step[0], i * self.step[1]])
+
+    def _neighbours(self, key):
+        i, j = key
+        for di, dj, direction, trailing in _NEIGHBOURS:
+            other = (i + di, j + dj)
+            if 0 <= other[0] < self.grid_shape[0] and 0 <= other[1] < self.grid_shape[1]:
+                yield other, direction, trailing
+
+    def add(self, key, tile):
+        """Register `tile` against its placed neighbours and write it to the canvas.
+
+        Returns:
+        --------
+        position : (2,) float array
+            (row, col) position of the tile in field coordinates.
+        """
+        t0 = time.perf_counter()
+        estimates, weights = [], []
+        for other, direction, trailing in self._neighbours(key):
+            if other not in self._tiles:
+                continue
+            if trailing:
+                shift, peak = register_pair(tile, self._tiles[other], direction, self.overlap)
+                estimate = self.positions[other] - shift
+            else:
+                shift, peak = register_pair(self._tiles[other], tile, direction, self.overlap)
+                estimate = self.positions[other] + shift
+            if peak >= self.min_peak:
+                estimates.append(estimate)
+                weights.append(peak)
+
+        if estimates:
+            position = np.average(estimates, axis=0, weights=weights)
+        else:
+            position = self.nominal_position(key)
+        self.positions[key] = position
+        corner = np.round(position).astype(int) + BAND_MARGIN
+        if self.blend is None:
+            blit(self.canvas, tile, corner)
+        else:
+            # only placed neighbours can overlap the tile
+            covered = [self._rects[other] for other, _, _ in self._neighbours(key) if other in self._rects]
+            for di in (-1, 1):
+                for dj in (-1, 1):
+                    if (key[0] + di, key[1] + dj) in self._rects:
+                        covered.append(self._rects[(key[0] + di, key[1] + dj)])
+            self._rects[key] = blend_tile(self.canvas, tile, corner, covered, self.blend)
+
+        # keep the pixels of a tile only while some neighbour has not arrived
+        self._tiles[key] = tile
+        for k in [key] + [other for other, _, _ in self._neighbours(key)]:
+            if k in self._tiles and all(other in self.positions for other, _, _ in self._neighbours(k)):
+                del self._tiles[k]
+
+        self.latencies.append(time.perf_counter() - t0)
+        return position
+
+    def latency_report(self):
+        """Mean, max and 95th percentile of the per-tile latency in seconds."""
+        latencies = np.array(self.latencies)
+        if latencies.size == 0:
+            return {"tiles": 0}
+        return {"tiles": int(latencies.size), "mean": float(latencies.mean()), "max": float(latencies.max()),
+                "p95": float(np.percentile(latencies, 95))}
+
+    def field(self):
+        """Canvas cropped to the placed tiles (a view, except for a chunked store)."""
+        corners = np.round(np.array(list(self.positions.values()))).astype(int) + BAND_MARGIN
+        r0, c0 = np.maximum(corners.min(axis=0), 0)
+        r1, c1 = corners.max(axis=0) + self.tile_shape
+        return self.canvas[r0:r1, c0:c1]
+
+
+def watch_directory(directory, poll_interval=0.1, timeout=10.0, expected=None):
+    """Yield ``(key, tile)`` for each ``image_iX_jY.tif`` appearing in `directory`.
+
+    A file is read once its size is unchanged between two polls (fully
+    written). Stops after `expected` tiles, or when no new tile arrived for
+    `timeout` seconds.
+    """
+    seen, sizes = set(), {}
+    last_new = time.monotonic()
+    while expected is None or len(seen) < expected:
+        for name in sorted(listdir(directory)):
+            match = TILE_PATTERN.match(name)
+            if not match or name in seen:
+                continue
+            size = getsize(join(directory, name))
+            if sizes.get(name) == size and size > 0:
+                seen.add(name)
+                last_new = time.monotonic()
+                yield (int(match.group(1)), int(match.group(2))), read_tile(join(directory, name))
+            sizes[name] = size
+        if time.monotonic() - last_new > timeout:
+            break
+        time.sleep(poll_interval)
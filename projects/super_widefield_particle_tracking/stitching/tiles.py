@@ -0,0 +1,44 @@
+"""Reading the bundled tile sets.
+
+Tiles are written by ``split_images.ipynb`` as ``image_i{i}_j{j}.tif`` where
+``i`` is the column index and ``j`` the row index of the tile in the field.
+"""
+import re
+from os import listdir
+from os.path import join
+
+import numpy as np
+from PIL import Image
+
+TILE_PATTERN = re.compile(r"image_i(\d+)_j(\d+)\.tif$")
+
+
+def read_tile(path):
+    """Read one tile as a numpy array (16-bit tiles stay ``np.uint16``)."""
+    return np.array(Image.open(path))
+
+
+def load_grid(directory):
+    """Load every ``image_iX_jY.tif`` in `directory`.
+
+    Returns:
+    --------
+    tiles : dict
+        Maps ``(i, j)`` (column, row) to the tile array.
+    """
+    tiles = {}
+    for name in sorted(listdir(directory)):
+        match = TILE_PATTERN.match(name)
+        if match:
+            tiles[(int(match.group(1)), int(match.group(2)))] = read_tile(join(directory, name))
+    return tiles
+
+
+def grid_row(tiles, j):
+    """Tiles of row `j` ordered left to right (a "H" stitch sequence)."""
+    return [tiles[key] for key in sorted(k for k in tiles if k[1] == j)]
+
+
+def grid_column(tiles, i):
+    """Tiles of column `i` ordered top to bottom (a "V" stitch sequence)."""
+    return [tiles[key] for key in sorted((k for k in tiles if k[0] == i), key=lambda k: k[1])]
@@ -0,0 +1,8 @@
+"""Particle tracking on stitched fields.
+
+Particles are detected with the same difference of Gaussians peaks used as
+stitching keypoints, localized to sub-pixel accuracy and linked from frame to
+frame into trajectories.
+"""
+from tracking.localization import detect_particles, localize_particles
+from tracking.linking import link_frames, track_series
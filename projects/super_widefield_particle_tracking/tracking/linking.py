@@ -0,0 +1,74 @@
+"""Linking of localized particles into trajectories.
+
+Consecutive frames are linked by mutual nearest neighbours found with KD-tree
+queries: particle ``a`` of frame ``t`` and ``b`` of frame ``t + 1`` are linked
+when each is the other's nearest neighbour within `max_displacement`.
+Unlinked particles of frame ``t + 1`` start new tracks.
+"""
+import time
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from tracking.localization import detect_particles, localize_particles
+
+
+def link_frames(prev, cur, max_displacement=5.0):
+    """Mutual nearest-neighbour links between two frames.
+
+    Returns:
+    --------
+    idx_prev, idx_cur : (k,) int arrays
+        Indices of the linked particles in `prev` and `cur`.
+    """
+    prev = np.asarray(prev).reshape(-1, 2)
+    cur = np.asarray(cur).reshape(-1, 2)
+    if len(prev) == 0 or len(cur) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    _, fwd = cKDTree(cur).query(prev, k=1, distance_upper_bound=max_displacement)
+    _, bwd = cKDTree(prev).query(cur, k=1, distance_upper_bound=max_displacement)
+    idx_prev = np.flatnonzero(fwd < len(cur))
+    idx_cur = fwd[idx_prev]
+    mutual = bwd[idx_cur] == idx_prev
+    return idx_prev[mutual], idx_cur[mutual]
+
+
+def track_series(frames, max_displacement=5.0, radius=3, method="gaussian", min_dist=3):
+    """Detect, localize and link particles over a time series of fields.
+
+    Parameters:
+    -----------
+    frames : iterable of 2D arrays
+        Stitched fields in time order.
+    max_displacement : float
+        Largest displacement between two frames, in pixels.
+    radius, method : see `localize_particles`.
+
+    Returns:
+    --------
+    tracks : (N, 4) float array
+        One row ``(frame, track_id, row, col)`` per localized particle.
+    stats : dict
+        ``particles``, ``frames``, ``seconds`` and ``particles_per_second``.
+    """
+    t0 = time.perf_counter()
+    rows = []
+    prev, prev_ids, next_id = None, None, 0
+    for t, frame in enumerate(frames):
+        positions = localize_particles(frame, detect_particles(frame, min_dist), radius, method)
+        ids = np.empty(len(positions), dtype=np.int64)
+        linked = np.zeros(len(positions), dtype=bool)
+        if prev is not None:
+            idx_prev, idx_cur = link_frames(prev, positions, max_displacement)
+            ids[idx_cur] = prev_ids[idx_prev]
+            linked[idx_cur] = True
+        ids[~linked] = np.arange(next_id, next_id + np.count_nonzero(~linked))
+        next_id += np.count_nonzero(~linked)
+        rows.append(np.column_stack([np.full(len(positions), t), ids, positions]))
+        prev, prev_ids = positions, ids
+
+    tracks = np.concatenate(rows) if rows else np.empty((0, 4))
+    seconds = time.perf_counter() - t0
+    stats = {"particles": len(tracks), "frames": len(rows), "seconds": seconds,
+             "particles_per_second": len(tracks) / seconds if seconds > 0 else np.inf}
+    return tracks, stats
@@ -0,0 +1,99 @@
+"""Sub-pixel localization of particle images.
+
+Every particle is fitted at once: the patches around all peaks are gathered
+into one ``(n, 2r+1, 2r+1)`` array, the local background (patch minimum) is
+removed and
+
+- ``method="centroid"`` takes the intensity centroid of the patch,
+- ``method="gaussian"`` fits ``ln I = a + b x + c y + d x**2 + e y**2`` (an
+  axis-aligned 2-D Gaussian) by least squares on the 3x3 core of the patch,
+  the logarithm taken on the background-free intensities (clipped to
+  `LOG_EPS`), so that the fit does not depend on the units of the image.
+  The design matrix is the same for every patch, so the fit of all particles
+  is one matrix product with its pseudo-inverse.
+"""
+from functools import lru_cache
+
+import numpy as np
+from scipy import ndimage
+from skimage.filters import difference_of_gaussians
+
+from stitching.matching import extract_patches
+
+# smallest intensity (above the local background) whose logarithm enters the Gaussian fit
+LOG_EPS = 1e-12
+
+
+def detect_particles(img, min_dist=3, threshold=5.0, low_sigma=2, high_sigma=2.6):
+    """Integer (row, col) peaks of the particle images.
+
+    Local maxima of the same difference of Gaussians used for the stitching
+    keypoints, kept when they exceed `threshold` times the robust (MAD) noise
+    level of the filtered image. Unlike a threshold relative to the brightest
+    peak, this keeps dim particles in fields with bright clusters.
+    """
+    if min_dist < 1:
+        raise ValueError("[error] min_dist must be at least 1: {}".format(min_dist))
+    dog = difference_of_gaussians(image=img, low_sigma=low_sigma, high_sigma=high_sigma)
+    median = np.median(dog)
+    noise = 1.4826 * np.median(np.abs(dog - median))
+    peaks = (dog == ndimage.maximum_filter(dog, size=2 * min_dist + 1)) & (dog > median + threshold * noise)
+    peaks[:min_dist] = peaks[-min_dist:] = False
+    peaks[:, :min_dist] = peaks[:, -min_dist:] = False
+    return np.argwhere(peaks)
+
+
+@lru_cache(maxsize=8)
+def _gaussian_pinv(radius):
+    y, x = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    design = np.stack([np.ones(x.size), x.ravel(), y.ravel(), x.ravel() ** 2, y.ravel() ** 2], axis=1)
+    return np.linalg.pinv(design)
+
+
+def _centroid(patches, radius):
+    offsets = np.arange(-radius, radius + 1)
+    mass = patches.sum(axis=(1, 2))
+    mass = np.where(mass > 0, mass, 1)
+    dy = (patches.sum(axis=2) @ offsets) / mass
+    dx = (patches.sum(axis=1) @ offsets) / mass
+    return np.stack([dy, dx], axis=1)
+
+
+def localize_particles(img, peaks, radius=3, method="gaussian"):
+    """Sub-pixel positions of the particles around integer `peaks`.
+
+    Parameters:
+    -----------
+    img : 2D array
+        Frame (e.g. a stitched field).
+    peaks : (n, 2) array_like
+        Integer (row, col) peak locations, e.g. from `detect_particles`.
+    radius : int
+        Half width of the patch used for the background and the centroid.
+    method : str
+        ``"gaussian"`` or ``"centroid"``.
+
+    Returns:
+    --------
+    positions : (n, 2) float array
+        Sub-pixel (row, col) positions. Gaussian fits that fail (non-peaked
+        core) or land more than a pixel away fall back to the centroid.
+    """
+    peaks = np.asarray(peaks).reshape(-1, 2)
+    patches = extract_patches(img, peaks, radius)
+    patches -= patches.min(axis=(1, 2), keepdims=True)
+    offset = _centroid(patches, radius)
+
+    if method == "gaussian":
+        # the local minimum (patch background) is already subtracted from the core
+        core = patches[:, radius - 1:radius + 2, radius - 1:radius + 2].reshape(len(patches), -1)
+        a, b, c, d, e = _gaussian_pinv(1) @ np.log(np.maximum(core, LOG_EPS)).T
+        valid = (d < 0) & (e < 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fit = np.stack([-c / (2 * e), -b / (2 * d)], axis=1)
+        valid &= np.all(np.abs(fit) <= 1, axis=1)
+        offset[valid] = fit[valid]
+    elif method != "centroid":
+        raise ValueError("[error] localization method wrong: {}".format(method))
+
+    return peaks + offset
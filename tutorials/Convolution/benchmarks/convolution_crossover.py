@@ -0,0 +1,133 @@
+"""
+Convolution engine: per-channel cv2.filter2D of the original pages vs convolution.py,
+and the kernel size x image size sweep behind the crossovers of convolution.py.
+
+Every method must agree with cv2.filter2D within one grey level (the direct method
+exactly). The sweep times, on random RGB images and kernels, the original
+per-channel cv2.filter2D, and the direct (one multi-channel call), separable and
+FFT methods, for kernels that are not separable and for Gaussian ones. It then
+prints the crossovers found, in the form of the constants of convolution.py,
+and the time of the method chosen by the engine.
+
+Run from the repository root:  python tutorials/Convolution/benchmarks/convolution_crossover.py
+"""
+import math
+import sys
+import time
+from os import path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import convolution
+
+IMAGE_SIDES = (256, 512, 1024, 2048)
+KERNEL_SIDES = (3, 5, 7, 11, 15, 21, 31, 45, 63)
+REPEAT = 3
+
+
+def reference_filter(img, kernel):
+    # do_convolution of the original page (without the kernel flip): one cv2.filter2D per channel
+    op = np.zeros(img.shape, 'uint8')
+    op[..., 0] = cv2.filter2D(img[:, :, 0], -1, kernel)
+    op[..., 1] = cv2.filter2D(img[:, :, 1], -1, kernel)
+    op[..., 2] = cv2.filter2D(img[:, :, 2], -1, kernel)
+    return op
+
+
+def gaussian(n, sigma):
+    # kernel_gaus of the original Gaussian page (normalized to 1 / pi)
+    kernel = np.zeros((n, n), np.float32)
+    origin = (n - 1) / 2
+    for i in range(n):
+        for j in range(n):
+            kernel[i][j] = (1 / (2 * pow(math.pi * sigma, 2))) * math.exp(
+                -(pow(i - origin, 2) + pow(j - origin, 2)) / (2 * pow(sigma, 2)))
+    return kernel
+
+
+def best_of(fn):
+    times = []
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def check(rng):
+    img = rng.integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    kernels = {'Gaussian 31x31': gaussian(31, 5) * 20, 'box 6x6': np.ones((6, 6), np.float32) / 36,
+               'Sobel': np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]]),
+               'edge detector': np.array([[-2, -2, -2], [-2, 16, -2], [-2, -2, -2]]),
+               'random 15x12': rng.standard_normal((15, 12)).astype(np.float32) / 15}
+    for name, kernel in kernels.items():
+        before = reference_filter(img, kernel)
+        assert np.array_equal(before, convolution.filter_image(img, kernel, 'direct')), "direct method differs"
+        separable = convolution.separable_factors(kernel) is not None
+        for method in ('separable', 'fft') if separable else ('fft',):
+            after = convolution.filter_image(img, kernel, method)
+            assert np.abs(before.astype(int) - after).max() <= 1, "{} method differs".format(method)
+        print("{}: {}separable, all methods within one grey level of cv2.filter2D".format(
+            name, '' if separable else 'not '))
+
+
+def crossover(sides, faster):
+    # smallest kernel side from which `faster` holds for every larger side of the sweep, None if never
+    side = None
+    for n, wins in zip(sides[::-1], faster[::-1]):
+        if not wins:
+            break
+        side = n
+    return side
+
+
+def table(sizes, sides):
+    # the crossover of each image size, merged into (largest image size, kernel side) entries
+    entries = []
+    for i, side in enumerate(sides):
+        largest = int(round(math.sqrt(sizes[i] * sizes[i + 1]), -3)) if i + 1 < len(sizes) else None
+        if entries and entries[-1][1] == side:
+            entries[-1] = (largest, side)
+        else:
+            entries.append((largest, side))
+    return tuple(entries)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    check(rng)
+
+    sizes, fft_sides, fft_sides_separable, separable_sides = [], [], [], []
+    for image_side in IMAGE_SIDES:
+        img = rng.integers(0, 256, (image_side, image_side, 3), dtype=np.uint8)
+        sizes.append(img.size)
+        print("image {0}x{0}x3".format(image_side))
+        timings = {}
+        for n in KERNEL_SIDES:
+            kernels = {'not separable': rng.standard_normal((n, n)).astype(np.float32) / n,
+                       'separable': gaussian(n, n / 6)}
+            for kind, kernel in kernels.items():
+                t = {method: best_of(lambda: convolution.filter_image(img, kernel, method))
+                     for method in convolution.METHODS if method != 'separable' or kind == 'separable'}
+                t['per channel'] = best_of(lambda: reference_filter(img, kernel))
+                t['auto'] = best_of(lambda: convolution.filter_image(img, kernel))
+                timings[kind, n] = t
+                print("  {:2d}x{:<2d} {:13s}: ".format(n, n, kind) + ", ".join(
+                    "{} {:.1f} ms".format(method, 1e3 * t[method]) for method in t))
+        fft_sides.append(crossover(KERNEL_SIDES, [timings['not separable', n]['fft'] < timings['not separable', n][
+            'direct'] for n in KERNEL_SIDES]))
+        separable = [timings['separable', n] for n in KERNEL_SIDES]
+        fft_sides_separable.append(crossover(KERNEL_SIDES, [t['fft'] < t['separable'] for t in separable]))
+        separable_sides.append(crossover(KERNEL_SIDES, [t['separable'] < t['direct'] for t in separable]))
+
+    print("crossovers of the sweep, for convolution.py:")
+    print("  SEPARABLE_MIN_SIZE = {}".format(max(side for side in separable_sides if side is not None)))
+    print("  FFT_MIN_SIZE = {}".format(table(sizes, fft_sides)))
+    print("  FFT_MIN_SIZE_SEPARABLE = {}".format(table(sizes, fft_sides_separable)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Normalized convolution: do_convolution_norm of the original page vs convolution.filter_normalized.
+
+The reference below filters each channel to uint8 (saturating it) and rescales it
+by 255 / max in a float64 np.multiply per channel. filter_normalized accumulates
+all the channels in float32, reduces their extremes and writes the 8-bit result in
+one fused cv2.multiply, reusing its accumulator from one call to the next. For
+each kernel, the error against the exact (float64) normalized filter, the
+throughput and the memory high-water mark of one call (numpy and OpenCV output
+arrays, traced by tracemalloc; the output array is allocated beforehand, as in
+the page) are reported.
+
+Run from the repository root:  python tutorials/Convolution/benchmarks/convolution_norm.py
+"""
+import sys
+import time
+import tracemalloc
+from os import path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+sys.path.insert(0, path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
+
+import convolution
+import kernels
+
+IMAGE_SIDES = (512, 2048)
+KERNELS = {'Gaussian 31x31': kernels.gaussian(31, 5, np.float32),
+           'sharpen': np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]]),
+           'edge detector': np.array([[-2, -2, -2], [-2, 16, -2], [-2, -2, -2]])}
+REPEAT = 3
+
+
+def reference_norm(img, op, kernel):
+    # do_convolution_norm of the original page
+    op1 = cv2.filter2D(img[:, :, 0], -1, kernel)
+    op2 = cv2.filter2D(img[:, :, 1], -1, kernel)
+    op3 = cv2.filter2D(img[:, :, 2], -1, kernel)
+    op[..., 0] = np.multiply(op1, 255.0 / np.amax(op1))
+    op[..., 1] = np.multiply(op2, 255.0 / np.amax(op2))
+    op[..., 2] = np.multiply(op3, 255.0 / np.amax(op3))
+    return op
+
+
+def exact_norm(img, kernel):
+    values = cv2.filter2D(img.astype(np.float64), -1, np.asarray(kernel, dtype=np.float64),
+                          borderType=cv2.BORDER_REFLECT_101)
+    low = np.minimum(values.min(axis=(0, 1)), 0)
+    return (values - low) * 255 / (values.max(axis=(0, 1)) - low)
+
+
+def best_of(fn):
+    times = []
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def high_water(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for side in IMAGE_SIDES:
+        # smooth content, so that blurs do not only average out noise
+        img = cv2.resize(rng.integers(0, 256, (side // 16, side // 16, 3), dtype=np.uint8), (side, side),
+                         interpolation=cv2.INTER_CUBIC)
+        op = np.zeros(img.shape, 'uint8')
+        megapixels = img.shape[0] * img.shape[1] / 1e6
+        print("image {0}x{0}x3".format(side))
+        for name, kernel in KERNELS.items():
+            exact = exact_norm(img, kernel)
+            buffers = {}
+            error_before = np.abs(reference_norm(img, op, kernel) - exact).max()
+            error_after = np.abs(convolution.filter_normalized(img, kernel, out=op, buffers=buffers) - exact).max()
+            t_before = best_of(lambda: reference_norm(img, op, kernel))
+            t_after = best_of(lambda: convolution.filter_normalized(img, kernel, out=op, buffers=buffers))
+            m_before = high_water(lambda: reference_norm(img, op, kernel))
+            m_cold = high_water(lambda: convolution.filter_normalized(img, kernel, out=op))
+            m_warm = high_water(lambda: convolution.filter_normalized(img, kernel, out=op, buffers=buffers))
+            print("  {}: max error {:.1f} -> {:.2f} grey levels, {:.0f} -> {:.0f} Mpixel/s, high-water {:.1f} MB -> "
+                  "{:.1f} MB ({:.2f} MB with the accumulator kept)".format(
+                      name, error_before, error_after, megapixels / t_before, megapixels / t_after,
+                      m_before / 1e6, m_cold / 1e6, m_warm / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Kernel banks: independent convolutions vs convolution.filter_bank.
+
+Three cases, each checked against a float64 cv2.filter2D of every kernel:
+- the kernels of the app's pages on an RGB image: one cv2.filter2D per kernel and
+  per channel (as the pages do) vs one bank;
+- a bank of large kernels that are not separable (FFT path): one padded image and
+  FFT per kernel vs one shared spectrum;
+- the Sobel page: two uint8 cv2.filter2D and np.sqrt(pow(...)) (the original code,
+  which wraps around in uint8) vs gradient_magnitude (float32 bank and fused
+  cv2.magnitude).
+
+Run from the repository root:  python tutorials/Convolution/benchmarks/filter_bank.py
+"""
+import sys
+import time
+from os import path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+sys.path.insert(0, path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
+
+import convolution
+import kernels
+
+REPEAT = 3
+PAGES = [kernels.gaussian(31, 5, np.float32), kernels.box(15, np.float32), kernels.sobel(1, 0, normalize=False),
+         -kernels.sobel(0, 1, normalize=False), np.array([[-2, -2, -2], [-2, 16, -2], [-2, -2, -2]]),
+         np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]]), np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])]
+
+
+def independent(img, bank):
+    # one float32 cv2.filter2D per kernel and per channel
+    out = np.empty((len(bank),) + img.shape, np.float32)
+    for response, kernel in zip(out, bank):
+        for c in range(img.shape[2]):
+            response[..., c] = cv2.filter2D(img[:, :, c], cv2.CV_32F, kernel)
+    return out
+
+
+def independent_fft(img, bank):
+    # the FFT path kernel by kernel: padding and image spectrum recomputed every time
+    return np.stack([convolution._fft_filter(img, kernel) for kernel in bank])
+
+
+def reference_sobel(img_gray):
+    # the original Sobel page
+    kernel_sobelx = np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]])
+    kernel_sobely = np.array([[1, 2, 1], [0, 0, 0], [-1, -2, -1]])
+    opx = cv2.filter2D(img_gray, -1, kernel_sobelx)
+    opy = cv2.filter2D(img_gray, -1, kernel_sobely)
+    return np.sqrt(pow(opx, 2) + pow(opy, 2))
+
+
+def exact(img, bank):
+    return np.stack([cv2.filter2D(img.astype(np.float64), -1, np.asarray(kernel, np.float64),
+                                  borderType=cv2.BORDER_REFLECT_101).reshape(img.shape) for kernel in bank])
+
+
+def best_of(fn):
+    times = []
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return out, min(times)
+
+
+def report(name, img, bank, before, after):
+    (out_before, t_before), (out_after, t_after) = before, after
+    reference = exact(img, bank)
+    scale = np.abs(reference).max()
+    error_before = np.abs(out_before.reshape(reference.shape) - reference).max() / scale
+    error_after = np.abs(out_after.reshape(reference.shape) - reference).max() / scale
+    print("{}: {:.1f} ms -> {:.1f} ms, relative error {:.1e} -> {:.1e}".format(
+        name, 1e3 * t_before, 1e3 * t_after, error_before, error_after))
+
+
+def main():
+    rng = np.random.default_rng(0)
+    img = cv2.resize(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8), (1024, 1024), interpolation=cv2.INTER_CUBIC)
+    report("{} page kernels, 1024x1024x3".format(len(PAGES)), img, PAGES,
+           best_of(lambda: independent(img, PAGES)), best_of(lambda: convolution.filter_bank(img, PAGES)))
+
+    small = img[:256, :256]
+    bank = [rng.standard_normal((31, 31)) / 31 for _ in range(8)]
+    assert all(convolution.choose_method(k.shape, small.size, False) == 'fft' for k in bank)
+    report("8 kernels 31x31 (FFT path), 256x256x3", small, bank,
+           best_of(lambda: independent_fft(small, bank)), best_of(lambda: convolution.filter_bank(small, bank)))
+
+    gray = cv2.cvtColor(cv2.resize(img, (2048, 2048)), cv2.COLOR_RGB2GRAY)
+    (wrapped, t_before) = best_of(lambda: reference_sobel(gray))
+    (fused, t_after) = best_of(lambda: convolution.gradient_magnitude(gray, kernels.sobel(1, 0, normalize=False),
+                                                                      kernels.sobel(0, 1, normalize=False)))
+    responses = exact(gray[..., None], [kernels.sobel(1, 0, normalize=False), kernels.sobel(0, 1, normalize=False)])
+    truth = np.hypot(responses[0], responses[1])[..., 0]
+    print("Sobel gradient magnitude, 2048x2048: {:.1f} ms -> {:.1f} ms, max error {:.0f} -> {:.1e}".format(
+        1e3 * t_before, 1e3 * t_after, np.abs(wrapped - truth).max(), np.abs(fused[..., 0] - truth).max()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Gaussian page: nested-loop kernel of the original page vs the shared kernel factory (tutorials/kernels.py).
+
+The reference below fills the kernel tap by tap with math.exp on every rerun. The
+factory builds it as the outer product of a sampled 1-D Gaussian, normalized to a
+unit sum, and caches it. Both kernels must have the same shape (they only differ
+by their normalization, 1 / pi for the original one). The build time is
+reported for every slider position of the page, first uncached, then
+cached (a rerun).
+
+Run from the repository root:  python tutorials/Convolution/benchmarks/gaussian_kernel.py
+"""
+import math
+import sys
+import time
+from os import path
+
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
+
+import kernels
+
+# kernel size and sigma sliders of the Gaussian page
+SIZES = range(7, 32, 4)
+SIGMAS = range(1, 11)
+
+
+def reference_kernel(n, sigma):
+    # kernel_gaus of the original Gaussian page
+    kernel_gaus = np.zeros((n, n), np.float32)
+    origin = (n - 1) / 2
+    for i in range(n):
+        for j in range(n):
+            kernel_gaus[i][j] = (1 / (2 * pow(math.pi * sigma, 2))) * math.exp(
+                -(pow(i - origin, 2) + pow(j - origin, 2)) / (2 * pow(sigma, 2)))
+    return kernel_gaus
+
+
+def per_kernel(fn):
+    t0 = time.perf_counter()
+    for n in SIZES:
+        for sigma in SIGMAS:
+            fn(n, sigma)
+    return (time.perf_counter() - t0) / (len(SIZES) * len(SIGMAS))
+
+
+def main():
+    for n in SIZES:
+        for sigma in SIGMAS:
+            before = reference_kernel(n, sigma).astype(np.float64)
+            after = kernels.gaussian(n, sigma, np.float32)
+            assert np.allclose(before / before.sum(), after, rtol=1e-5, atol=1e-9), "kernels differ"
+    print("{} kernels: same Gaussian, unit sum".format(len(SIZES) * len(SIGMAS)))
+
+    t_before = per_kernel(reference_kernel)
+    kernels._kernel.cache_clear()
+    t_cold = per_kernel(lambda n, sigma: kernels.gaussian(n, sigma, np.float32))
+    t_warm = per_kernel(lambda n, sigma: kernels.gaussian(n, sigma, np.float32))
+    print("per kernel: nested loop {:.3f} ms, outer product {:.4f} ms, cached {:.5f} ms".format(
+        1e3 * t_before, 1e3 * t_cold, 1e3 * t_warm))
+    print(kernels.cache_info())
+
+
+if __name__ == "__main__":
+    main()
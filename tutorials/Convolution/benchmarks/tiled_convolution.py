@@ -0,0 +1,96 @@
+"""
+Out-of-core convolution: in-memory do_convolution vs tiled.convolve_tiled, on a large .npy image.
+
+The in-memory path loads the whole image, convolves it (convolution.convolve_image,
+as do_convolution) and saves the result. The tiled path reads and writes the .npy
+files tile by tile through short-lived memory maps. Each run is made in a fresh
+process, which reports its time and peak resident memory; the two outputs are
+then compared band by band and must be identical. The parent process never maps
+the images, so that the peak memory the children inherit from it stays small.
+
+Run from the repository root:  python tutorials/Convolution/benchmarks/tiled_convolution.py
+"""
+import resource
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+from os import path
+
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+sys.path.insert(0, path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
+
+import convolution
+import kernels
+import tiled
+
+SHAPE = (8192, 8192, 3)
+KERNELS = {'Gaussian 31x31': ('gaussian', 31, 5), 'sharpen': ('sharpen',)}
+BAND = 512
+
+
+def kernel(spec):
+    if spec[0] == 'gaussian':
+        return kernels.gaussian(spec[1], spec[2], np.float32)
+    return np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(backend, spec, source, destination, queue):
+    base = peak_rss_mb()
+    t0 = time.perf_counter()
+    if backend == 'in memory':
+        np.save(destination, convolution.convolve_image(np.load(source), kernel(spec)))
+    else:
+        tiled.convolve_tiled(source, kernel(spec), destination)
+    queue.put((time.perf_counter() - t0, peak_rss_mb() - base))
+
+
+def write_image(file, queue):
+    rng = np.random.default_rng(0)
+    image = np.lib.format.open_memmap(file, mode='w+', dtype=np.uint8, shape=SHAPE)
+    for start in range(0, SHAPE[0], BAND):
+        image[start:start + BAND] = rng.integers(0, 256, (min(BAND, SHAPE[0] - start),) + SHAPE[1:], dtype=np.uint8)
+    image.flush()
+    del image
+    queue.put(None)
+
+
+def identical(a, b, queue):
+    a, b = np.load(a, mmap_mode='r'), np.load(b, mmap_mode='r')
+    queue.put(a.shape == b.shape and all(np.array_equal(a[start:start + BAND], b[start:start + BAND])
+                                         for start in range(0, a.shape[0], BAND)))
+
+
+def in_process(ctx, target, *args):
+    queue = ctx.Queue()
+    proc = ctx.Process(target=target, args=args + (queue,))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    ctx = get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        source = path.join(tmp, 'field.npy')
+        in_process(ctx, write_image, source)
+        print("image {}x{}x{} ({:.0f} MB), tiles {}x{}".format(*SHAPE, np.prod(SHAPE) / 1e6, *tiled.TILE_SHAPE))
+        for name, spec in KERNELS.items():
+            outputs = {}
+            for backend in ('in memory', 'tiled'):
+                outputs[backend] = path.join(tmp, backend.replace(' ', '_') + '.npy')
+                elapsed, rss = in_process(ctx, run, backend, spec, source, outputs[backend])
+                print("  {} {:>9}: {:6.2f} s, peak RSS +{:6.1f} MB".format(name, backend, elapsed, rss))
+            assert in_process(ctx, identical, outputs['in memory'], outputs['tiled']), "tiled result differs"
+            print("  {}: identical".format(name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Convolution engine of the Convolution tutorial.
+
+All the channels of an image are filtered in one call, by one of three methods:
+- 'direct': cv2.filter2D with the full 2-D kernel,
+- 'separable': kernels of rank one (Gaussian, box, Sobel), detected by SVD, as
+  two 1-D passes of cv2.sepFilter2D,
+- 'fft': product of the spectra (scipy.fft) of the padded image and of the kernel.
+The method is picked from the kernel size and the image size, with the crossovers
+measured by the kernel size x image size sweep of benchmarks/convolution_crossover.py.
+Every method reflects the border (BORDER_REFLECT_101, the default of cv2.filter2D),
+uses the anchor of cv2.filter2D and rounds and saturates integer results, so they
+all agree with cv2.filter2D within one grey level.
+
+Banks of kernels (filter_bank) are applied to one image in one call, returning a
+(K, H, W, C) float32 tensor; the FFT of the image is then computed once for all
+the kernels taking that path, and pairs of responses are combined by fused
+OpenCV passes (magnitude).
+"""
+
+import cv2
+import numpy as np
+import scipy.fft
+
+# a kernel is separable if its second singular value is below this fraction of the first
+RANK_TOLERANCE = 1e-5
+# smallest separable kernel side filtered in two 1-D passes (below it, cv2.filter2D is as fast)
+SEPARABLE_MIN_SIZE = 7
+# (largest image size in values, i.e. pixels x channels, smallest kernel side filtered by FFT), by
+# increasing image size (None: any size)
+FFT_MIN_SIZE = ((1_573_000, 15), (None, 63))
+FFT_MIN_SIZE_SEPARABLE = ((None, 63),)
+
+METHODS = ('direct', 'separable', 'fft')
+
+
+def separable_factors(kernel, tolerance=RANK_TOLERANCE):
+    """
+    Rank one decomposition of a 2-D kernel.
+    :return: (column, row) 1-D kernels with kernel = outer(column, row), or None if the kernel is not separable
+    """
+    kernel = np.asarray(kernel, dtype=np.float64)
+    if kernel.ndim != 2 or not kernel.any():
+        return None
+    u, s, vt = np.linalg.svd(kernel)
+    if len(s) > 1 and s[1] > tolerance * s[0]:
+        return None
+    scale = np.sqrt(s[0])
+    return u[:, 0] * scale, vt[0] * scale
+
+
+def _crossover(table, size):
+    for largest, kernel_side in table:
+        if largest is None or size <= largest:
+            return kernel_side
+
+
+def choose_method(kernel_shape, image_size, separable):
+    """
+    :param kernel_shape: (rows, columns) of the kernel
+    :param image_size: number of values of the image (pixels x channels)
+    :param separable: whether the kernel has rank one
+    :return: fastest method of METHODS according to the measured crossovers
+    """
+    side = max(kernel_shape)
+    fft_side = _crossover(FFT_MIN_SIZE_SEPARABLE if separable else FFT_MIN_SIZE, image_size)
+    if fft_side is not None and side >= fft_side:
+        return 'fft'
+    if separable and side >= SEPARABLE_MIN_SIZE:
+        return 'separable'
+    return 'direct'
+
+
+class _Spectrum:
+    """
+    Spectrum of an image padded (reflected) for kernels up to a given size, computed once for any
+    number of kernels: the kernel (r, c) anchored at (r // 2, c // 2), as cv2.filter2D, reads the
+    padded image from (top - r // 2, left - c // 2).
+    """
+
+    def __init__(self, image, kernel_shapes):
+        self.image_shape = image.shape
+        self.top = max(rows // 2 for rows, _ in kernel_shapes)
+        self.left = max(columns // 2 for _, columns in kernel_shapes)
+        bottom = max(rows - 1 - rows // 2 for rows, _ in kernel_shapes)
+        right = max(columns - 1 - columns // 2 for _, columns in kernel_shapes)
+        padded = cv2.copyMakeBorder(image, self.top, bottom, self.left, right, cv2.BORDER_REFLECT_101)
+        # channels first, so that every transform runs along contiguous axes
+        channels = np.ascontiguousarray(np.moveaxis(padded.reshape(padded.shape[:2] + (-1,)), -1, 0),
+                                        dtype=np.float32)
+        # no wrap-around reaches the cropped output: the padding covers the largest kernel
+        self.shape = [scipy.fft.next_fast_len(n, real=True) for n in channels.shape[1:]]
+        self.spectrum = scipy.fft.rfft2(channels, self.shape)
+
+    def filter(self, kernel):
+        """
+        :return: (C, H, W) float32 correlation with kernel
+        """
+        rows, columns = kernel.shape
+        # correlation: product with the spectrum of the flipped kernel
+        product = self.spectrum * scipy.fft.rfft2(kernel[::-1, ::-1].astype(np.float32), self.shape)
+        y, x = self.top - rows // 2 + rows - 1, self.left - columns // 2 + columns - 1
+        return scipy.fft.irfft2(product, self.shape, overwrite_x=True)[:, y:y + self.image_shape[0],
+                                                                         x:x + self.image_shape[1]]
+
+
+def _fft_filter(image, kernel):
+    out = _Spectrum(image, [kernel.shape]).filter(kernel)
+    return np.moveaxis(out, 0, -1).reshape(image.shape)
+
+
+def saturate(values, dtype=np.uint8):
+    """
+    :return: values rounded and saturated to an integer dtype, as OpenCV's saturate_cast (cast for floats)
+    """
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        values = np.clip(np.rint(values), info.min, info.max)
+    return values.astype(dtype)
+
+
+def _filter(image, kernel, method, ddepth=-1, dst=None):
+    factors = separable_factors(kernel) if method in (None, 'separable') else None
+    if method is None:
+        method = choose_method(kernel.shape, image.size, factors is not None)
+    if method == 'direct':
+        return cv2.filter2D(image, ddepth, kernel, dst=dst, borderType=cv2.BORDER_REFLECT_101)
+    if method == 'separable':
+        if factors is None:
+            raise ValueError("[error] kernel is not separable")
+        column, row = factors
+        return cv2.sepFilter2D(image, ddepth, row, column, dst=dst, borderType=cv2.BORDER_REFLECT_101)
+    if method == 'fft':
+        values = _fft_filter(image, kernel)
+        if dst is None:
+            return saturate(values, image.dtype)
+        np.copyto(dst, values, casting='unsafe')
+        return dst
+    raise ValueError("[error] convolution method wrong: {}".format(method))
+
+
+def filter_image(image, kernel, method=None):
+    """
+    Correlation of all the channels of `image` with `kernel`, as cv2.filter2D(image, -1, kernel).
+    :param image: (H, W) or (H, W, C) array
+    :param kernel: 2-D array
+    :param method: one of METHODS; None: chosen by choose_method
+    :return: array of the shape and type of image
+    """
+    return _filter(np.ascontiguousarray(image), np.asarray(kernel), method)
+
+
+def _scalar(values):
+    # per-channel values as an OpenCV scalar
+    return tuple(float(v) for v in values) + (0.0,) * (4 - len(values))
+
+
+def filter_normalized(image, kernel, per_channel=True, method=None, out=None, buffers=None):
+    """
+    Correlation accumulated in float32 and stretched to the 8-bit range, without saturating the filtered
+    values: [min(lowest, 0), highest] -> [0, 255], with the extremes of each channel or of the whole image.
+    Non-negative results (blurs) are thus only scaled by 255 / highest, and the negative responses of
+    sharpening or edge kernels are kept instead of clipped.
+    :param image: (H, W) or (H, W, C) array, at most 4 channels
+    :param per_channel: stretch every channel by its own extremes (False: by the extremes of all channels)
+    :param out: uint8 array of the shape of image to write to (None: allocated)
+    :param buffers: dict keeping the float32 accumulator from one call to the next (e.g. st.session_state)
+    :return: out
+    """
+    image = np.ascontiguousarray(image)
+    buffers = {} if buffers is None else buffers
+    accumulator = buffers.get('accumulator')
+    if accumulator is None or accumulator.shape != image.shape:
+        accumulator = buffers['accumulator'] = np.empty(image.shape, np.float32)
+    _filter(image, np.asarray(kernel), method, cv2.CV_32F, accumulator)
+
+    return normalize_to_uint8(accumulator, per_channel, out)
+
+
+def normalize_to_uint8(values, per_channel=True, out=None):
+    """
+    Stretch float32 filter responses to the 8-bit range as filter_normalized does (`values` is modified).
+    :param values: (H, W) or (H, W, C) float32 array, at most 4 channels
+    :return: out, uint8 array of the shape of values
+    """
+    # extremes reduced row against row (contiguous, SIMD), then over one row
+    channels = values.shape[2] if values.ndim == 3 else 1
+    rows = values.reshape(values.shape[0], -1)
+    low = rows.min(axis=0).reshape(-1, channels).min(axis=0)
+    high = rows.max(axis=0).reshape(-1, channels).max(axis=0)
+    if not per_channel:
+        low, high = np.full(channels, low.min()), np.full(channels, high.max())
+    low = np.minimum(low, 0)
+    scale = 255 / np.where(high > low, high - low, 1)
+
+    # one fused pass: scale, round and saturate into the 8-bit output
+    out = np.empty(values.shape, np.uint8) if out is None else out
+    if np.any(low < 0):
+        cv2.subtract(values, _scalar(low), dst=values)
+    cv2.multiply(values, _scalar(scale), dst=out, dtype=cv2.CV_8U)
+    return out
+
+
+def filter_bank(image, kernels, method=None, out=None):
+    """
+    Responses of `image` to a bank of kernels, accumulated in float32.
+    Direct and separable kernels are filtered by OpenCV straight into their slice of the output (OpenCV
+    pads the rows it reads on the fly); the kernels taking the FFT path share one padded image and its
+    spectrum, so each of them only costs a spectrum product and an inverse transform.
+    :param image: (H, W) or (H, W, C) array
+    :param kernels: sequence of K 2-D kernels (of any sizes)
+    :param method: one of METHODS for every kernel; None: chosen per kernel by choose_method
+    :param out: (K, H, W, C) float32 array to write to (None: allocated)
+    :return: (K, H, W, C) float32 array (C = 1 for a 2-D image)
+    """
+    image = np.ascontiguousarray(image)
+    kernels = [np.asarray(kernel) for kernel in kernels]
+    shape = image.shape[:2] + ((image.shape[2],) if image.ndim == 3 else (1,))
+    out = np.empty((len(kernels),) + shape, np.float32) if out is None else out
+
+    methods = []
+    for kernel in kernels:
+        factors = separable_factors(kernel) if method in (None, 'separable') else None
+        methods.append((method or choose_method(kernel.shape, image.size, factors is not None), factors))
+    fft_shapes = [kernel.shape for kernel, (m, _) in zip(kernels, methods) if m == 'fft']
+    spectrum = _Spectrum(image, fft_shapes) if fft_shapes else None
+
+    for response, kernel, (m, factors) in zip(out, kernels, methods):
+        dst = response.reshape(image.shape)
+        if m == 'direct':
+            cv2.filter2D(image, cv2.CV_32F, kernel, dst=dst, borderType=cv2.BORDER_REFLECT_101)
+        elif m == 'separable':
+            if factors is None:
+                raise ValueError("[error] kernel is not separable")
+            column, row = factors
+            cv2.sepFilter2D(image, cv2.CV_32F, row, column, dst=dst, borderType=cv2.BORDER_REFLECT_101)
+        elif m == 'fft':
+            np.copyto(response, np.moveaxis(spectrum.filter(kernel), 0, -1))
+        else:
+            raise ValueError("[error] convolution method wrong: {}".format(m))
+    return out
+
+
+def magnitude(responses, out=None):
+    """
+    Fused sqrt(x^2 + y^2) of a pair of responses (e.g. the x and y Sobel responses of filter_bank).
+    :param responses: (2, ...) float32 array
+    :param out: float32 array of the shape of a response (may be responses[0])
+    :return: out
+    """
+    x, y = responses[0], responses[1]
+    out = np.empty(x.shape, np.float32) if out is None else out
+    rows = x.shape[0]
+    cv2.magnitude(x.reshape(rows, -1), y.reshape(rows, -1), magnitude=out.reshape(rows, -1))
+    return out
+
+
+def gradient_magnitude(image, kernel_x, kernel_y, method=None):
+    """
+    Gradient magnitude of `image` for a pair of derivative kernels, in float32: one bank of two kernels,
+    then one fused pass written over the x response.
+    :return: (H, W, C) float32 array
+    """
+    responses = filter_bank(image, [kernel_x, kernel_y], method)
+    return magnitude(responses, out=responses[0])
+
+
+def convolve_image(image, kernel, method=None):
+    """
+    Convolution (flipped kernel) of all the channels of `image` with `kernel`.
+    """
+    return filter_image(image, np.ascontiguousarray(np.asarray(kernel)[::-1, ::-1]), method)
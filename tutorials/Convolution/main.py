@@ -9,7 +9,14 @@ import streamlit as st
 from PIL import Image
 import cv2 
 import numpy as np
-import math
+import sys
+from os import path
+
+import convolution
+
+# kernels shared with the other tutorials
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+import kernels
 
 
 def main():
@@ -17,7 +24,7 @@ def main():
     selected_box = st.sidebar.selectbox(
     'Choose one of the following',
     ('Welcome','What is Convolution?','Blurring Kernel','Sharpening Kernel', 
-     'Edge Detector', 'Gaussian Kernel','Sobel Kernel','Corner Detector')
+     'Edge Detector', 'Gaussian Kernel','Sobel Kernel','Corner Detector','Compare Kernels')
     )
     
     if selected_box == 'Welcome':
@@ -36,6 +43,8 @@ def main():
         corner_detector_kernel()
     if selected_box == 'Sharpening Kernel':
         sharpen_kernel()
+    if selected_box == 'Compare Kernels':
+        compare_kernels()
 
 def welcome():
     
@@ -160,28 +169,16 @@ def display_image(op):
     
 def do_convolution(img, op, kernel):
     
-    #rgb channels
-    kernel = cv2.flip(kernel,-1)
-    op1 = cv2.filter2D(img[:,:,0],-1,kernel)
-    op2 = cv2.filter2D(img[:,:,1],-1,kernel)
-    op3 = cv2.filter2D(img[:,:,2],-1,kernel)
-    # combine the channels
-    op[...,0] = op1
-    op[...,1] = op2
-    op[...,2] = op3
+    #rgb channels in one call (separable kernels in two 1-D passes, large ones by FFT)
+    op[...] = convolution.convolve_image(img[:,:,:3], kernel)
     return op
 
 def do_convolution_norm(img, op, kernel):
     
-    #rgb channels
-    op1 = cv2.filter2D(img[:,:,0],-1,kernel)
-    op2 = cv2.filter2D(img[:,:,1],-1,kernel)
-    op3 = cv2.filter2D(img[:,:,2],-1,kernel)
-    # combine the channels
-    op[...,0] = np.multiply(op1, 255.0/np.amax(op1))
-    op[...,1] = np.multiply(op2, 255.0/np.amax(op2))
-    op[...,2] = np.multiply(op3, 255.0/np.amax(op3))
-    return op
+    #rgb channels in one call, accumulated in float32 and normalized to the 8-bit range per channel
+    #(the accumulator is kept between reruns)
+    buffers = st.session_state.setdefault('convolution_buffers', {})
+    return convolution.filter_normalized(img[:,:,:3], kernel, out=op, buffers=buffers)
 
 def gausian_kernel():
     #Gaussian kernel
@@ -219,12 +216,8 @@ def gausian_kernel():
         st.subheader("Convolution with Gaussian kernel")
         n = st.slider('Change kernel size of Gaussian kernel',min_value = 7,max_value = 31,step=4)
         sigma = st.slider('Change sigma for Gaussian',min_value = 1,max_value = 10,step=1)
-        # Gaussian kernel generation
-        kernel_gaus = np.zeros((n,n),np.float32)
-        origin = (n-1)/2
-        for i in range(n):
-            for j in range(n):
-                kernel_gaus[i][j] = (1/(2*pow(math.pi*sigma,2)))*math.exp( -(pow(i-origin,2) +pow(j-origin,2))/ (2*pow(sigma,2)))
+        # Gaussian kernel (cached, sum 1)
+        kernel_gaus = kernels.gaussian(n,sigma,np.float32)
         op_gauss = np.zeros((img_len1,img_len2,3), 'uint8')
         op_gauss = do_convolution_norm(img,op_gauss,kernel_gaus)
         display_image(op_gauss)
@@ -265,7 +258,7 @@ def blurring_kernel():
         st.subheader("Convolution with blurring filter")
         x = st.slider('Change Threshold value for blurring',min_value = 5,max_value = 25) 
         #blur kernel
-        kernel_blur = np.ones((x,x),np.float32)/(x*x)
+        kernel_blur = kernels.box(x,np.float32)
         op_blur = do_convolution(img,op_blur,kernel_blur)
         display_image(op_blur)
         if st.button('See the Blurring Kernel'):
@@ -305,11 +298,15 @@ def sobel_kernel():
         st.image(img, use_column_width=True,clamp = True)
         img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         st.subheader("Convolution with Sobel kernels") 
-        kernel_sobelx = np.array([[-1,0,1], [-2, 0,2], [-1,0,1]])
-        kernel_sobely = np.array([[1,2,1], [0, 0,0], [-1,-2,-1]])
-        opx= cv2.filter2D(img_gray,-1,kernel_sobelx)
-        opy= cv2.filter2D(img_gray,-1,kernel_sobely)
-        op_sobel = np.sqrt(pow(opx,2) +pow(opy,2))
+        kernel_sobelx = kernels.sobel(1,0,normalize=False,dtype=int)
+        kernel_sobely = -kernels.sobel(0,1,normalize=False,dtype=int)
+        # both kernels in one bank (float32 responses), clipped to 8 bits for display
+        responses = convolution.filter_bank(img_gray,[kernel_sobelx,kernel_sobely])
+        opx= convolution.saturate(responses[0,...,0])
+        opy= convolution.saturate(responses[1,...,0])
+        # fused gradient magnitude, scaled to [0, 1]
+        op_sobel = convolution.magnitude(responses)[...,0]
+        op_sobel = op_sobel/max(np.amax(op_sobel),1)
         st.text('Vertical edges:')
         st.image(opx, use_column_width=True,clamp = True)
         if st.button('See the Sobel Kernel for horizontal intensity change (vertical edges)'):
@@ -348,7 +345,10 @@ def edge_detector_kernel():
         st.subheader("Convolution with edge detection kernel")
         kernel_edge = np.array([[-2,-2,-2], [-2, 16,-2], [-2,-2,-2]])
         op_edge = np.zeros((img_len1,img_len2,3), 'uint8')
-        op_edge = do_convolution(img,op_edge, kernel_edge)
+        if st.checkbox('Normalize to the full range instead of clipping', key='edge_norm'):
+            op_edge = do_convolution_norm(img,op_edge, kernel_edge)
+        else:
+            op_edge = do_convolution(img,op_edge, kernel_edge)
         display_image(op_edge)
         if st.button('See the Laplacian Kernel'):
             st.text(kernel_edge)
@@ -382,7 +382,7 @@ def corner_detector_kernel():
         #corner detection
         st.subheader("Convolution with corner detection kernel")
         kernel_corner = np.array([[1,-2,1], [-2, 4,-2], [1,-2,1]]) 
-        op_gray= cv2.filter2D(img_gray,-1,kernel_corner)
+        op_gray= convolution.filter_image(img_gray,kernel_corner)
         display_image(op_gray)
         if st.button('See the Corner Detection Kernel'):
             st.text(kernel_corner)
@@ -418,12 +418,43 @@ def sharpen_kernel():
         sh = st.slider('Change Threshold value',min_value = 1.0,max_value = 5.0, step=0.2) 
         kernel_sharp = np.array([[0,-sh,0], [-sh, 5*sh,-sh], [0,-sh,0]])
         op_sharp = np.zeros((img_len1,img_len2,3), 'uint8')
-        op_sharp = do_convolution(img,op_sharp,kernel_sharp)
+        if st.checkbox('Normalize to the full range instead of clipping', key='sharp_norm'):
+            op_sharp = do_convolution_norm(img,op_sharp,kernel_sharp)
+        else:
+            op_sharp = do_convolution(img,op_sharp,kernel_sharp)
         display_image(op_sharp)
         if st.button('See the Sharpening Kernel'):
             st.text(kernel_sharp)
         st.markdown("***")
         
+def compare_kernels():
+    st.header('Compare Kernels')
+
+    st.write('All the kernels of this app applied to the same image, as one bank of kernels: the responses are computed in one call and each of them is normalized to the full 8-bit range.')
+
+    uploaded_file = st.file_uploader("Choose an image...", type=["jpeg","png","jpg"])
+    if uploaded_file is not None:
+        img = Image.open(uploaded_file)
+        img= np.array(img.convert('RGB'))
+
+        st.subheader("Original image")
+        st.image(img, use_column_width=True,clamp = True)
+        bank = {'Gaussian (15x15, sigma 3)': kernels.gaussian(15,3,np.float32),
+                'Blurring (9x9)': kernels.box(9,np.float32),
+                'Sobel (vertical edges)': kernels.sobel(1,0,normalize=False),
+                'Sobel (horizontal edges)': -kernels.sobel(0,1,normalize=False),
+                'Edge detector': np.array([[-2,-2,-2], [-2, 16,-2], [-2,-2,-2]]),
+                'Corner detector': np.array([[1,-2,1], [-2, 4,-2], [1,-2,1]]),
+                'Sharpening': np.array([[0,-1,0], [-1, 5,-1], [0,-1,0]])}
+        # convolution: flipped kernels
+        responses = convolution.filter_bank(img,[np.ascontiguousarray(k[::-1,::-1]) for k in bank.values()])
+        columns = st.columns(2)
+        for i, (name, response) in enumerate(zip(bank, responses)):
+            with columns[i % 2]:
+                st.text(name)
+                st.image(convolution.normalize_to_uint8(response), use_column_width=True,clamp = True)
+        st.markdown("***")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
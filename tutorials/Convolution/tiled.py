@@ -0,0 +1,153 @@
+"""
+Tiled, out-of-core convolution for images larger than memory.
+
+The convolution of the app (do_convolution: convolution.convolve_image) is run
+tile by tile. Every tile is read with a halo of the kernel radius, convolved on
+its own in a thread pool (OpenCV releases the GIL) and its center written to
+the output. Images on disk are .npy files, read and written through memory
+maps of the rows of one tile only, opened for the duration of the tile: the
+resident memory is bounded by the tile size times the number of workers,
+whatever the size of the image.
+
+The tiles match the in-memory convolution bit for bit when OpenCV computes it
+pixel by pixel: the method is chosen once for the whole image, and the read
+window of every tile starts on a multiple of ALIGNMENT rows and columns and
+extends ALIGNMENT beyond the halo, so that the vectorized loops see every kept
+pixel as they do in the whole image and their scalar tails fall in the
+discarded margin. That covers the separable kernels of any size and the other
+kernels below OpenCV's DFT threshold (DFT_MIN_AREA taps); the FFT paths depend
+on the size of the transform, so they only agree within one grey level.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import convolution
+
+TILE_SHAPE = (1024, 1024)
+ALIGNMENT = 64
+# cv2.filter2D filters 8-bit and float32 images through a DFT from this many taps on (dftFilter2D)
+DFT_MIN_AREA = 130
+
+
+class _NpyImage:
+    """
+    Image stored in a .npy file, mapped one band of rows at a time.
+    """
+
+    def __init__(self, path, shape=None, dtype=None):
+        self.path = path
+        if shape is not None:
+            # create the file (header and sparse data)
+            image = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=tuple(shape))
+            del image
+        image = np.load(path, mmap_mode='r')
+        if not image.flags.c_contiguous:
+            raise ValueError("[error] image must be stored in C order: {}".format(path))
+        self.shape, self.dtype, self.offset = image.shape, image.dtype, image.offset
+        del image
+        self.row_bytes = int(np.prod(self.shape[1:], dtype=np.int64)) * self.dtype.itemsize
+
+    def rows(self, start, stop, mode='r'):
+        return np.memmap(self.path, dtype=self.dtype, mode=mode, offset=self.offset + start * self.row_bytes,
+                         shape=(stop - start,) + self.shape[1:])
+
+    def read(self, rows, columns):
+        band = self.rows(*rows)
+        tile = np.array(band[:, columns[0]:columns[1]])
+        del band
+        return tile
+
+    def write(self, corner, tile):
+        band = self.rows(corner[0], corner[0] + tile.shape[0], mode='r+')
+        band[:, corner[1]:corner[1] + tile.shape[1]] = tile
+        del band
+
+
+class _ArrayImage:
+    """
+    Image held by an array (or any object with numpy 2-D slicing).
+    """
+
+    def __init__(self, array):
+        self.array = array
+        self.shape, self.dtype = array.shape, np.dtype(array.dtype)
+
+    def read(self, rows, columns):
+        return np.ascontiguousarray(self.array[rows[0]:rows[1], columns[0]:columns[1]])
+
+    def write(self, corner, tile):
+        self.array[corner[0]:corner[0] + tile.shape[0], corner[1]:corner[1] + tile.shape[1]] = tile
+
+
+def _open(image, shape=None, dtype=None):
+    if isinstance(image, (str, os.PathLike)):
+        return _NpyImage(image, shape, dtype)
+    return _ArrayImage(image)
+
+
+def tiled_method(kernel, image_shape, method=None):
+    """
+    :return: method of convolution.METHODS used for the whole image, and whether the tiles are bit-exact
+    """
+    kernel = np.asarray(kernel)
+    separable = convolution.separable_factors(kernel) is not None
+    if method is None:
+        method = convolution.choose_method(kernel.shape, int(np.prod(image_shape)), separable)
+    exact = method == 'separable' or (method == 'direct' and kernel.size < DFT_MIN_AREA)
+    return method, exact
+
+
+def _windows(shape, tile_shape, halo):
+    # output tile (start, stop) and read window (start, stop) along one axis
+    (before, after), (size, tile) = halo, (shape, tile_shape)
+    for start in range(0, size, tile):
+        stop = min(size, start + tile)
+        read_start = max(0, (start - before) // ALIGNMENT * ALIGNMENT)
+        read_stop = min(size, stop + after + ALIGNMENT)
+        yield (start, stop), (read_start, read_stop)
+
+
+def convolve_tiled(source, kernel, destination=None, tile_shape=TILE_SHAPE, workers=None, method=None, exact=True):
+    """
+    Convolution (flipped kernel, as do_convolution) of an image, tile by tile.
+    :param source: path of a .npy image (H, W[, C]), or an array
+    :param kernel: 2-D kernel
+    :param destination: path of the .npy file to create, or an array of the shape and type of the source;
+        None: array allocated in memory
+    :param tile_shape: (rows, columns) of the output tiles
+    :param workers: threads (None: number of CPUs)
+    :param method: one of convolution.METHODS (None: chosen for the whole image)
+    :param exact: refuse the kernels for which the tiles would not match the in-memory result bit for bit
+    :return: destination
+    """
+    kernel = np.ascontiguousarray(np.asarray(kernel)[::-1, ::-1])
+    source_image = _open(source)
+    shape, dtype = source_image.shape, source_image.dtype
+    method, bit_exact = tiled_method(kernel, shape, method)
+    if exact and not bit_exact:
+        raise ValueError("[error] {} convolution with a {}x{} kernel is not bit-exact in tiles "
+                         "(exact=False accepts one grey level)".format(method, *kernel.shape))
+    if destination is None:
+        destination = np.empty(shape, dtype)
+    destination_image = _open(destination, shape, dtype)
+
+    # halo: kernel radius on each side (anchor of cv2.filter2D at the center, rounded down)
+    rows, columns = kernel.shape
+    halo = ((rows // 2, rows - 1 - rows // 2), (columns // 2, columns - 1 - columns // 2))
+    tiles = [(y, x) for y in _windows(shape[0], tile_shape[0], halo[0])
+             for x in _windows(shape[1], tile_shape[1], halo[1])]
+
+    def convolve_tile(tile):
+        ((y0, y1), (read_y0, read_y1)), ((x0, x1), (read_x0, read_x1)) = tile
+        values = source_image.read((read_y0, read_y1), (read_x0, read_x1))
+        out = convolution.filter_image(values, kernel, method)
+        destination_image.write((y0, x0), out[y0 - read_y0:y1 - read_y0, x0 - read_x0:x1 - read_x0])
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        # consume the results, so that errors of the tiles are raised
+        for _ in executor.map(convolve_tile, tiles):
+            pass
+    return destination
@@ -8,6 +8,12 @@ import imageio
 from load_css import local_css
 import matplotlib.pyplot as plt
 from scipy import ndimage
+import sys
+from os import path
+
+# kernels shared with the other tutorials
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+import kernels
 
 local_css("style.css")
 
@@ -501,7 +507,7 @@ def neighborhood():
         
 
         # Convolving with the appropriate kernel for each channel
-        kernel = np.ones((dims,dims),np.float32)/(dims*dims)
+        kernel = kernels.box(dims,np.float32)
         blur_image_r = ndimage.convolve(converted_img[:,:,0], kernel, mode='constant', cval=0.0)
         blur_image_g = ndimage.convolve(converted_img[:,:,1], kernel, mode='constant', cval=0.0)
         blur_image_b = ndimage.convolve(converted_img[:,:,2], kernel, mode='constant', cval=0.0)
@@ -543,7 +549,7 @@ def neighborhood():
 
 
             # Convolving with the appropriate kernel for each channel
-            kernel = np.ones((dims,dims),np.float32)/(dims*dims)
+            kernel = kernels.box(dims,np.float32)
             blur_image_r = ndimage.convolve(converted_img[:,:,0], kernel, mode='constant', cval=0.0)
             blur_image_g = ndimage.convolve(converted_img[:,:,1], kernel, mode='constant', cval=0.0)
             blur_image_b = ndimage.convolve(converted_img[:,:,2], kernel, mode='constant', cval=0.0)
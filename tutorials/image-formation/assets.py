@@ -0,0 +1,149 @@
+"""
+Lazy, cached loading of the images used by the image formation app.
+
+Images are only fetched the first time a page needs them. A download is stored
+in a local content-addressed cache (files named by their SHA-256, plus an index
+from URL to digest), so later cold starts read it from disk. Without network
+(or with IMAGE_FORMATION_OFFLINE=1) a fallback image bundled in `fallback/` is
+used instead. Decoded images are memoized in memory, so Streamlit reruns do not
+touch the disk at all.
+"""
+
+import hashlib
+import http.client
+import json
+import os
+import tempfile
+import urllib.request
+from functools import lru_cache
+from io import BytesIO
+from os import path
+
+import cv2 as cv
+import numpy as np
+from PIL import Image
+
+APP_DIR = path.dirname(path.abspath(__file__))
+FALLBACK_DIR = path.join(APP_DIR, 'fallback')
+CACHE_DIR = os.environ.get('IMAGE_FORMATION_CACHE', path.join(path.expanduser('~'), '.cache', 'image-formation'))
+DOWNLOAD_TIMEOUT = 5.0
+
+# name: (url, bundled fallback)
+ASSETS = {
+    'pinhole_subject': ('https://i.imgur.com/MHlfq0o.png', 'subject.png'),
+    'pinhole_background': ('https://wallpapercave.com/wp/JYodMo6.jpg', 'background.jpg'),
+    'homography': ('https://images.unsplash.com/photo-1613048998835-efa6e3e3dc1b?ixlib=rb-1.2.1&ixid=MnwxMjA3fDB8MHxw'
+                   'aG90by1wYWdlfHx8fGVufDB8fHx8&auto=format&fit=crop&w=1074&q=80', 'homography.jpg'),
+}
+
+
+def _index_path(cache_dir):
+    return path.join(cache_dir, 'index.json')
+
+
+def _read_index(cache_dir):
+    try:
+        with open(_index_path(cache_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _cached_file(url, cache_dir):
+    # file of `url` in the cache, if present and intact
+    digest = _read_index(cache_dir).get(url)
+    if digest is None:
+        return None
+    file = path.join(cache_dir, digest)
+    if not path.exists(file):
+        return None
+    with open(file, 'rb') as f:
+        if hashlib.sha256(f.read()).hexdigest() != digest:
+            return None
+    return file
+
+
+def _write_atomic(file, content, mode='wb'):
+    # write to a unique temporary file in the same directory, then rename, so that concurrent sessions (threads
+    # or processes) never write to the same file nor read a partial one
+    with tempfile.NamedTemporaryFile(mode, dir=path.dirname(file), suffix='.tmp', delete=False) as f:
+        tmp = f.name
+        try:
+            f.write(content)
+        except BaseException:
+            f.close()
+            os.remove(tmp)
+            raise
+    os.replace(tmp, file)
+
+
+def _download(url, cache_dir):
+    # fetch `url` into the cache and return its path
+    with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as response:
+        content = response.read()
+    Image.open(BytesIO(content)).verify()
+    digest = hashlib.sha256(content).hexdigest()
+    os.makedirs(cache_dir, exist_ok=True)
+    file = path.join(cache_dir, digest)
+    _write_atomic(file, content)
+
+    index = _read_index(cache_dir)
+    index[url] = digest
+    _write_atomic(_index_path(cache_dir), json.dumps(index, indent=1), 'w')
+    return file
+
+
+def asset_path(name, cache_dir=None, offline=None):
+    """
+    Local path of an asset: cached download, fresh download or bundled fallback.
+    :param name: key of ASSETS
+    :param cache_dir: cache directory (default CACHE_DIR)
+    :param offline: skip the network (default: IMAGE_FORMATION_OFFLINE environment variable)
+    :return: path to an image file
+    """
+    url, fallback = ASSETS[name]
+    cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+    if offline is None:
+        offline = os.environ.get('IMAGE_FORMATION_OFFLINE', '') not in ('', '0')
+
+    file = _cached_file(url, cache_dir)
+    if file is None and not offline:
+        try:
+            file = _download(url, cache_dir)
+        except (OSError, http.client.HTTPException, SyntaxError):
+            # network and I/O errors (URLError, timeouts, disk), truncated responses, and content PIL cannot
+            # read (UnidentifiedImageError is an OSError, broken image files raise SyntaxError)
+            file = None
+    return file or path.join(FALLBACK_DIR, fallback)
+
+
+@lru_cache(maxsize=None)
+def load_asset(name):
+    """
+    Decoded image of an asset, loaded once per process.
+    :param name: key of ASSETS
+    :return: PIL image (treat as read-only: it is shared by all sessions)
+    """
+    image = Image.open(asset_path(name))
+    image.load()
+    return image
+
+
+@lru_cache(maxsize=None)
+def pinhole_subject():
+    """
+    RGBA subject of the pinhole camera page: pixels of the black backdrop are made transparent.
+    :return: PIL image (RGBA, read-only)
+    """
+    rgb = np.asarray(load_asset('pinhole_subject').convert('RGB'))
+    gray = cv.cvtColor(rgb, cv.COLOR_RGB2GRAY)
+    _, alpha = cv.threshold(gray, 0, 255, cv.THRESH_BINARY)
+    return Image.fromarray(np.dstack([rgb, alpha]), 'RGBA')
+
+
+def pinhole_background():
+    """
+    Background of the pinhole camera page.
+    :return: PIL image (read-only)
+    """
+    return load_asset('pinhole_background')
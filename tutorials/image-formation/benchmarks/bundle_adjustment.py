@@ -0,0 +1,101 @@
+"""
+Full calibration: closed form, extrinsics and bundle adjustment of calibration.py.
+
+Synthetic views of a 9x6 chessboard (30 mm squares) are projected with a known
+camera and lens distortion (random poses, 0.1 px noise). For an increasing
+number of views, calibration.calibrate_camera is compared with
+cv.calibrateCamera (same camera model without skew) on the recovered
+parameters and the time, and its sparse (Schur complement) Levenberg-Marquardt
+step with a dense solve of the same problem by scipy.optimize.least_squares,
+whose cost grows cubically with the number of views.
+
+Run from the repository root:  python tutorials/image-formation/benchmarks/bundle_adjustment.py
+"""
+import sys
+import time
+from os import path
+
+import cv2 as cv
+import numpy as np
+from scipy import optimize as opt
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import calibration
+
+TRUE_A = np.array([[800., 0., 320.], [0., 780., 240.], [0., 0., 1.]])
+TRUE_DISTORTION = np.array([-0.2, 0.08, 0.001, -0.0015, 0.0])
+IMAGE_SIZE = (640, 480)
+VIEWS = (5, 10, 20, 40, 80, 160)
+DENSE_MAX_VIEWS = 40
+
+
+def synthetic_views(views, rng):
+    objp = np.indices((9, 6)).T.reshape(-1, 2).astype(np.float64) * 30
+    image_points = []
+    for _ in range(views):
+        rvec = rng.uniform(-0.5, 0.5, 3)
+        tvec = np.array([-120., -75., 600.]) + rng.uniform(-40, 40, 3)
+        projected, _ = cv.projectPoints(np.column_stack([objp, np.zeros(len(objp))]), rvec, tvec,
+                                        TRUE_A, TRUE_DISTORTION)
+        image_points.append(projected.reshape(-1, 2) + rng.normal(0, 0.1, (len(objp), 2)))
+    return np.array(image_points), np.broadcast_to(objp, (views,) + objp.shape)
+
+
+def dense_bundle_adjust(image_points, object_points, A, rvecs, tvecs):
+    # the same problem for scipy's trust region solver, with a dense Jacobian
+    views = len(image_points)
+    x0 = np.concatenate([[A[0, 0], A[1, 1], A[0, 1], A[0, 2], A[1, 2]], np.zeros(5), np.hstack([rvecs, tvecs]).ravel()])
+
+    def residuals(p):
+        A = np.array([[p[0], p[2], p[3]], [0, p[1], p[4]], [0, 0, 1.0]])
+        poses = p[10:].reshape(views, 6)
+        return (calibration.project_points(object_points, A, p[5:10], poses[:, :3], poses[:, 3:])
+                - image_points).ravel()
+
+    result = opt.least_squares(residuals, x0, method='trf', x_scale='jac')
+    return np.sqrt(np.sum(result.fun ** 2) / (result.fun.size // 2))
+
+
+def errors(A, distortion):
+    return (np.abs(A[[0, 1, 0, 1], [0, 1, 2, 2]] - TRUE_A[[0, 1, 0, 1], [0, 1, 2, 2]]).max(),
+            np.abs(np.asarray(distortion)[:4] - TRUE_DISTORTION[:4]).max())
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for views in VIEWS:
+        image_points, object_points = synthetic_views(views, rng)
+
+        t0 = time.perf_counter()
+        A, distortion, rvecs, tvecs, rms = calibration.calibrate_camera(image_points, object_points, IMAGE_SIZE)
+        t_ours = time.perf_counter() - t0
+
+        object_3d = [np.column_stack([objp, np.zeros(len(objp))]).astype(np.float32) for objp in object_points]
+        t0 = time.perf_counter()
+        rms_cv, A_cv, distortion_cv, _, _ = cv.calibrateCamera(object_3d, list(image_points.astype(np.float32)),
+                                                               IMAGE_SIZE, None, None)
+        t_cv = time.perf_counter() - t0
+
+        print("{:3d} views: RMS {:.4f} px (OpenCV {:.4f}), max error intrinsics {:.2f} px (OpenCV {:.2f}), "
+              "distortion {:.4f} (OpenCV {:.4f}); {:.3f} s (OpenCV {:.3f} s)".format(
+                  views, rms, rms_cv, *errors(A, distortion)[:1], errors(A_cv, distortion_cv.ravel())[0],
+                  errors(A, distortion)[1], errors(A_cv, distortion_cv.ravel())[1], t_ours, t_cv))
+
+        A_0, H = calibration.calibrate(image_points, object_points, refine=True)
+        R, t = calibration.view_extrinsics(A_0, H)
+        rvecs_0 = calibration.rotation_vectors(R)
+        t0 = time.perf_counter()
+        *_, rms_sparse = calibration.bundle_adjust(image_points, object_points, A_0, rvecs_0, t)
+        t_sparse = time.perf_counter() - t0
+        if views <= DENSE_MAX_VIEWS:
+            t0 = time.perf_counter()
+            rms_dense = dense_bundle_adjust(image_points, object_points, A_0, rvecs_0, t)
+            print("           bundle adjustment: Schur complement {:.3f} s (RMS {:.4f}), dense {:.3f} s (RMS {:.4f})"
+                  .format(t_sparse, rms_sparse, time.perf_counter() - t0, rms_dense))
+        else:
+            print("           bundle adjustment: Schur complement {:.3f} s (RMS {:.4f})".format(t_sparse, rms_sparse))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Zhang calibration: per-point Python loops of the original camera_intrinsics() vs calibration.py.
+
+The reference functions below are those of the original page (normalization,
+row-by-row DLT matrix, residual and Jacobian filled point by point, closed form
+for the intrinsics). On the syn_chessboard_4x4_*.tif views, calibration.py must
+return the same homographies and intrinsic matrix bit for bit. Then synthetic
+views of a planar grid (known camera, random poses, 0.1 px noise) are used to
+time both implementations while sweeping the points per view and the number of
+views, with the refined intrinsics for reference.
+
+Run from the repository root:  python tutorials/image-formation/benchmarks/calibration.py
+"""
+import sys
+import time
+from os import path
+
+import cv2 as cv
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import calibration
+
+APP_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+PATTERN_DIM = (4, 5)
+POINTS_PER_VIEW = (20, 80, 320, 1280)
+VIEWS = (3, 10, 30)
+TRUE_A = np.array([[800., 0.5, 320.], [0., 780., 240.], [0., 0., 1.]])
+
+
+def reference_normalize_points(chessboard_correspondences):
+    def get_normalization_matrix(pts):
+        pts = pts.astype(np.float64)
+        x_mean, y_mean = np.mean(pts, axis=0)
+        var_x, var_y = np.var(pts, axis=0)
+        s_x, s_y = np.sqrt(2 / var_x), np.sqrt(2 / var_y)
+        n = np.array([[s_x, 0, -s_x * x_mean], [0, s_y, -s_y * y_mean], [0, 0, 1]])
+        n_inv = np.array([[1. / s_x, 0, x_mean], [0, 1. / s_y, y_mean], [0, 0, 1]])
+        return n.astype(np.float64), n_inv.astype(np.float64)
+
+    ret_correspondences = []
+    for imp, objp in chessboard_correspondences:
+        N_x, N_x_inv = get_normalization_matrix(objp)
+        N_u, N_u_inv = get_normalization_matrix(imp)
+        hom_imp = np.array([[[each[0]], [each[1]], [1.0]] for each in imp])
+        hom_objp = np.array([[[each[0]], [each[1]], [1.0]] for each in objp])
+        for i in range(hom_objp.shape[0]):
+            n_o = np.matmul(N_x, hom_objp[i])
+            hom_objp[i] = n_o / n_o[-1]
+            n_u = np.matmul(N_u, hom_imp[i])
+            hom_imp[i] = n_u / n_u[-1]
+        normalized_objp = hom_objp.reshape(hom_objp.shape[0], hom_objp.shape[1])[:, :-1]
+        normalized_imp = hom_imp.reshape(hom_imp.shape[0], hom_imp.shape[1])[:, :-1]
+        ret_correspondences.append((imp, objp, normalized_imp, normalized_objp, N_u, N_x, N_u_inv, N_x_inv))
+    return ret_correspondences
+
+
+def reference_homography(correspondence):
+    normalized_image_points, normalized_object_points, N_x, N_u_inv = (correspondence[2], correspondence[3],
+                                                                       correspondence[5], correspondence[6])
+    N = len(normalized_image_points)
+    M = np.zeros((2 * N, 9), dtype=np.float64)
+    for i in range(N):
+        X, Y = normalized_object_points[i]
+        u, v = normalized_image_points[i]
+        M[2 * i] = np.array([-X, -Y, -1, 0, 0, 0, X * u, Y * u, u])
+        M[(2 * i) + 1] = np.array([0, 0, 0, -X, -Y, -1, X * v, Y * v, v])
+    u, s, vh = np.linalg.svd(M)
+    h = np.matmul(np.matmul(N_u_inv, vh[np.argmin(s)].reshape(3, 3)), N_x)
+    return h[:, :] / h[2, 2]
+
+
+def reference_residual_and_jacobian(h, X, Y, N):
+    x_j = X.reshape(N, 2)
+    projected = [0 for i in range(2 * N)]
+    jacobian = np.zeros((2 * N, 9), np.float64)
+    for j in range(N):
+        x, y = x_j[j]
+        sx = np.float64(h[0] * x + h[1] * y + h[2])
+        sy = np.float64(h[3] * x + h[4] * y + h[5])
+        w = np.float64(h[6] * x + h[7] * y + h[8])
+        projected[2 * j] = sx / w
+        projected[2 * j + 1] = sy / w
+        jacobian[2 * j] = np.array([x / w, y / w, 1 / w, 0, 0, 0, -sx * x / w ** 2, -sx * y / w ** 2, -sx / w ** 2])
+        jacobian[2 * j + 1] = np.array([0, 0, 0, x / w, y / w, 1 / w, -sy * x / w ** 2, -sy * y / w ** 2, -sy / w ** 2])
+    return np.asarray(projected) - Y, jacobian
+
+
+def reference_intrinsics(H_r):
+    def v_pq(p, q, H):
+        return np.array([H[0, p] * H[0, q], H[0, p] * H[1, q] + H[1, p] * H[0, q], H[1, p] * H[1, q],
+                         H[2, p] * H[0, q] + H[0, p] * H[2, q], H[2, p] * H[1, q] + H[1, p] * H[2, q],
+                         H[2, p] * H[2, q]])
+
+    V = np.zeros((2 * len(H_r), 6), np.float64)
+    for i, H in enumerate(H_r):
+        V[2 * i] = v_pq(0, 1, H)
+        V[2 * i + 1] = np.subtract(v_pq(0, 0, H), v_pq(1, 1, H))
+    u, s, vh = np.linalg.svd(V)
+    b = vh[np.argmin(s)]
+    vc = (b[1] * b[3] - b[0] * b[4]) / (b[0] * b[2] - b[1] ** 2)
+    l = b[5] - (b[3] ** 2 + vc * (b[1] * b[2] - b[0] * b[4])) / b[0]
+    alpha = np.sqrt((l / b[0]))
+    beta = np.sqrt(((l * b[0]) / (b[0] * b[2] - b[1] ** 2)))
+    gamma = -1 * ((b[1]) * (alpha ** 2) * (beta / l))
+    uc = (gamma * vc / beta) - (b[3] * (alpha ** 2) / l)
+    return np.array([[alpha, gamma, uc], [0, beta, vc], [0, 0, 1.0]])
+
+
+def reference_calibration(correspondences):
+    normalized = reference_normalize_points(correspondences)
+    H = [reference_homography(c) for c in normalized]
+    for (imp, objp), h in zip(correspondences, H):
+        reference_residual_and_jacobian(h.flatten(), objp.astype(np.float64).flatten(), imp.flatten(), len(imp))
+    return reference_intrinsics(H), np.array(H)
+
+
+def chessboard_correspondences(num_images):
+    # corners and board positions as found by the page (integer pixel positions)
+    objp = np.indices(PATTERN_DIM).T.reshape(-1, 2).astype(np.float64)
+    correspondences = []
+    for i in range(1, num_images + 1):
+        image = cv.imread(path.join(APP_DIR, 'syn_chessboard_4x4_{}.tif'.format(i)), 0)
+        if np.mean(image) < np.max(image // 2):
+            image = cv.bitwise_not(image)
+        ret, corners = cv.findChessboardCorners(image, patternSize=PATTERN_DIM)
+        assert ret, "chessboard not found"
+        correspondences.append([corners.reshape(-1, 2).astype(int), objp.astype(int)])
+    return correspondences
+
+
+def synthetic_views(points, views, rng):
+    side = int(round(np.sqrt(points)))
+    objp = np.indices((side, points // side)).T.reshape(-1, 2).astype(np.float64) - [side / 2, points // side / 2]
+    image_points = []
+    for _ in range(views):
+        rvec = rng.uniform(-0.5, 0.5, 3)
+        tvec = np.array([0., 0., 2.5 * side]) + rng.uniform(-1, 1, 3)
+        projected, _ = cv.projectPoints(np.column_stack([objp, np.zeros(len(objp))]), rvec, tvec, TRUE_A, None)
+        image_points.append(projected.reshape(-1, 2) + rng.normal(0, 0.1, (len(objp), 2)))
+    return np.array(image_points), np.broadcast_to(objp, (views,) + objp.shape)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    for num_images in (2, 3, 4):
+        correspondences = chessboard_correspondences(num_images)
+        with np.errstate(invalid='ignore'):
+            A_before, H_before = reference_calibration(correspondences)
+            A_after, H_after = calibration.calibrate([imp for imp, _ in correspondences],
+                                                     [objp for _, objp in correspondences])
+        assert np.array_equal(H_before, H_after), "homographies differ"
+        assert np.array_equal(A_before, A_after, equal_nan=True), "intrinsics differ"
+        print("{} chessboard views: identical homographies and intrinsics".format(num_images))
+
+    rng = np.random.default_rng(0)
+    for views in VIEWS:
+        for points in POINTS_PER_VIEW:
+            imp, objp = synthetic_views(points, views, rng)
+            correspondences = list(zip(imp, objp))
+            (A_before, _), t_before = timed(lambda: reference_calibration(correspondences))
+
+            def vectorized():
+                A, H = calibration.calibrate(imp, objp)
+                calibration.homography_residuals(H.reshape(-1, 9), objp, imp)
+                calibration.homography_jacobian(H.reshape(-1, 9), objp)
+                return A
+
+            A_after, t_after = timed(vectorized)
+            (A_refined, _), t_refine = timed(lambda: calibration.calibrate(imp, objp, refine=True))
+            assert np.allclose(A_before, A_after, rtol=1e-9), "intrinsics differ"
+            print("{:2d} views x {:4d} points: loops {:.4f} s, vectorized {:.4f} s ({:.0f}x); "
+                  "with LM refinement {:.4f} s, focal lengths {:.1f} / {:.1f} (true 800 / 780)".format(
+                      views, len(objp[0]), t_before, t_after, t_before / t_after, t_refine,
+                      A_refined[0, 0], A_refined[1, 1]))
+
+
+if __name__ == "__main__":
+    main()
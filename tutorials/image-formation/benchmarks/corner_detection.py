@@ -0,0 +1,83 @@
+"""
+Chessboard corner detection: serial loop of the original calibration page vs chessboard.py.
+
+The bundled syn_chessboard_4x4_*.tif views are written to a temporary directory
+as distinct copies (a little noise each) to get a set of views.
+The original loop (read, invert, cv.findChessboardCorners, one image after the
+other, on every rerun) is timed against chessboard.detect_corners: cold (thread
+pool), warm (every image cached), and when one view is added, as when the
+slider moves. The corners must be the same.
+
+Run from the repository root:  python tutorials/image-formation/benchmarks/corner_detection.py
+"""
+import os
+import sys
+import tempfile
+import time
+from os import path
+
+import cv2 as cv
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import chessboard
+
+APP_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+PATTERN_DIM = (4, 5)
+COPIES = 16
+SCALE = 4
+
+
+def reference_corners(paths):
+    # get_camera_images / getChessboardCorners of the original page
+    found = []
+    for each in paths:
+        image = cv.imread(each, 0)
+        if np.mean(image) < np.max(image // 2):
+            image = cv.bitwise_not(image)
+        ret, corners = cv.findChessboardCorners(image, patternSize=PATTERN_DIM)
+        found.append(corners.reshape(-1, 2) if ret else None)
+    return found
+
+
+def write_views(workdir, rng):
+    paths = []
+    for i in range(1, 5):
+        image = cv.imread(path.join(APP_DIR, 'syn_chessboard_4x4_{}.tif'.format(i)), cv.IMREAD_UNCHANGED)
+        for copy in range(COPIES):
+            noisy = np.clip(image + rng.normal(0, 200, image.shape), 0, 65535).astype(np.uint16)
+            paths.append(path.join(workdir, 'view_{}_{}.tif'.format(i, copy)))
+            cv.imwrite(paths[-1], noisy)
+    return paths
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = write_views(workdir, rng)
+        print("{} views of {}x{} pixels, {} CPUs".format(len(paths), *cv.imread(paths[0], 0).shape[::-1],
+                                                         os.cpu_count()))
+        before, t_serial = timed(lambda: reference_corners(paths))
+        after, t_cold = timed(lambda: chessboard.detect_corners(paths[:-1], PATTERN_DIM))
+        _, t_added = timed(lambda: chessboard.detect_corners(paths, PATTERN_DIM))
+        after, t_warm = timed(lambda: chessboard.detect_corners(paths, PATTERN_DIM))
+        for a, b in zip(before, after):
+            assert (a is None and b is None) or np.array_equal(a, b), "corners differ"
+        print("serial loop (every rerun) {:.3f} s; thread pool, cold {:.3f} s; one view added {:.3f} s; "
+              "all cached {:.4f} s".format(t_serial, t_cold, t_added, t_warm))
+        print("patterns found in {} / {} views".format(sum(c is not None for c in after), len(after)))
+
+        refined, t_subpix = timed(lambda: chessboard.detect_corners(paths, PATTERN_DIM, subpix=True))
+        shift = [np.abs(r - c).max() for r, c in zip(refined, after) if c is not None]
+        print("with cornerSubPix, cold {:.3f} s, largest corner shift {:.3f} px".format(t_subpix, max(shift)))
+
+
+if __name__ == "__main__":
+    main()
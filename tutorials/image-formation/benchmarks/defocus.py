@@ -0,0 +1,69 @@
+"""
+Depth-of-field blur: PIL GaussianBlur on every aperture change vs the defocus pyramid.
+
+For every radius the aperture slider can produce (65 - f-number, 1 to 63), the
+pyramid blur is compared with an exact Gaussian (scipy.ndimage.gaussian_filter)
+away from the image border, together with PIL's GaussianBlur, and the error bound
+stated in pinhole.DefocusPyramid is checked. Then a sweep of the aperture slider
+is timed (blur of the background, then the whole sensor view).
+
+Run from the repository root:  python tutorials/image-formation/benchmarks/defocus.py
+"""
+import sys
+import time
+from os import path
+
+import numpy as np
+from PIL import ImageFilter
+from scipy import ndimage
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import assets
+import pinhole
+
+ERROR_BOUND = 3.0
+CHECKED_RADII = (1, 2, 3, 5, 8, 13, 21, 34, 55, 63)
+
+
+def main():
+    bg, subj = assets.pinhole_background(), assets.pinhole_subject()
+    image = np.asarray(bg).astype(np.float64)
+    height, width = image.shape[:2]
+
+    t0 = time.perf_counter()
+    pyramid = pinhole.DefocusPyramid(bg)
+    print("pyramid of the {}x{} background built in {:.3f} s".format(width, height, time.perf_counter() - t0))
+
+    worst = 0.0
+    for radius in CHECKED_RADII:
+        exact = ndimage.gaussian_filter(image, (radius, radius, 0), mode='nearest')
+        inner = (slice(2 * radius, height - 2 * radius), slice(2 * radius, width - 2 * radius))
+        fast = np.abs(np.asarray(pyramid.blur(radius)) - exact)[inner]
+        pil = np.abs(np.asarray(bg.filter(ImageFilter.GaussianBlur(radius=radius))) - exact)[inner]
+        worst = max(worst, fast.max())
+        print("radius {:2d}: pyramid error mean {:.3f} max {:.1f}, PIL error mean {:.3f} max {:.1f}"
+              .format(radius, fast.mean(), fast.max(), pil.mean(), pil.max()))
+    assert worst < ERROR_BOUND, "error bound exceeded"
+
+    apertures = range(2, 65, 3)
+    t0 = time.perf_counter()
+    for x in apertures:
+        bg.filter(ImageFilter.GaussianBlur(radius=65 - x))
+    t_pil = (time.perf_counter() - t0) / len(apertures)
+    t0 = time.perf_counter()
+    for x in apertures:
+        pinhole.defocus(bg, 65 - x)
+    t_pyramid = (time.perf_counter() - t0) / len(apertures)
+    print("background blur per aperture change: PIL {:.3f} s, pyramid {:.3f} s".format(t_pil, t_pyramid))
+
+    for exact_blur in (True, False):
+        t0 = time.perf_counter()
+        for x in apertures:
+            pinhole.sensor_view(bg, subj, x, 50, 'Foreground', 1.0, exact_blur=exact_blur)
+        print("sensor view rerender per aperture change ({}): {:.3f} s".format(
+            "PIL blur" if exact_blur else "defocus pyramid", (time.perf_counter() - t0) / len(apertures)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Homography page: per-tick warp of the original page vs the cached warps of projective.py.
+
+The reference below is the original page: skimage's estimate_transform and warp of
+the full image on every slider tick. A continuous drag of each slider is replayed
+(every tick a new position, so nothing is cached) and the latency per tick of
+the reference, of the full resolution cv.warpPerspective and of the preview is
+reported, then the drag is replayed backwards (every position cached). The full
+resolution warp must match the reference within rounding of the 8-bit output,
+and the preview must be that warp seen at the preview size.
+
+Run from the repository root:  python tutorials/image-formation/benchmarks/homography_warp.py
+"""
+import sys
+import time
+from os import path
+
+import cv2 as cv
+import numpy as np
+from skimage import transform
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import assets
+import projective
+
+# slider drags: the angle at the default zoom, the zoom at a 20 degrees angle (slider steps)
+DRAGS = {'angle': [(phi, 0.2) for phi in range(-35, 36)],
+         'zoom': [(20, round(k, 2)) for k in np.arange(-0.2, 1.0001, 0.01)]}
+
+
+def reference_warp(img, phi, k):
+    # the original homography page, between the sliders and st.image
+    src, dst = projective.camera_quads(phi, k, img.shape)
+    tform = transform.estimate_transform('projective', src, dst)
+    return transform.warp(img, tform.inverse)
+
+
+def per_tick(fn, ticks):
+    t0 = time.perf_counter()
+    for phi, k in ticks:
+        fn(phi, k)
+    return (time.perf_counter() - t0) / len(ticks)
+
+
+def main():
+    image = assets.load_asset('homography')
+    img = np.array(image)
+    warp = projective.HomographyWarp(image)
+    print("image {}x{}, preview {}x{}".format(img.shape[1], img.shape[0], *warp.preview_size))
+
+    for phi, k in [(0, 0.2), (-35, -0.2), (35, 1.0), (20, 0.5)]:
+        before = np.rint(reference_warp(img, phi, k) * 255)
+        after = warp.full(phi, k).astype(np.float64)
+        # away from the border of the warped quad (bilinear blend with the black outside)
+        inside = cv.erode(cv.warpPerspective(np.ones(img.shape[:2], np.uint8), warp.matrix(phi, k),
+                                             img.shape[1::-1]), np.ones((3, 3), np.uint8)) > 0
+        assert np.abs(before - after)[inside].max() <= 1, "full resolution warp differs"
+        downsampled = cv.resize(warp.full(phi, k), warp.preview_size, interpolation=cv.INTER_AREA)
+        preview_error = np.abs(downsampled.astype(int) - warp.preview(phi, k)).mean()
+        print("phi {}, k {}: full resolution within 1 grey level of skimage, preview vs downsampled full "
+              "resolution: mean abs difference {:.2f}".format(phi, k, preview_error))
+
+    for name, ticks in DRAGS.items():
+        t_before = per_tick(lambda phi, k: reference_warp(img, phi, k), ticks)
+        drag = projective.HomographyWarp(image, cache_size=len(ticks))
+        t_full = per_tick(drag.full, ticks)
+        t_preview = per_tick(drag.preview, ticks)
+        t_back = per_tick(drag.preview, ticks[::-1])
+        print("{} drag ({} ticks), latency per tick: skimage {:.2f} ms, full resolution {:.2f} ms, "
+              "preview {:.3f} ms, preview of a visited position {:.4f} ms".format(
+                  name, len(ticks), 1e3 * t_before, 1e3 * t_full, 1e3 * t_preview, 1e3 * t_back))
+
+
+if __name__ == "__main__":
+    main()
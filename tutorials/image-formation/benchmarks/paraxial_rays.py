@@ -0,0 +1,111 @@
+"""
+Paraxial camera model plot: per-ray loop of the original page vs paraxial.py.
+
+The reference below is the loop of the original model_paraxial_lens (one
+ax.plot / ax.scatter per ray and per point). Both draw the rays of the same
+object points on an Agg canvas; the time includes building the artists and
+rendering the figure. The image points and sensor intersections of the loop
+must match those of paraxial.trace_rays. paraxial.py then renders full 2-D
+grids of object points (distances x heights), out of reach of the loop.
+
+Run from the repository root:  python tutorials/image-formation/benchmarks/paraxial_rays.py
+"""
+import sys
+import time
+from os import path
+
+import matplotlib
+
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import paraxial
+
+F, D, CCD_Z, CCD_H, ZO = 100, 35, -102, 10, 500
+HEIGHTS = (1, 20, 200)
+GRIDS = ((10, 200), (20, 500))
+
+
+def reference_rays(ax1, ax2, zo, yo):
+    # the loop of the original model_paraxial_lens, returning its image points and sensor hits
+    f, d, ccd_z, ccd_h = F, D, CCD_Z, CCD_H
+    counter = 0
+    yo_i_i = 0
+    yi_i = 0
+    images, hits = [], []
+    for i, yo_i in enumerate(yo):
+        zi = 1 / (1 / f - 1 / zo)
+        yi = zi * yo_i / zo
+        zi = -zi
+        yi = -yi
+        if i == 0:
+            yo_i_i = yo_i
+            yi_i = yi
+        ray_ccd_top = -(d / 2 - yi) * ccd_z / zi + d / 2
+        ray_ccd_center = yi * ccd_z / zi
+        ray_ccd_bottom = -(-d / 2 - yi) * ccd_z / zi - d / 2
+        ax1.scatter(zi, yi, color='blue')
+        ax2.scatter(zo, yo_i, color='red')
+        ax1.plot([zi, zi], [yi_i, yi], color='blue', linestyle=':', linewidth=2)
+        ax1.plot([0, zi], [d / 2, yi], color='blue', alpha=0.25)
+        ax1.plot([0, zi], [0, yi], color='blue', alpha=0.25)
+        ax1.plot([0, zi], [-d / 2, yi], color='blue', alpha=0.25)
+        ax2.plot([zo, zo], [yo_i_i, yo_i], color='red', linestyle=':', linewidth=2)
+        ax2.plot([zo, 0], [yo_i, d / 2], color='red', alpha=0.25)
+        ax2.plot([zo, 0], [yo_i, 0], color='red', alpha=0.25)
+        ax2.plot([zo, 0], [yo_i, -d / 2], color='red', alpha=0.25)
+        for ray_ccd in [ray_ccd_top, ray_ccd_center, ray_ccd_bottom]:
+            if -ccd_h / 2 < ray_ccd < ccd_h / 2:
+                ax1.scatter(ccd_z, ray_ccd, marker='.', color='green', alpha=0.99)
+                hits.append(ray_ccd)
+        images.append((zi, yi))
+    return np.array(images), np.array(hits)
+
+
+def vectorized_rays(ax1, ax2, zo, yo):
+    rays = paraxial.trace_rays(np.asarray(zo)[..., None], yo, F, D, CCD_Z)
+    paraxial.draw_rays(ax1, ax2, rays, CCD_Z, CCD_H)
+    hits = rays['ccd_y'].ravel()
+    return (np.stack([rays['zi'].ravel(), rays['yi'].ravel()], axis=-1),
+            hits[(-CCD_H / 2 < hits) & (hits < CCD_H / 2)])
+
+
+def render(draw, zo, yo):
+    t0 = time.perf_counter()
+    fig, (ax1, ax2) = plt.subplots(ncols=2, figsize=(14, 7))
+    out = draw(ax1, ax2, zo, yo)
+    ax1.set_xlim([-150, 0])
+    ax2.set_xlim([0, np.max(zo) * 1.25])
+    for ax in (ax1, ax2):
+        ax.set_ylim([-25, 25])
+    fig.canvas.draw()
+    artists = len(ax1.get_children()) + len(ax2.get_children())
+    plt.close(fig)
+    return out, time.perf_counter() - t0, artists
+
+
+def main():
+    for num in HEIGHTS:
+        yo = np.linspace(-15, 16, num) if num > 1 else np.array([-15.5])
+        (images_before, hits_before), t_before, artists_before = render(reference_rays, ZO, yo)
+        (images_after, hits_after), t_after, artists_after = render(vectorized_rays, ZO, yo)
+        assert np.allclose(images_before, images_after) and np.allclose(hits_before, hits_after), "rays differ"
+        print("{:4d} object points: loop {:.3f} s ({} artists), vectorized {:.3f} s ({} artists)".format(
+            num, t_before, artists_before, t_after, artists_after))
+
+    for distances, heights in GRIDS:
+        zo = np.linspace(ZO, 2 * ZO, distances)
+        yo = np.linspace(-15, 16, heights)
+        t0 = time.perf_counter()
+        paraxial.trace_rays(zo[:, None], yo, F, D, CCD_Z)
+        t_trace = time.perf_counter() - t0
+        _, t_render, artists = render(vectorized_rays, zo, yo)
+        print("grid of {} x {} object points: traced in {:.4f} s, traced and rendered in {:.3f} s ({} artists)".format(
+            distances, heights, t_trace, t_render, artists))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Latency of a full rerender of the pinhole camera page after a slider move.
+
+The original pipeline (capture saved to merged.png and reopened, distortion
+written to distorted.png and reopened, result written to res_img.png and
+reopened) is kept below as the reference. It runs in a temporary directory and
+its output must match the in-memory pipeline of pinhole.py with the exact (PIL)
+blur, except with lens distortion (f < 35 mm): the reference resamples with cubic
+splines, pinhole.py with a bilinear cv.remap, so the mean difference is reported
+instead. The default pipeline, with the cached defocus pyramid, is timed too.
+
+Run from the repository root:  python tutorials/image-formation/benchmarks/pinhole_latency.py
+"""
+import os
+import sys
+import tempfile
+import time
+from os import path
+
+import cv2 as cv
+import numpy as np
+import scipy.ndimage
+from PIL import Image, ImageFilter, ImageEnhance
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import assets
+import pinhole
+
+# (aperture, focal length, focus, exposure) of the rerenders
+SETTINGS = ((16, 50, 'Foreground', 1.0), (16, 20, 'Foreground', 1.0), (40, 100, 'Background', 1.4))
+REPEAT = 3
+
+
+def reference_sensor_view(bg, subj, x, f, foc, eso):
+    # pinhole_camera_model and capture of the original main.py, with their disk round trips
+    val, focus = 65 - x, 0 if foc == 'Foreground' else 1
+    background, subject = bg, subj
+    if focus == 0:
+        background = background.filter(ImageFilter.GaussianBlur(radius=val))
+    else:
+        subject = subject.filter(ImageFilter.GaussianBlur(radius=val))
+    subj1 = subject.convert("RGBA")
+    bg1 = background.convert("RGBA")
+    bg1.paste(subj1, ((bg1.width - subj1.width) // 2, (bg1.height - subj1.height) // 2), subj1)
+    bg1.save("merged.png", format="png")
+    image = Image.open("merged.png")
+
+    width, height = image.size
+    if f < 35:
+        k_1 = 0.4
+        k_2 = 0.1
+        x, y = np.meshgrid(np.float32(np.arange(width)), np.float32(np.arange(height)))
+        x_c = width / 2
+        y_c = height / 2
+        x = (x - x_c) / x_c
+        y = (y - y_c) / y_c
+        radius = np.sqrt(x ** 2 + y ** 2)
+        m_r = 1 + k_1 * radius + k_2 * radius ** 2
+        x = x * m_r * x_c + x_c
+        y = y * m_r * y_c + y_c
+        image = np.asarray(image)
+        channels = [scipy.ndimage.map_coordinates(image[:, :, c], [y.ravel(), x.ravel()]) for c in range(4)]
+        distorted = np.dstack((channels[2], channels[1], channels[0], channels[3]))
+        distorted.resize(image.shape)
+        cv.imwrite("distorted.png", distorted)
+        image = Image.open("distorted.png")
+
+    image = image.crop((2 * f, 0, width - 2 * f, height - np.floor(3 * f / 2)))
+    image = ImageEnhance.Brightness(image).enhance(eso)
+    image.save("res_img.png", format="png")
+    return Image.open("res_img.png")
+
+
+def best_of(fn):
+    times = []
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return out, min(times)
+
+
+def main():
+    bg, subj = assets.pinhole_background(), assets.pinhole_subject()
+    print("background {}x{}, subject {}x{}".format(*bg.size, *subj.size))
+    buffers = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            for setting in SETTINGS:
+                before, t_before = best_of(lambda: np.asarray(reference_sensor_view(bg, subj, *setting)))
+                after, t_after = best_of(lambda: np.asarray(
+                    pinhole.sensor_view(bg, subj, *setting, buffers=buffers, exact_blur=True)))
+                _, t_pyramid = best_of(lambda: pinhole.sensor_view(bg, subj, *setting, buffers=buffers))
+                if setting[1] >= 35:
+                    assert np.array_equal(before, after), "in-memory result differs"
+                    note = "identical"
+                else:
+                    note = "mean abs difference {:.3f}".format(np.abs(before.astype(int) - after).mean())
+                print("aperture {}, f {} mm, {}, exposure {}: with PNG round trips {:.3f} s, in memory {:.3f} s ({}), "
+                      "with the defocus pyramid {:.3f} s".format(*setting, t_before, t_after, note, t_pyramid))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
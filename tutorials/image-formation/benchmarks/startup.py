@@ -0,0 +1,76 @@
+"""
+Startup cost of the pinhole camera assets, before and after lazy cached loading.
+
+Before: main.py downloaded the subject and the background at import time, then
+made the RGBA subject through an imwrite/Image.open round trip on every cold
+start. Both steps are timed here. Without network the download fails, which
+failed the whole app.
+After: nothing happens at import. The first page load reads the cache (or the
+bundled fallback) and builds the RGBA subject in memory. Later reruns get the
+memoized images.
+
+Run from the repository root:  python tutorials/image-formation/benchmarks/startup.py
+"""
+import importlib
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+from os import path
+
+import cv2 as cv
+from PIL import Image
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import assets
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        return time.perf_counter() - t0, e
+    return time.perf_counter() - t0, None
+
+
+def baseline_preprocessing(subject_file, background_file, workdir):
+    # the import-time block of the original main.py, without the downloads
+    bg = Image.open(background_file)
+    bg.load()
+    subj_w_bg = cv.imread(subject_file, 1)
+    temp = cv.cvtColor(subj_w_bg, cv.COLOR_BGR2GRAY)
+    _, alpha = cv.threshold(temp, 0, 255, cv.THRESH_BINARY)
+    b, g, r = cv.split(subj_w_bg)
+    dest = cv.merge([b, g, r, alpha], 4)
+    cv.imwrite(path.join(workdir, "pinhole_temp.png"), dest)
+    subj = Image.open(path.join(workdir, "pinhole_temp.png"))
+    subj.load()
+
+
+def main():
+    subject_url = assets.ASSETS['pinhole_subject'][0]
+    elapsed, error = timed(lambda: urllib.request.urlopen(subject_url, timeout=assets.DOWNLOAD_TIMEOUT).read())
+    print("before: download at import {:.3f} s{}".format(elapsed, " -> fails ({})".format(error) if error else ""))
+
+    subject = path.join(assets.FALLBACK_DIR, assets.ASSETS['pinhole_subject'][1])
+    background = path.join(assets.FALLBACK_DIR, assets.ASSETS['pinhole_background'][1])
+    with tempfile.TemporaryDirectory() as workdir:
+        elapsed, _ = timed(lambda: baseline_preprocessing(subject, background, workdir))
+    print("before: preprocessing at import (every cold start) {:.3f} s".format(elapsed))
+
+    elapsed, _ = timed(lambda: importlib.reload(assets))
+    print("after: import of the asset manager {:.4f} s (no image work)".format(elapsed))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        assets.CACHE_DIR = cache_dir
+        os.environ.setdefault('IMAGE_FORMATION_OFFLINE', '1')
+        elapsed, _ = timed(lambda: (assets.pinhole_background(), assets.pinhole_subject()))
+        print("after: first pinhole page load (cold cache) {:.3f} s".format(elapsed))
+        elapsed, _ = timed(lambda: (assets.pinhole_background(), assets.pinhole_subject()))
+        print("after: rerun (memoized) {:.6f} s".format(elapsed))
+
+
+if __name__ == "__main__":
+    main()
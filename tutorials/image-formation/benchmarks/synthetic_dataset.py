@@ -0,0 +1,123 @@
+"""
+Synthetic calibration dataset: throughput of the batch renderer and accuracy of the calibration.
+
+First, views are rendered one at a time with skimage.transform.warp (as
+generate_synthetic_chessboards does, here with a projective transform, and
+with the lens distortion in an inverse map) and in batches by
+synthetic.render_views, which must give the same images up to interpolation. Then a dataset with distortion, blur and
+noise is generated, written and read back, the corners are detected
+(chessboard.find_corners with cornerSubPix) and the camera is calibrated with
+calibration.calibrate_camera and cv.calibrateCamera, against the ground truth
+of the sidecar.
+
+Run from the repository root:  python tutorials/image-formation/benchmarks/synthetic_dataset.py
+"""
+import sys
+import tempfile
+import time
+from os import path
+
+import cv2 as cv
+import numpy as np
+from skimage.filters import gaussian
+from skimage.transform import ProjectiveTransform, warp
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import calibration
+import chessboard
+import synthetic
+
+IMAGE_SIZE = (640, 480)
+PATTERN_DIM = (9, 6)
+SQUARE = 30.0
+PIXELS_PER_SQUARE = 32
+THROUGHPUT_VIEWS = 64
+DATASET_VIEWS = 200
+
+
+def reference_render(A, distortion, rvec, tvec, texture, blur):
+    # one view at a time: undistortion of the pixel grid and inverse homography in an inverse map
+    R = calibration.rotation_matrices(rvec[None])[0]
+    to_texture = np.array([[PIXELS_PER_SQUARE / SQUARE, 0, 2 * PIXELS_PER_SQUARE - 0.5],
+                           [0, PIXELS_PER_SQUARE / SQUARE, 2 * PIXELS_PER_SQUARE - 0.5], [0, 0, 1]])
+    H = to_texture @ np.linalg.inv(np.column_stack([R[:, :2], tvec]))
+
+    def inverse_map(coords):
+        rays = cv.undistortPoints(coords.reshape(-1, 1, 2), A, np.asarray(distortion, dtype=np.float64),
+                                  criteria=(cv.TERM_CRITERIA_COUNT, 20, 0)).reshape(-1, 2)
+        return ProjectiveTransform(H)(rays)
+
+    if not np.any(distortion):
+        # pinhole camera: a single projective transform (skimage's fast path)
+        inverse_map = ProjectiveTransform(H @ np.linalg.inv(A))
+    image = warp(texture, inverse_map, output_shape=IMAGE_SIZE[::-1], order=1, cval=synthetic.BACKGROUND)
+    image = gaussian(image, blur, mode='nearest', truncate=4.0) if blur > 0 else image
+    return np.clip(np.rint(image * 65535), 0, 65535).astype(np.uint16)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    rng = np.random.default_rng(0)
+    A = np.array(synthetic.DEFAULT_A)
+    rvecs, tvecs = synthetic.random_poses(THROUGHPUT_VIEWS, A, IMAGE_SIZE, PATTERN_DIM, SQUARE, rng=rng)
+    texture = synthetic.chessboard_texture(PATTERN_DIM, PIXELS_PER_SQUARE)
+    for distortion, blur in ((np.zeros(5), 0), (synthetic.DEFAULT_DISTORTION, 1.0)):
+        before, t_before = timed(lambda: np.array([reference_render(A, distortion, r, t, texture, blur)
+                                                   for r, t in zip(rvecs, tvecs)]))
+        after, t_after = timed(lambda: synthetic.render_views(A, distortion, rvecs, tvecs, IMAGE_SIZE, PATTERN_DIM,
+                                                              SQUARE, blur=blur, noise=0))
+        difference = np.abs(before.astype(np.float64) - after) / 65535
+        print("{} views {}x{}, {}: one at a time {:.1f} ms per view, batched {:.1f} ms per view; "
+              "difference mean {:.6f}, max {:.5f} (of the full scale)".format(
+                  THROUGHPUT_VIEWS, *IMAGE_SIZE, "distortion and blur" if blur else "no distortion nor blur",
+                  1e3 * t_before / THROUGHPUT_VIEWS, 1e3 * t_after / THROUGHPUT_VIEWS, difference.mean(),
+                  difference.max()))
+
+    with tempfile.TemporaryDirectory() as directory:
+        _, t_generate = timed(lambda: synthetic.generate_dataset(directory, DATASET_VIEWS, image_size=IMAGE_SIZE,
+                                                                 pattern_dim=PATTERN_DIM, square=SQUARE))
+        (images, truth), t_load = timed(lambda: synthetic.load_dataset(directory))
+    print("dataset of {} views with distortion, blur and noise: generated and written in {:.2f} s "
+          "({:.1f} ms per view), read in {:.2f} s".format(DATASET_VIEWS, t_generate, 1e3 * t_generate / DATASET_VIEWS,
+                                                           t_load))
+
+    t0 = time.perf_counter()
+    image_points, errors = [], []
+    for image, true_corners in zip(images, truth['corners']):
+        corners = chessboard.find_corners((image >> 8).astype(np.uint8), PATTERN_DIM, subpix=True)
+        if corners is None:
+            continue
+        # findChessboardCorners may start from either end of the board
+        if np.abs(corners[::-1] - true_corners).max() < np.abs(corners - true_corners).max():
+            corners = corners[::-1]
+        image_points.append(corners)
+        errors.append(np.abs(corners - true_corners).max())
+    t_detect = time.perf_counter() - t0
+    image_points = np.array(image_points, dtype=np.float64)
+    print("corners found in {} / {} views in {:.2f} s, error vs ground truth mean {:.3f} px, max {:.3f} px".format(
+        len(image_points), DATASET_VIEWS, t_detect, np.mean(errors), np.max(errors)))
+
+    objp = synthetic.object_points(PATTERN_DIM, SQUARE)
+    object_points = np.broadcast_to(objp, image_points.shape)
+    (A_fit, distortion, _, _, rms), t_ours = timed(
+        lambda: calibration.calibrate_camera(image_points, object_points, IMAGE_SIZE))
+    object_3d = [np.column_stack([objp, np.zeros(len(objp))]).astype(np.float32)] * len(image_points)
+    (rms_cv, A_cv, distortion_cv, _, _), t_cv = timed(
+        lambda: cv.calibrateCamera(object_3d, list(image_points.astype(np.float32)), IMAGE_SIZE, None, None))
+    for name, A_found, k, error, seconds in (("calibration.py", A_fit, distortion, rms, t_ours),
+                                             ("OpenCV", A_cv, distortion_cv.ravel(), rms_cv, t_cv)):
+        print("{}: f_x {:.2f}, f_y {:.2f}, u_c {:.2f}, v_c {:.2f} (true {:.0f}, {:.0f}, {:.0f}, {:.0f}), "
+              "k_1 {:.4f}, k_2 {:.4f} (true {}, {}), RMS {:.3f} px, {:.2f} s".format(
+                  name, A_found[0, 0], A_found[1, 1], A_found[0, 2], A_found[1, 2], truth['A'][0, 0],
+                  truth['A'][1, 1], truth['A'][0, 2], truth['A'][1, 2], k[0], k[1], *truth['distortion'][:2],
+                  error, seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+"""
+Plane-based camera calibration (Zhang's method), vectorized.
+
+Views are stacked: image and object points are (views, points, 2) arrays (every
+view of a chessboard has the same number of corners). The normalization, the
+DLT homographies, the reprojection residuals and their Jacobian are computed
+for all points of all views in single numpy expressions, and the batched SVD
+of numpy solves every view at once, so the cost grows with the number of
+points without any Python loop over them.
+
+The closed form is then completed by the pose of each view and a bundle
+adjustment of the intrinsics, the lens distortion and all the poses, whose
+sparse Jacobian keeps the cost linear in the number of views.
+
+References:
+[1] Z. Zhang, A flexible new technique for camera calibration, 2000
+[2] W. Burger, Zhang's camera calibration algorithm: in-depth tutorial and implementation, 2016
+"""
+
+import cv2 as cv
+import numpy as np
+from scipy import optimize as opt
+
+
+def normalization_matrices(points):
+    """
+    Similarity transforms that center the points of each view and scale them to a variance of 2 per axis.
+    :param points: (..., N, 2) array
+    :return: N, N_inv: (..., 3, 3) arrays, the transforms and their inverses
+    """
+    points = np.asarray(points, dtype=np.float64)
+    mean = points.mean(axis=-2)
+    s = np.sqrt(2 / points.var(axis=-2))
+    n = np.zeros(points.shape[:-2] + (3, 3))
+    n_inv = np.zeros_like(n)
+    n[..., 0, 0], n[..., 1, 1], n[..., 2, 2] = s[..., 0], s[..., 1], 1
+    n[..., :2, 2] = -s * mean
+    n_inv[..., 0, 0], n_inv[..., 1, 1], n_inv[..., 2, 2] = 1. / s[..., 0], 1. / s[..., 1], 1
+    n_inv[..., :2, 2] = mean
+    return n, n_inv
+
+
+def normalize_points(points):
+    """
+    :param points: (..., N, 2) array
+    :return: normalized points (..., N, 2), N, N_inv (see normalization_matrices)
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n, n_inv = normalization_matrices(points)
+    normalized = points * np.diagonal(n, axis1=-2, axis2=-1)[..., None, :2] + n[..., None, :2, 2]
+    return normalized, n, n_inv
+
+
+def dlt_matrix(image_points, object_points):
+    """
+    Rows [-X, -Y, -1, 0, 0, 0, X u, Y u, u] and [0, 0, 0, -X, -Y, -1, X v, Y v, v] of every correspondence.
+    :param image_points, object_points: (..., N, 2) arrays
+    :return: (..., 2 N, 9) array
+    """
+    X, Y = object_points[..., 0], object_points[..., 1]
+    u, v = image_points[..., 0], image_points[..., 1]
+    zero, one = np.zeros_like(X), np.ones_like(X)
+    row_1 = np.stack([-X, -Y, -one, zero, zero, zero, X * u, Y * u, u], axis=-1)
+    row_2 = np.stack([zero, zero, zero, -X, -Y, -one, X * v, Y * v, v], axis=-1)
+    return np.stack([row_1, row_2], axis=-2).reshape(X.shape[:-1] + (2 * X.shape[-1], 9))
+
+
+def view_homographies(image_points, object_points):
+    """
+    Homographies mapping the object plane to the image of each view, by the normalized DLT.
+    :param image_points, object_points: (views, N, 2) arrays
+    :return: (views, 3, 3) array, normalized to H[2, 2] = 1
+    """
+    normalized_imp, n_u, n_u_inv = normalize_points(image_points)
+    normalized_objp, n_x, _ = normalize_points(object_points)
+    # M.h = 0: h is the right singular vector of the smallest singular value
+    # (thin SVD: the 2N x 2N left singular vectors are never needed)
+    _, s, vh = np.linalg.svd(dlt_matrix(normalized_imp, normalized_objp), full_matrices=False)
+    h_norm = np.take_along_axis(vh, np.argmin(s, axis=-1)[:, None, None], axis=1).reshape(-1, 3, 3)
+    h = np.matmul(np.matmul(n_u_inv, h_norm), n_x)
+    return h / h[:, 2:, 2:]
+
+
+def _project(h, object_points):
+    # numerators and denominator of the homography applied to the points
+    x, y = object_points[..., 0], object_points[..., 1]
+    h = h[..., None, :]
+    sx = h[..., 0] * x + h[..., 1] * y + h[..., 2]
+    sy = h[..., 3] * x + h[..., 4] * y + h[..., 5]
+    w = h[..., 6] * x + h[..., 7] * y + h[..., 8]
+    return sx, sy, w
+
+
+def homography_residuals(h, object_points, image_points):
+    """
+    Reprojection errors (u_projected - u, v_projected - v) of each point.
+    :param h: (..., 9) flattened homographies
+    :param object_points, image_points: (..., N, 2) arrays
+    :return: (..., 2 N) array, interleaved u, v
+    """
+    sx, sy, w = _project(h, object_points)
+    projected = np.stack([sx / w, sy / w], axis=-1)
+    return (projected - image_points).reshape(projected.shape[:-2] + (-1,))
+
+
+def homography_jacobian(h, object_points):
+    """
+    Analytic Jacobian of homography_residuals with respect to h.
+    :param h: (..., 9) flattened homographies
+    :param object_points: (..., N, 2) array
+    :return: (..., 2 N, 9) array
+    """
+    x, y = object_points[..., 0], object_points[..., 1]
+    sx, sy, w = _project(h, object_points)
+    zero = np.zeros_like(w)
+    row_u = np.stack([x / w, y / w, 1 / w, zero, zero, zero,
+                      -sx * x / w ** 2, -sx * y / w ** 2, -sx / w ** 2], axis=-1)
+    row_v = np.stack([zero, zero, zero, x / w, y / w, 1 / w,
+                      -sy * x / w ** 2, -sy * y / w ** 2, -sy / w ** 2], axis=-1)
+    return np.stack([row_u, row_v], axis=-2).reshape(w.shape[:-1] + (2 * w.shape[-1], 9))
+
+
+def refine_homographies(H, image_points, object_points):
+    """
+    Levenberg-Marquardt minimization of the reprojection error of each view.
+    :param H: (views, 3, 3) initial homographies
+    :param image_points, object_points: (views, N, 2) arrays
+    :return: (views, 3, 3) array, normalized to H[2, 2] = 1
+    """
+    image_points = np.asarray(image_points, dtype=np.float64)
+    object_points = np.asarray(object_points, dtype=np.float64)
+    refined = np.array(H, dtype=np.float64)
+    for i, (imp, objp) in enumerate(zip(image_points, object_points)):
+        result = opt.least_squares(fun=homography_residuals, x0=refined[i].ravel(), method='lm',
+                                   jac=lambda h, objp, imp: homography_jacobian(h, objp), args=(objp, imp))
+        if result.success:
+            refined[i] = result.x.reshape(3, 3)
+    return refined / refined[:, 2:, 2:]
+
+
+def intrinsic_parameters(H):
+    """
+    Intrinsic camera matrix from the homographies of (at least 3) views, by Zhang's closed form.
+    :param H: (views, 3, 3) array
+    :return: A, (3, 3) array [[alpha, gamma, u_c], [0, beta, v_c], [0, 0, 1]]
+    """
+    H = np.asarray(H, dtype=np.float64)
+
+    def v_pq(p, q):
+        return np.stack([
+            H[:, 0, p] * H[:, 0, q],
+            H[:, 0, p] * H[:, 1, q] + H[:, 1, p] * H[:, 0, q],
+            H[:, 1, p] * H[:, 1, q],
+            H[:, 2, p] * H[:, 0, q] + H[:, 0, p] * H[:, 2, q],
+            H[:, 2, p] * H[:, 1, q] + H[:, 1, p] * H[:, 2, q],
+            H[:, 2, p] * H[:, 2, q],
+        ], axis=-1)
+
+    V = np.stack([v_pq(0, 1), np.subtract(v_pq(0, 0), v_pq(1, 1))], axis=1).reshape(-1, 6)
+
+    # solve V.b = 0
+    _, s, vh = np.linalg.svd(V)
+    b = vh[np.argmin(s)]
+
+    # according to Zhang's method
+    vc = (b[1] * b[3] - b[0] * b[4]) / (b[0] * b[2] - b[1] ** 2)
+    l = b[5] - (b[3] ** 2 + vc * (b[1] * b[2] - b[0] * b[4])) / b[0]
+    alpha = np.sqrt((l / b[0]))
+    beta = np.sqrt(((l * b[0]) / (b[0] * b[2] - b[1] ** 2)))
+    gamma = -1 * ((b[1]) * (alpha ** 2) * (beta / l))
+    uc = (gamma * vc / beta) - (b[3] * (alpha ** 2) / l)
+
+    return np.array([
+        [alpha, gamma, uc],
+        [0, beta, vc],
+        [0, 0, 1.0],
+    ])
+
+
+def calibrate(image_points, object_points, refine=False):
+    """
+    Intrinsic camera matrix from chessboard views.
+    :param image_points: (views, N, 2) corners detected in each image
+    :param object_points: (views, N, 2) corresponding positions on the chessboard plane
+    :param refine: refine each homography by minimizing its reprojection error before the closed form
+        (off by default: the page always showed the intrinsics of the DLT homographies, its former
+        refinement evaluated the residual at the initial homography and never moved)
+    :return: A (3, 3), H (views, 3, 3)
+    """
+    image_points = np.asarray(image_points, dtype=np.float64)
+    object_points = np.asarray(object_points, dtype=np.float64)
+    H = view_homographies(image_points, object_points)
+    if refine:
+        H = refine_homographies(H, image_points, object_points)
+    return intrinsic_parameters(H), H
+
+
+def rotation_matrices(rvecs):
+    """
+    Rodrigues' formula for a stack of rotation vectors.
+    :param rvecs: (..., 3) axis * angle
+    :return: (..., 3, 3) rotation matrices
+    """
+    rvecs = np.asarray(rvecs, dtype=np.float64)
+    theta = np.linalg.norm(rvecs, axis=-1)[..., None, None]
+    k = np.zeros(rvecs.shape[:-1] + (3, 3))
+    k[..., 0, 1], k[..., 0, 2], k[..., 1, 2] = -rvecs[..., 2], rvecs[..., 1], -rvecs[..., 0]
+    k = k - np.swapaxes(k, -1, -2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # sin(theta) / theta and (1 - cos(theta)) / theta^2, with their limits at theta = 0
+        a = np.where(theta < 1e-8, 1.0, np.sin(theta) / theta)
+        b = np.where(theta < 1e-8, 0.5, (1 - np.cos(theta)) / theta ** 2)
+    return np.eye(3) + a * k + b * np.matmul(k, k)
+
+
+def rotation_vectors(R):
+    """
+    Inverse of rotation_matrices.
+    :param R: (views, 3, 3) rotation matrices
+    :return: (views, 3) rotation vectors
+    """
+    return np.array([cv.Rodrigues(np.ascontiguousarray(r))[0].ravel() for r in R])
+
+
+def view_extrinsics(A, H):
+    """
+    Pose of the chessboard in each view, from the intrinsic matrix and the view homographies (Zhang).
+    The rotation [r_1, r_2, r_1 x r_2] is projected on the closest rotation matrix.
+    :param A: (3, 3) intrinsic matrix
+    :param H: (views, 3, 3) homographies
+    :return: R (views, 3, 3), t (views, 3), with the chessboard in front of the camera (t_z > 0)
+    """
+    B = np.matmul(np.linalg.inv(A), H)
+    scale = 1 / np.linalg.norm(B[:, :, 0], axis=-1)
+    scale = np.where(B[:, 2, 2] * scale < 0, -scale, scale)[:, None]
+    r_1, r_2, t = B[:, :, 0] * scale, B[:, :, 1] * scale, B[:, :, 2] * scale
+    R = np.stack([r_1, r_2, np.cross(r_1, r_2)], axis=-1)
+    u, _, vh = np.linalg.svd(R)
+    # closest rotation (determinant +1)
+    d = np.sign(np.linalg.det(np.matmul(u, vh)))
+    u[:, :, 2] *= d[:, None]
+    return np.matmul(u, vh), t
+
+
+def project_points(object_points, A, distortion, rvecs, tvecs):
+    """
+    Pinhole projection with radial and tangential distortion (OpenCV's model), for all views at once.
+    :param object_points: (views, N, 2) points of the chessboard plane (Z = 0), or (N, 2) shared by all views
+    :param A: (3, 3) intrinsic matrix
+    :param distortion: (k_1, k_2, p_1, p_2, k_3)
+    :param rvecs, tvecs: (views, 3) poses
+    :return: (views, N, 2) image points
+    """
+    k_1, k_2, p_1, p_2, k_3 = distortion
+    R = rotation_matrices(rvecs)
+    # Z = 0: only the first two columns of R act on the chessboard points
+    camera = np.matmul(object_points, np.swapaxes(R[:, :, :2], -1, -2)) + np.asarray(tvecs)[:, None, :]
+    x, y = camera[..., 0] / camera[..., 2], camera[..., 1] / camera[..., 2]
+    r2 = x ** 2 + y ** 2
+    radial = 1 + r2 * (k_1 + r2 * (k_2 + r2 * k_3))
+    x_d = x * radial + 2 * p_1 * x * y + p_2 * (r2 + 2 * x ** 2)
+    y_d = y * radial + p_1 * (r2 + 2 * y ** 2) + 2 * p_2 * x * y
+    return np.stack([A[0, 0] * x_d + A[0, 1] * y_d + A[0, 2], A[1, 1] * y_d + A[1, 2]], axis=-1)
+
+
+def _unpack(params, views):
+    # [alpha, beta, gamma, u_c, v_c, k_1, k_2, p_1, p_2, k_3, rvec_1, tvec_1, ...]
+    alpha, beta, gamma, uc, vc = params[:5]
+    A = np.array([[alpha, gamma, uc], [0, beta, vc], [0, 0, 1.0]])
+    poses = params[10:].reshape(views, 6)
+    return A, params[5:10], poses[:, :3], poses[:, 3:]
+
+
+def _jacobian_blocks(residuals, params, views):
+    # forward differences of the residuals (views, 2 N): the 10 shared parameters one at a time,
+    # the 6 pose parameters of all views at once since each view only depends on its own pose
+    r = residuals(params)
+    steps = np.sqrt(np.finfo(np.float64).eps) * np.maximum(np.abs(params), 1)
+    J_c = np.empty(r.shape + (10,))
+    for k in range(10):
+        p = params.copy()
+        p[k] += steps[k]
+        J_c[..., k] = (residuals(p) - r) / steps[k]
+    J_p = np.empty(r.shape + (6,))
+    poses, pose_steps = params[10:].reshape(views, 6), steps[10:].reshape(views, 6)
+    for k in range(6):
+        p = params.copy()
+        p[10:].reshape(views, 6)[:, k] = poses[:, k] + pose_steps[:, k]
+        J_p[..., k] = (residuals(p) - r) / pose_steps[:, k:k + 1]
+    return r, J_c, J_p
+
+
+def bundle_adjust(image_points, object_points, A, rvecs, tvecs, distortion=(0, 0, 0, 0, 0), max_iterations=100,
+                  tolerance=1e-10):
+    """
+    Joint Levenberg-Marquardt refinement of the intrinsics, the distortion and all the poses, minimizing
+    the reprojection error. Every residual depends on the 10 shared parameters (intrinsics, distortion)
+    and on the 6 parameters of its own view only, so the normal equations are solved by eliminating the
+    block-diagonal pose part (Schur complement): a 10 x 10 system plus one 6 x 6 system per view, and a
+    Jacobian of 16 evaluations of the model, whatever the number of views. The cost grows linearly with
+    the number of views instead of cubically.
+    :param image_points, object_points: (views, N, 2) arrays
+    :param A: (3, 3) initial intrinsic matrix
+    :param rvecs, tvecs: (views, 3) initial poses
+    :param distortion: initial (k_1, k_2, p_1, p_2, k_3)
+    :param max_iterations: maximum number of Jacobian evaluations
+    :param tolerance: stop when the relative decrease of the squared error falls below it
+    :return: A, distortion, rvecs, tvecs, RMS reprojection error (pixels per point, as cv.calibrateCamera)
+    """
+    image_points = np.asarray(image_points, dtype=np.float64)
+    object_points = np.asarray(object_points, dtype=np.float64)
+    views = image_points.shape[0]
+    params = np.concatenate([[A[0, 0], A[1, 1], A[0, 1], A[0, 2], A[1, 2]], distortion,
+                             np.hstack([rvecs, tvecs]).ravel()])
+
+    def residuals(params):
+        return (project_points(object_points, *_unpack(params, views)) - image_points).reshape(views, -1)
+
+    damping = 1e-3
+    r, J_c, J_p = _jacobian_blocks(residuals, params, views)
+    cost = np.sum(r ** 2)
+    for _ in range(max_iterations):
+        U = np.einsum('vnk,vnl->kl', J_c, J_c)
+        W = np.einsum('vnk,vnl->vkl', J_c, J_p)
+        V = np.einsum('vnk,vnl->vkl', J_p, J_p)
+        g_c = np.einsum('vnk,vn->k', J_c, r)
+        g_p = np.einsum('vnk,vn->vk', J_p, r)
+        # Marquardt scaling by the diagonal (as MINPACK, 1 for parameters without effect)
+        D_c = np.where(np.diag(U) > 0, np.diag(U), 1)
+        D_p = np.where(np.diagonal(V, axis1=1, axis2=2) > 0, np.diagonal(V, axis1=1, axis2=2), 1)
+        while True:
+            # damped normal equations, solved by elimination of the poses
+            U_d = U + damping * np.diag(D_c)
+            V_d = V + damping * D_p[:, :, None] * np.eye(6)
+            try:
+                V_inv_Wt = np.linalg.solve(V_d, np.swapaxes(W, 1, 2))
+                V_inv_g = np.linalg.solve(V_d, g_p[:, :, None])[:, :, 0]
+                S = U_d - np.einsum('vkj,vjl->kl', W, V_inv_Wt)
+                delta_c = np.linalg.solve(S, -g_c + np.einsum('vkj,vj->k', W, V_inv_g))
+                delta_p = -V_inv_g - np.einsum('vjk,k->vj', V_inv_Wt, delta_c)
+                candidate = params + np.concatenate([delta_c, delta_p.ravel()])
+                new_cost = np.sum(residuals(candidate) ** 2)
+            except np.linalg.LinAlgError:
+                new_cost = np.inf
+            if new_cost < cost:
+                damping = max(damping / 10, 1e-12)
+                break
+            damping *= 10
+            if damping > 1e12:
+                break
+        if not new_cost < cost:
+            break
+        params, decrease, cost = candidate, (cost - new_cost) / cost, new_cost
+        if decrease < tolerance:
+            break
+        r, J_c, J_p = _jacobian_blocks(residuals, params, views)
+    A, distortion, rvecs, tvecs = _unpack(params, views)
+    return A, distortion, rvecs, tvecs, np.sqrt(cost / (r.size // 2))
+
+
+def centered_intrinsics(H, image_size):
+    """
+    Intrinsic matrix with the principal point at the image center, no skew, and the focal lengths
+    solved from the homographies (as OpenCV initializes its calibration). For views without
+    perspective (affine homographies) the focal lengths are not observable: max(image_size) is used.
+    :param H: (views, 3, 3) homographies
+    :param image_size: (width, height)
+    :return: (3, 3) intrinsic matrix
+    """
+    A = np.array([[1.0, 0, image_size[0] / 2], [0, 1.0, image_size[1] / 2], [0, 0, 1.0]])
+    h = np.matmul(np.linalg.inv(A), H)
+    h_1, h_2 = h[:, :, 0], h[:, :, 1]
+    # h_1' B h_2 = 0 and h_1' B h_1 = h_2' B h_2 with B = diag(1 / f_x^2, 1 / f_y^2, 1)
+    M = np.concatenate([h_1[:, :2] * h_2[:, :2], h_1[:, :2] ** 2 - h_2[:, :2] ** 2])
+    rhs = -np.concatenate([h_1[:, 2] * h_2[:, 2], h_1[:, 2] ** 2 - h_2[:, 2] ** 2])
+    b = np.linalg.lstsq(M, rhs, rcond=None)[0]
+    f = 1 / np.sqrt(b) if np.all(b > 0) else np.full(2, float(max(image_size)))
+    A[0, 0], A[1, 1] = f
+    return A
+
+
+def calibrate_camera(image_points, object_points, image_size=None):
+    """
+    Full calibration: Zhang's closed form on the refined homographies, extrinsics of each view,
+    then bundle adjustment of the intrinsics, distortion and poses.
+    :param image_points: (views, N, 2) corners detected in each image (at least 3 views)
+    :param object_points: (views, N, 2) corresponding positions on the chessboard plane
+    :param image_size: (width, height), to start from centered_intrinsics when the closed form
+        has no valid solution (nearly affine views)
+    :return: A, distortion (k_1, k_2, p_1, p_2, k_3), rvecs, tvecs, RMS reprojection error (see bundle_adjust)
+    """
+    image_points = np.asarray(image_points, dtype=np.float64)
+    object_points = np.asarray(object_points, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        A, H = calibrate(image_points, object_points, refine=True)
+    if not (np.all(np.isfinite(A)) and A[0, 0] > 0 and A[1, 1] > 0):
+        if image_size is None:
+            raise AssertionError("[error] no closed form solution for these views: image_size is needed")
+        A = centered_intrinsics(H, image_size)
+    R, t = view_extrinsics(A, H)
+    return bundle_adjust(image_points, object_points, A, rotation_vectors(R), t)
@@ -0,0 +1,101 @@
+"""
+Chessboard corner detection for the calibration pages, parallel and cached.
+
+Corners are cached per image content: the key is the SHA-256 of the file with
+the pattern size and the sub-pixel setting, so a Streamlit rerun (e.g. the
+number of views slider) only detects corners in images it has not seen yet,
+and an edited file is detected again. Detection of the new images runs in a
+thread pool (OpenCV releases the GIL in findChessboardCorners).
+"""
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2 as cv
+import numpy as np
+
+SUBPIX_WINDOW = (5, 5)
+SUBPIX_CRITERIA = (cv.TERM_CRITERIA_EPS + cv.TERM_CRITERIA_MAX_ITER, 30, 1e-3)
+
+# (sha256, pattern_dim, subpix) -> (N, 2) float32 corners, or None if the pattern was not found
+_corners = {}
+# path -> (mtime, size, sha256), so that unchanged files are not read again to be hashed
+_hashes = {}
+# guards both caches (sessions run in threads)
+_lock = threading.Lock()
+
+
+def file_hash(path):
+    """
+    SHA-256 of a file, recomputed only when its modification time or size changes.
+    """
+    stat = os.stat(path)
+    with _lock:
+        known = _hashes.get(path)
+    if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+        return known[2]
+    # the file is read outside the lock: a concurrent hash of the same file only repeats the work
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    with _lock:
+        _hashes[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def read_chessboard(path):
+    """
+    :return: grayscale image, inverted if needed so that the squares are dark on a bright background
+    """
+    image = cv.imread(path, 0)
+    if np.mean(image) < np.max(image // 2):
+        image = cv.bitwise_not(image)
+    return image
+
+
+def find_corners(image, pattern_dim, subpix=False):
+    """
+    :param image: grayscale image
+    :param pattern_dim: (columns, rows) of inner corners
+    :param subpix: refine the corners with cv.cornerSubPix
+    :return: (N, 2) float32 corners, or None if the pattern is not found
+    """
+    ret, corners = cv.findChessboardCorners(image, patternSize=pattern_dim)
+    if not ret:
+        return None
+    if subpix:
+        corners = cv.cornerSubPix(image, corners, SUBPIX_WINDOW, (-1, -1), SUBPIX_CRITERIA)
+    return corners.reshape(-1, 2)
+
+
+def detect_corners(paths, pattern_dim, subpix=False, workers=None):
+    """
+    Corners of every image, from the cache or detected in parallel.
+    :param paths: image files
+    :param pattern_dim: (columns, rows) of inner corners
+    :param subpix: refine the corners with cv.cornerSubPix
+    :param workers: size of the thread pool (default: one per CPU, at most the number of new images)
+    :return: list of (N, 2) float32 arrays (None where the pattern is not found), in the order of paths
+        (shared by the cache: treat as read-only)
+    """
+    keys = [(file_hash(path), tuple(pattern_dim), subpix) for path in paths]
+    with _lock:
+        missing = {key: path for key, path in zip(keys, paths) if key not in _corners}
+
+    def detect(path):
+        return find_corners(read_chessboard(path), pattern_dim, subpix)
+
+    if len(missing) == 1:
+        found = [detect(*missing.values())]
+    elif missing:
+        with ThreadPoolExecutor(min(workers or os.cpu_count() or 1, len(missing))) as pool:
+            found = list(pool.map(detect, missing.values()))
+    else:
+        found = []
+    for corners in found:
+        if corners is not None:
+            corners.flags.writeable = False
+    with _lock:
+        _corners.update(zip(missing, found))
+        return [_corners[key] for key in keys]
@@ -7,10 +7,9 @@ Created on Wed Feb 2 12:00:00 2022
 
 # imports
 import streamlit as st
-from PIL import Image, ImageFilter, ImageEnhance
+from PIL import Image
 import cv2 as cv
 import numpy as np
-import scipy.ndimage
 
 from skimage import data, util, io
 from skimage.exposure import rescale_intensity
@@ -20,13 +19,16 @@ from skimage.transform import warp, AffineTransform
 from skimage.draw import ellipse
 
 from os import path
-from scipy import optimize as opt
 import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
 from matplotlib import patches
-import requests
-from io import BytesIO
-import urllib
+
+import assets
+import calibration
+import chessboard
+import paraxial
+import pinhole
+import projective
 
 
 def main():
@@ -52,7 +54,7 @@ def main():
         camera_intrinsics()
         
     if selected_box == "Camera Extrinsics":
-        camera_intrinsics()
+        camera_extrinsics()
 
 
 def welcome():
@@ -71,46 +73,6 @@ def load_image(filename):
     return image
 
 
-# One-time preprocessing for pinhole camera model
-# Download images to avoid doing so repetitively
-urllib.request.urlretrieve("https://i.imgur.com/MHlfq0o.png", "subj.png")
-url_bg = "https://wallpapercave.com/wp/JYodMo6.jpg"
-response_bg = requests.get(url_bg)
-dataBytesIO_bg = BytesIO(response_bg.content)
-bg = Image.open(dataBytesIO_bg)
-# One-time preprocessing
-subj_w_bg = cv.imread("subj.png", 1)
-temp = cv.cvtColor(subj_w_bg, cv.COLOR_BGR2GRAY)
-_, alpha = cv.threshold(temp, 0, 255, cv.THRESH_BINARY)
-b, g, r = cv.split(subj_w_bg)
-rgba = [b, g, r, alpha]
-dest = cv.merge(rgba, 4)
-cv.imwrite("pinhole_temp.png", dest)
-subj = Image.open("pinhole_temp.png")
-
-# Helper function to simulate real-world camera capture
-def capture(background, subject, val, focus):
-    # Blur background/foreground to simulate a change in focus
-    if focus == 0:
-        background = background.filter(ImageFilter.GaussianBlur(radius=val))
-    else:
-        subject = subject.filter(ImageFilter.GaussianBlur(radius=val))
-
-    # Horizontal and vertical spacing with bicubic resampling
-    #img.thumbnail((400, 400), resample=Image.BICUBIC)
-
-    # Convert images to RGBA
-    subj1 = subject.convert("RGBA")
-    bg1 = background.convert("RGBA")
-    # Center our gaucho image along the background
-    width = (bg1.width - subj1.width) // 2
-    height = (bg1.height - subj1.height) // 2
-    # Paste gaucho at the center
-    bg1.paste(subj1, (width, height), subj1)
-    bg1.save("merged.png", format="png")
-    # Reopen the merged ('faux capture') image
-    return Image.open("merged.png")
-
 def pinhole_camera_model():
     """
     Author: Rami Dabit
@@ -124,60 +86,20 @@ def pinhole_camera_model():
     foc = st.radio(
         "Focus select",
         ('Foreground','Background'))
-    if foc == 'Foreground':
-        image = capture(bg,subj,65-x,0)
-    else:
-        image = capture(bg,subj,65-x,1)
-
-    width, height = image.size
-    # If we zoom in while keeping the aperture constant, the background becomes more blurred.
 
+    eso = st.slider('Adjust camera exposure (ESO)',min_value=0.0,max_value=2.0,value=1.0)
+    undistort = False
     if f < 35:
-        k_1 = 0.4
-        k_2 = 0.1
-
-        # Meshgrid for interpolation mapping
-        x,y = np.meshgrid(np.float32(np.arange(width)),np.float32(np.arange(height)))
-
-        # Center and scale grid for radius calculation
-        x_c = width/2 
-        y_c = height/2 
-        x = x - x_c
-        y = y - y_c
-        x = x / x_c
-        y = y / y_c
-        radius = np.sqrt(x**2 + y**2)
-
-        # Radial distortion model
-        m_r = 1 + k_1*radius + k_2*radius**2
-        # Apply model
-        x= x * m_r
-        y = y * m_r
-        # Reset shifts
-        x = x*x_c + x_c
-        y = y*y_c + y_c
-
-        image = np.asarray(image)
-        distorted = np.zeros(image.shape)
-        distorted0 = scipy.ndimage.map_coordinates(image[:,:,0], [y.ravel(),x.ravel()])
-        distorted1 = scipy.ndimage.map_coordinates(image[:,:,1], [y.ravel(),x.ravel()])
-        distorted2 = scipy.ndimage.map_coordinates(image[:,:,2], [y.ravel(),x.ravel()])
-        distorted3 = scipy.ndimage.map_coordinates(image[:,:,3], [y.ravel(),x.ravel()])
-
-        distorted = np.dstack((distorted2, distorted1, distorted0, distorted3))
-        distorted.resize(image.shape)
-
-        cv.imwrite("distorted.png",distorted)
-        image = Image.open("distorted.png")
-    
-    image = image.crop((2*f, 0, width-2*f, height-np.floor(3*f/2)))
+        undistort = st.checkbox('Correct the lens distortion (undistort)', value=False)
 
-    eso = st.slider('Adjust camera exposure (ESO)',min_value=0.0,max_value=2.0,value=1.0)
-    enhancer = ImageEnhance.Brightness(image)
-    image = enhancer.enhance(eso)
+    # images are fetched (or read from the local cache) on first use only
+    bg = assets.pinhole_background()
+    subj = assets.pinhole_subject()
+    # the whole capture stays in memory; arrays reused between reruns belong to this session
+    buffers = st.session_state.setdefault('pinhole_buffers', {})
+    image = pinhole.sensor_view(bg, subj, x, f, foc, eso, undistort, buffers)
 
-    image.save("res_img.png", format="png")
-    st.image(Image.open("res_img.png"), use_column_width=True,clamp = True)
+    st.image(image, use_column_width=True,clamp = True)
 
 
 def paraxial_camera_model():
@@ -229,15 +151,9 @@ def paraxial_camera_model():
     # object
     zo = st.slider(label='Change object distance', min_value=100, max_value=10000, value=500)
     yo = st.slider(label='Change object height', min_value=-20, max_value=20, value=(-15, -16))
-    yo_num = st.slider(label='Change number of object points', min_value=1, max_value=20, value=1)
-
-    def model_pinhole(zo, yo, zi):
-        yi = zi * yo / zo
-        return yi
-
-    def thin_lens_model(zo, f=f):
-        zi = 1 / (1 / f - 1 / zo)
-        return zi
+    yo_num = st.slider(label='Change number of object points', min_value=1, max_value=200, value=1)
+    zo_num = st.slider(label='Change number of object distances (from the object distance to twice it)',
+                       min_value=1, max_value=10, value=1)
 
     # shape of the lens
     def add_lens_patch(width, height, xcenter=0, ycenter=0, angle=0):
@@ -260,8 +176,7 @@ def paraxial_camera_model():
 
     def model_paraxial_lens(zo, yo, f, d, ccd_z, ccd_h):
 
-        if isinstance(yo, (int, float)):
-            yo = [yo]
+        yo = np.atleast_1d(yo)
 
         # create figure
         fig = plt.figure(figsize=(14, 7))
@@ -276,7 +191,7 @@ def paraxial_camera_model():
         ax2.axhline(0, color='black', linewidth=0.5, alpha=0.5, zorder=1.5)
 
         # lens
-        for width, ax in zip([f / 10, zo / 5.555], [ax1, ax2]):
+        for width, ax in zip([f / 10, np.max(zo) / 5.555], [ax1, ax2]):
             ax.add_patch(add_lens_patch(width=width, height=d))
             ax.add_patch(add_lens_patch(width=width, height=d))
 
@@ -287,76 +202,10 @@ def paraxial_camera_model():
         # focal plane
         ax1.plot([-f, -f], [-ccd_h / 2, ccd_h / 2], color='black', linestyle='--', alpha=0.125, label='Focal Plane')
 
-        # initialize
-        counter = 0
-        yo_i_i = 0
-        yi_i = 0
-
-        for i, yo_i in enumerate(yo):
-
-            # in focus axial position
-            zi = thin_lens_model(zo, f)
-
-            # in focus height
-            yi = model_pinhole(zo, yo_i, zi)
-
-            # angle of light cone
-            theta = np.arcsin(d / (2 * zo))
-
-            # invert for plotting
-            zi = -zi
-            yi = -yi
-
-            # store initial value
-            if i == 0:
-                yo_i_i = yo_i
-                yi_i = yi
-
-            # rays - object
-            ray_obj_z = [zo, 0]
-            ray_obj_top = [yo_i, d / 2]
-            ray_obj_center = [yo_i, 0]
-            ray_obj_bottom = [yo_i, -d / 2]
-
-            # rays - image
-            ray_img_z = [0, zi]
-            ray_img_top = [d / 2, yi]
-            ray_img_center = [0, yi]
-            ray_img_bottom = [-d / 2, yi]
-
-            # rays intersecting at ccd
-            ray_ccd_top = -(d / 2 - yi) * ccd_z / zi + d / 2
-            ray_ccd_center = yi * ccd_z / zi
-            ray_ccd_bottom = -(-d / 2 - yi) * ccd_z / zi - d / 2
-
-            # conditional labeling
-            if i == len(yo) - 1:
-                ax1.scatter(zi, yi, color='blue', label='Image')
-                ax2.scatter(zo, yo_i, color='red', label='Object')
-            else:
-                ax1.scatter(zi, yi, color='blue')
-                ax2.scatter(zo, yo_i, color='red')
-
-            # image formation
-            ax1.plot([zi, zi], [yi_i, yi], color='blue', linestyle=':', linewidth=2)
-            ax1.plot(ray_img_z, ray_img_top, color='blue', alpha=0.25)
-            ax1.plot(ray_img_z, ray_img_center, color='blue', alpha=0.25)
-            ax1.plot(ray_img_z, ray_img_bottom, color='blue', alpha=0.25)
-
-            # object formation
-            ax2.plot([zo, zo], [yo_i_i, yo_i], color='red', linestyle=':', linewidth=2)
-            ax2.plot(ray_obj_z, ray_obj_top, color='red', alpha=0.25)
-            ax2.plot(ray_obj_z, ray_obj_center, color='red', alpha=0.25)
-            ax2.plot(ray_obj_z, ray_obj_bottom, color='red', alpha=0.25)
-
-            # rays intersecting ccd
-            for ray_ccd in [ray_ccd_top, ray_ccd_center, ray_ccd_bottom]:
-                if -ccd_h / 2 < ray_ccd < ccd_h / 2:
-                    if counter == 0:
-                        ax1.scatter(ccd_z, ray_ccd, marker='.', color='green', alpha=0.99, label=r'$Ray_{sensor}$')
-                        counter = counter + 1
-                    else:
-                        ax1.scatter(ccd_z, ray_ccd, marker='.', color='green', alpha=0.99)
+        # all object points traced at once, one artist per bundle of rays
+        rays = paraxial.trace_rays(np.asarray(zo)[..., None], yo, f, d, ccd_z)
+        paraxial.draw_rays(ax1, ax2, rays, ccd_z, ccd_h)
+        zi, yi, theta = rays['zi'].ravel()[-1], rays['yi'].ravel()[-1], rays['theta'].ravel()[-1]
 
         # figure formatting
         ax1.set_xlim([-150, 0])
@@ -365,7 +214,7 @@ def paraxial_camera_model():
         ax1.set_xlabel(r'Distance $_{image \: plane}$', fontsize=18)
         ax1.set_ylabel('Height', fontsize=18)
 
-        ax2.set_xlim([0, zo * 1.25])
+        ax2.set_xlim([0, np.max(zo) * 1.25])
         ax2.set_ylim([-25, 25])
         ax2.yaxis.set_label_position("right")
         ax2.yaxis.tick_right()
@@ -385,7 +234,8 @@ def paraxial_camera_model():
         yoi = np.mean(yo)
     else:
         yoi = np.linspace(np.min(yo), np.max(yo), yo_num)
-    zi, yi, theta = model_paraxial_lens(zo, yoi, f, d, ccd_z, ccd_h)
+    zoi = zo if zo_num == 1 else np.linspace(zo, 2 * zo, zo_num)
+    zi, yi, theta = model_paraxial_lens(zoi, yoi, f, d, ccd_z, ccd_h)
 
     image_position_string = "Image height yi = {} at axial distance zi = {}".format(np.round(-yi, 2), np.round(-zi, 2))
     numerical_aperture_string = "Viewing angle = {} degrees".format(np.round(theta * 360 / (2 * np.pi), 2))
@@ -404,11 +254,9 @@ def homography():
     # ========================================================
     # my own start
 
-    url = 'https://images.unsplash.com/photo-1613048998835-efa6e3e3dc1b?ixlib=rb-1.2.1&ixid=MnwxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8&auto=format&fit=crop&w=1074&q=80'
-
-    response = requests.get(url)
-    imgfile = Image.open(BytesIO(response.content))
-    img = np.array(imgfile)
+    # the asset is loaded once per process, so its warps are cached across reruns
+    warp = projective.homography_warp(assets.load_asset('homography'))
+    img = warp.image
 
     if st.button('Original Image'):
         # [Remind] use st.image to plot
@@ -416,57 +264,11 @@ def homography():
 
     my_phi = st.slider('Change angle to decide camera position', min_value=-35, max_value=35, value=0)
     my_k = st.slider('Change Value to zoon in or zoom out', min_value=-0.2, max_value=1.0, value=0.2)
+    full_resolution = st.checkbox('Full resolution', value=False)
 
-    # Setting Parameter
-    # phi = 25 # [-70~70]
-    # unit degree
-    phi = my_phi
-    scale_factor = 1  # (this is optional)
-
-    # k = 0.7 # need to be positive-value
-    k = my_k
-    b = 0.5  # fix
-
-    increment = ((k + b) / b) * np.tan((phi / 180) * 3.14)
-    l_side = np.sqrt(((k + b) / b) ** 2 + (k + b) ** 2) + increment
-    r_side = np.sqrt(((k + b) / b) ** 2 + (k + b) ** 2) - increment
-
-    origin_len = img.shape[0] / 2
-    origin_wid = img.shape[1] / 2
-
-    transform_center = [origin_wid, origin_len]
-
-    transform_l = (np.sqrt(1 + b ** 2) / l_side) * origin_len
-    transform_r = (np.sqrt(1 + b ** 2) / r_side) * origin_len
-    transform_wid = origin_wid * (b / (k + b))
-
-    # source coordinates
-    src_i = np.array([0, 0,
-                      0, img.shape[0],
-                      img.shape[1], img.shape[0],
-                      img.shape[1], 0, ]).reshape((4, 2))
-
-    # destination coordinates
-    dst_i = np.array(
-        [transform_center[0] - transform_wid * scale_factor, transform_center[1] - transform_l * scale_factor,
-         transform_center[0] - transform_wid * scale_factor, transform_center[1] + transform_l * scale_factor,
-         transform_center[0] + transform_wid * scale_factor, transform_center[1] + transform_r * scale_factor,
-         transform_center[0] + transform_wid * scale_factor,
-         transform_center[1] - transform_r * scale_factor, ]).reshape((4, 2))
-
-    # using skimage’s transform module where ‘projective’ is our desired parameter
-    tform = transform.estimate_transform('projective', src_i, dst_i)
-    tf_img = transform.warp(img, tform.inverse)
-
-    # plotting the original image
-    plt.imshow(img)
-
-    # plotting the transformed image
-    fig, ax = plt.subplots()
-    ax.imshow(tf_img)
-    _ = ax.set_title('projective transformation')
-    plt.plot(transform_center[0], transform_center[1], 'x')
-    plt.show()
+    # projective transformation of the camera position (phi in degrees, k: zoom),
+    # previewed at low resolution while the sliders move
+    tf_img = warp.full(my_phi, my_k) if full_resolution else warp.preview(my_phi, my_k)
 
     # streamlit explanation
     if my_phi > 0:
@@ -677,39 +479,27 @@ def camera_intrinsics():
 
     def get_camera_images(num_images=4):
         images = ['tutorials/image-formation/syn_chessboard_4x4_{}.tif'.format(each) for each in np.arange(1, num_images + 1)]
-        images = sorted(images)
-        for each in images:
-            yield (each, cv.imread(each, 0))
+        return sorted(images)
 
     def getChessboardCorners(images=None, visualize=False, num_images=4):
         objp = np.zeros((pattern_dim[1] * pattern_dim[0], 3), dtype=np.float64)
         objp[:, :2] = np.indices(pattern_dim).T.reshape(-1, 2)
         objp *= square_dim
 
-        chessboard_corners = []
-        image_points = []
-        object_points = []
         correspondences = []
-        counter = 0
-        for (path, each) in get_camera_images(num_images=num_images):  # images:
-
-            if np.mean(each) < np.max(each // 2):
-                each = cv.bitwise_not(each)
-
-            ret, corners = cv.findChessboardCorners(each, patternSize=pattern_dim)
-            if ret:
-                corners = corners.reshape(-1, 2)
-
+        paths = get_camera_images(num_images=num_images)
+        # detection of the images not seen yet runs in parallel, the others come from the cache
+        detected = chessboard.detect_corners(paths, pattern_dim)
+        for counter, (path, corners) in enumerate(zip(paths, detected)):
+            if corners is not None:
                 if corners.shape[0] == objp.shape[0]:
-                    image_points.append(corners)
-                    object_points.append(objp[:, :-1])
                     assert corners.shape == objp[:, :-1].shape, "mismatch shape corners and objp[:,:-1]"
                     correspondences.append([corners.astype(int), objp[:, :-1].astype(int)])
 
                 if visualize:
                     # Draw and display the corners
-                    ec = cv.cvtColor(each, cv.COLOR_GRAY2BGR)
-                    cv.drawChessboardCorners(ec, pattern_dim, corners, ret)
+                    ec = cv.cvtColor(chessboard.read_chessboard(path), cv.COLOR_GRAY2BGR)
+                    cv.drawChessboardCorners(ec, pattern_dim, corners, True)
 
                     # to show via skimage
                     fig, ax = plt.subplots(figsize=(4,4))
@@ -719,225 +509,18 @@ def camera_intrinsics():
             else:
                 print("Error in detection points: ", counter)
 
-            counter += 1
-
         return correspondences
 
-    def compute_view_based_homography(correspondence, reproj=False):
-        """
-        correspondence = (imp, objp, normalized_imp, normalized_objp, N_u, N_x, N_u_inv, N_x_inv)
-        """
-        image_points = correspondence[0]
-        object_points = correspondence[1]
-        normalized_image_points = correspondence[2]
-        normalized_object_points = correspondence[3]
-        N_u = correspondence[4]
-        N_x = correspondence[5]
-        N_u_inv = correspondence[6]
-        N_x_inv = correspondence[7]
-
-        N = len(image_points)
-        M = np.zeros((2 * N, 9), dtype=np.float64)
-
-        # create row wise allotment for each 0-2i rows
-        for i in range(N):
-            X, Y = normalized_object_points[i]  # A
-            u, v = normalized_image_points[i]  # B
-
-            row_1 = np.array([-X, -Y, -1, 0, 0, 0, X * u, Y * u, u])
-            row_2 = np.array([0, 0, 0, -X, -Y, -1, X * v, Y * v, v])
-            M[2 * i] = row_1
-            M[(2 * i) + 1] = row_2
-
-        # M.h  = 0 . solve system of linear equations using SVD
-        u, s, vh = np.linalg.svd(M)
-
-        h_norm = vh[np.argmin(s)]
-        h_norm = h_norm.reshape(3, 3)
-
-        # h = h_norm
-        h = np.matmul(np.matmul(N_u_inv, h_norm), N_x)
-
-        # if abs(h[2, 2]) > 10e-8:
-        h = h[:, :] / h[2, 2]
-
-        # print("Normalized Homography Matrix for View : \n", h_norm)
-        # print("Homography for View : \n", h)
-
-        return h
-
-    def normalize_points(chessboard_correspondences):
-        views = len(chessboard_correspondences)
-
-        def get_normalization_matrix(pts, name="A"):
-            pts = pts.astype(np.float64)
-            x_mean, y_mean = np.mean(pts, axis=0)
-            var_x, var_y = np.var(pts, axis=0)
-            s_x, s_y = np.sqrt(2 / var_x), np.sqrt(2 / var_y)
-            n = np.array([[s_x, 0, -s_x * x_mean], [0, s_y, -s_y * y_mean], [0, 0, 1]])
-
-            n_inv = np.array([[1. / s_x, 0, x_mean], [0, 1. / s_y, y_mean], [0, 0, 1]])
-            return n.astype(np.float64), n_inv.astype(np.float64)
-
-        ret_correspondences = []
-        for i in range(views):
-            imp, objp = chessboard_correspondences[i]
-            N_x, N_x_inv = get_normalization_matrix(objp, "A")
-            N_u, N_u_inv = get_normalization_matrix(imp, "B")
-
-            # convert imp, objp to homogeneous
-            hom_imp = np.array([[[each[0]], [each[1]], [1.0]] for each in imp])
-            hom_objp = np.array([[[each[0]], [each[1]], [1.0]] for each in objp])
-
-            normalized_hom_imp = hom_imp
-            normalized_hom_objp = hom_objp
-
-            for i in range(normalized_hom_objp.shape[0]):
-                # 54 points iterate one by one & all points are homogeneous
-                n_o = np.matmul(N_x, normalized_hom_objp[i])
-                normalized_hom_objp[i] = n_o / n_o[-1]
-
-                n_u = np.matmul(N_u, normalized_hom_imp[i])
-                normalized_hom_imp[i] = n_u / n_u[-1]
-
-            normalized_objp = normalized_hom_objp.reshape(normalized_hom_objp.shape[0], normalized_hom_objp.shape[1])
-            normalized_imp = normalized_hom_imp.reshape(normalized_hom_imp.shape[0], normalized_hom_imp.shape[1])
-
-            normalized_objp = normalized_objp[:, :-1]
-            normalized_imp = normalized_imp[:, :-1]
-
-            ret_correspondences.append((imp, objp, normalized_imp, normalized_objp, N_u, N_x, N_u_inv, N_x_inv))
-
-        return ret_correspondences
-
-    def minimizer_func(initial_guess, X, Y, h, N):
-        """
-        :param initial_guess:
-        :param X:  normalized object points flattened
-        :param Y:  normalized image points flattened
-        :param h:  homography flattened
-        :param N:  number of points
-        :return:
-        """
-
-        x_j = X.reshape(N, 2)
-        # Y = Y.reshape(N, 2)
-        # h = h.reshape(3, 3)
-
-        projected = [0 for i in range(2 * N)]
-        for j in range(N):
-            x, y = x_j[j]
-            w = h[6] * x + h[7] * y + h[8]
-
-            projected[2 * j] = (h[0] * x + h[1] * y + h[2]) / w
-            projected[2 * j + 1] = (h[3] * x + h[4] * y + h[5]) / w
-
-        return (np.abs(projected - Y)) ** 2
-
-    def jac_function(initial_guess, X, Y, h, N):
-        x_j = X.reshape(N, 2)
-        jacobian = np.zeros((2 * N, 9), np.float64)
-        for j in range(N):
-            x, y = x_j[j]
-            sx = np.float64(h[0] * x + h[1] * y + h[2])
-            sy = np.float64(h[3] * x + h[4] * y + h[5])
-            w = np.float64(h[6] * x + h[7] * y + h[8])
-            jacobian[2 * j] = np.array([x / w, y / w, 1 / w, 0, 0, 0, -sx * x / w ** 2, -sx * y / w ** 2, -sx / w ** 2])
-            jacobian[2 * j + 1] = np.array(
-                [0, 0, 0, x / w, y / w, 1 / w, -sy * x / w ** 2, -sy * y / w ** 2, -sy / w ** 2])
-
-        return jacobian
-
-    def refine_homographies(H, correspondence, skip=False):
-        if skip:
-            return H
-
-        image_points = correspondence[0]
-        object_points = correspondence[1]
-        normalized_image_points = correspondence[2]
-        normalized_object_points = correspondence[3]
-        N_u = correspondence[4]
-        N_x = correspondence[5]
-        N_u_inv = correspondence[6]
-        N_x_inv = correspondence[7]
-
-        N = normalized_object_points.shape[0]
-        X = object_points.flatten()
-        Y = image_points.flatten()
-        h = H.flatten()
-        h_prime = opt.least_squares(fun=minimizer_func, x0=h, jac=jac_function, method="lm", args=[X, Y, h, N],
-                                    verbose=0)
-
-        if h_prime.success:
-            H = h_prime.x.reshape(3, 3)
-        H = H / H[2, 2]
-        return H
-
-    def get_intrinsic_parameters(H_r):
-        M = len(H_r)
-        V = np.zeros((2 * M, 6), np.float64)
-
-        def v_pq(p, q, H):
-            v = np.array([
-                H[0, p] * H[0, q],
-                H[0, p] * H[1, q] + H[1, p] * H[0, q],
-                H[1, p] * H[1, q],
-                H[2, p] * H[0, q] + H[0, p] * H[2, q],
-                H[2, p] * H[1, q] + H[1, p] * H[2, q],
-                H[2, p] * H[2, q]
-            ])
-            return v
-
-        for i in range(M):
-            H = H_r[i]
-            V[2 * i] = v_pq(p=0, q=1, H=H)
-            V[2 * i + 1] = np.subtract(v_pq(p=0, q=0, H=H), v_pq(p=1, q=1, H=H))
-
-        # solve V.b = 0
-        u, s, vh = np.linalg.svd(V)
-        b = vh[np.argmin(s)]
-
-        # according to Zhang's method
-        vc = (b[1] * b[3] - b[0] * b[4]) / (b[0] * b[2] - b[1] ** 2)
-        l = b[5] - (b[3] ** 2 + vc * (b[1] * b[2] - b[0] * b[4])) / b[0]
-        alpha = np.sqrt((l / b[0]))
-        beta = np.sqrt(((l * b[0]) / (b[0] * b[2] - b[1] ** 2)))
-        gamma = -1 * ((b[1]) * (alpha ** 2) * (beta / l))
-        uc = (gamma * vc / beta) - (b[3] * (alpha ** 2) / l)
-
-        print([vc,
-               l,
-               alpha,
-               beta,
-               gamma,
-               uc])
-
-        A = np.array([
-            [alpha, gamma, uc],
-            [0, beta, vc],
-            [0, 0, 1.0],
-        ])
-        print("Intrinsic Camera Matrix is :")
-        print(A)
-        return A
-
     chessboard_correspondences = getChessboardCorners(images=None, visualize=True, num_images=num_images)
+    image_points = np.array([imp for imp, objp in chessboard_correspondences])
+    object_points = np.array([objp for imp, objp in chessboard_correspondences])
 
-    chessboard_correspondences_normalized = normalize_points(chessboard_correspondences)
-
-    print("M = ", len(chessboard_correspondences_normalized), " view images")
-    print("N = ", len(chessboard_correspondences_normalized[0][0]), " points per image")
-
-    H = []
-    for correspondence in chessboard_correspondences_normalized:
-        H.append(compute_view_based_homography(correspondence, reproj=False))
+    print("M = ", image_points.shape[0], " view images")
+    print("N = ", image_points.shape[1], " points per image")
 
-    H_r = []
-    for i in range(len(H)):
-        h_opt = refine_homographies(H[i], chessboard_correspondences_normalized[i], skip=False)
-        H_r.append(h_opt)
-
-    A = get_intrinsic_parameters(H_r)
+    A, H = calibration.calibrate(image_points, object_points)
+    print("Intrinsic Camera Matrix is :")
+    print(A)
 
     # print results
     string_intrinsic = "The intrinsic camera matrix is: \n {}".format(A)
@@ -951,5 +534,74 @@ def camera_intrinsics():
             "image (view) using the corresponding homography, H.")
 
 
+def camera_extrinsics():
+    """
+    Pose of each calibration view and bundle adjustment of the whole camera model.
+    :return:
+    """
+    st.title("Camera Extrinsic Parameters")
+    st.subheader("Where was the chessboard in each view?")
+
+    st.text("Zhang's closed form gives the intrinsic matrix A from the homographies H of the views.\n"
+            "Since the chessboard lies in the plane Z = 0, each homography is A times the first two \n"
+            "columns of the rotation and the translation, up to a scale factor,")
+    st.latex(r'H = \begin {pmatrix} h_1 & h_2 & h_3 \end {pmatrix} = '
+             r'\lambda A \begin {pmatrix} r_1 & r_2 & t \end {pmatrix}')
+    st.text("so that the pose of the view follows from,")
+    st.latex(r'\lambda = \frac{1}{\| A^{-1} h_1 \|}, \quad r_1 = \lambda A^{-1} h_1, \quad '
+             r'r_2 = \lambda A^{-1} h_2, \quad r_3 = r_1 \times r_2, \quad t = \lambda A^{-1} h_3')
+    st.caption("Note: with noisy corners [r_1, r_2, r_3] is not exactly a rotation: "
+               "the closest rotation matrix is used.")
+
+    st.subheader("Bundle adjustment")
+    st.text("Real lenses also distort the image radially and tangentially,")
+    st.latex(r'x_d = x (1 + k_1 r^2 + k_2 r^4 + k_3 r^6) + 2 p_1 x y + p_2 (r^2 + 2 x^2), \quad '
+             r'y_d = y (1 + k_1 r^2 + k_2 r^4 + k_3 r^6) + p_1 (r^2 + 2 y^2) + 2 p_2 x y')
+    st.text("The intrinsics, the distortion and the poses of all views are then refined together \n"
+            "by minimizing the reprojection error of every corner (Levenberg-Marquardt). The \n"
+            "intrinsics are shared by all views, but each pose only concerns its own view: the \n"
+            "sparse structure keeps the cost linear in the number of views.")
+
+    st.header("Demonstration of Camera Extrinsic Parameters")
+
+    num_images = st.slider(label='Change number of calibration images used to compute the extrinsic parameters.',
+                           min_value=3, max_value=4, value=4)
+
+    subpix = st.checkbox('Refine the corners to sub-pixel accuracy (cv.cornerSubPix)', value=False)
+
+    pattern_dim = (4, 5)
+    objp = np.indices(pattern_dim).T.reshape(-1, 2).astype(np.float64)
+    paths = ['tutorials/image-formation/syn_chessboard_4x4_{}.tif'.format(i) for i in range(1, num_images + 1)]
+    corners = chessboard.detect_corners(paths, pattern_dim, subpix)
+    image_points = np.array([each for each in corners if each is not None], dtype=np.float64)
+    object_points = np.broadcast_to(objp, image_points.shape)
+    image_size = Image.open(paths[0]).size
+
+    A, distortion, rvecs, tvecs, rms = calibration.calibrate_camera(image_points, object_points, image_size)
+
+    st.text("The intrinsic camera matrix after bundle adjustment is: \n {}".format(np.round(A, 2)))
+    st.text("The distortion coefficients (k_1, k_2, p_1, p_2, k_3) are: \n {}".format(np.round(distortion, 4)))
+    st.text("The RMS reprojection error is {:.3f} pixels.".format(rms))
+    st.caption("Note: the bundled chessboards are affine warps of a flat image (no perspective), \n"
+               "so the focal lengths are poorly constrained by these views.")
+
+    fig = plt.figure(figsize=(6, 5))
+    ax = fig.add_subplot(projection='3d')
+    R = calibration.rotation_matrices(rvecs)
+    for i, (r, t) in enumerate(zip(R, tvecs)):
+        board = objp @ r[:, :2].T + t
+        ax.plot_trisurf(board[:, 0], board[:, 2], -board[:, 1], alpha=0.5)
+        ax.text(*(board[0, 0], board[0, 2], -board[0, 1]), 'View #{}'.format(i + 1), fontsize=8)
+    ax.scatter([0], [0], [0], color='k', marker='^')
+    ax.set_xlabel('x')
+    ax.set_ylabel('z (optical axis)')
+    ax.set_zlabel('-y')
+    plt.title("Chessboard poses in the camera frame (units: squares)")
+    st.pyplot(fig=fig)
+
+    for i, (r, t) in enumerate(zip(rvecs, tvecs)):
+        st.text("View #{}: rotation vector {}, translation {}".format(i + 1, np.round(r, 3), np.round(t, 2)))
+
+
 if __name__ == "__main__":
     main()
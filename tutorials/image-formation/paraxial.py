@@ -0,0 +1,89 @@
+"""
+Ray tracing of the paraxial (thin lens) camera model, for arrays of object points.
+
+Every object point sends three rays through the lens (top edge, center, bottom
+edge), which meet again at its image. The image points, the ray segments and
+their intersections with the sensor are computed for all object points in one
+pass of numpy broadcasting, and each bundle of rays is drawn as a single
+LineCollection, so the plot costs a handful of artists whatever the number of
+object points (a full 2-D grid of distances and heights included).
+"""
+
+import numpy as np
+from matplotlib.collections import LineCollection
+
+# height of the rays at the lens, in lens diameters: top edge, center, bottom edge
+LENS_RAYS = np.array([0.5, 0.0, -0.5])
+
+
+def thin_lens(zo, f):
+    """
+    :param zo: object distance(s)
+    :param f: focal length
+    :return: image distance(s) 1 / (1 / f - 1 / zo)
+    """
+    return 1 / (1 / f - 1 / np.asarray(zo, dtype=np.float64))
+
+
+def trace_rays(zo, yo, f, d, ccd_z):
+    """
+    Image points and rays of object points, on the plot axes (image side: z and y inverted).
+    :param zo, yo: object distances and heights, broadcast together (e.g. zo[:, None], yo[None, :] for a grid)
+    :param f: focal length
+    :param d: lens diameter
+    :param ccd_z: sensor position (negative, image side)
+    :return: dict of arrays with the broadcast shape S of the object points:
+        'zo', 'yo' (S), 'zi', 'yi' (S, image point), 'theta' (S, half angle of the light cone),
+        'object_rays' (S + (3, 2, 2), object point -> lens), 'image_rays' (S + (3, 2, 2), lens -> image point),
+        'ccd_y' (S + (3,), height of each ray on the sensor plane)
+    """
+    zo, yo = np.broadcast_arrays(np.asarray(zo, dtype=np.float64), np.asarray(yo, dtype=np.float64))
+    # in focus axial position and height (pinhole through the lens center), inverted for plotting
+    zi = -thin_lens(zo, f)
+    yi = zi * yo / zo
+    theta = np.arcsin(d / (2 * zo))
+
+    lens_y = np.broadcast_to(LENS_RAYS * d, zo.shape + (3,))
+    zeros = np.zeros_like(lens_y)
+    object_start = np.stack(np.broadcast_arrays(zo[..., None], yo[..., None]), axis=-1)
+    image_end = np.stack(np.broadcast_arrays(zi[..., None], yi[..., None]), axis=-1)
+    lens = np.stack([zeros, lens_y], axis=-1)
+    object_rays = np.stack([np.broadcast_to(object_start, lens.shape), lens], axis=-2)
+    image_rays = np.stack([lens, np.broadcast_to(image_end, lens.shape)], axis=-2)
+    # straight line from the lens to the image point, at z = ccd_z
+    ccd_y = lens_y + (yi[..., None] - lens_y) * ccd_z / zi[..., None]
+    return {'zo': zo, 'yo': yo, 'zi': zi, 'yi': yi, 'theta': theta,
+            'object_rays': object_rays, 'image_rays': image_rays, 'ccd_y': ccd_y}
+
+
+def draw_rays(ax_image, ax_object, rays, ccd_z, ccd_h):
+    """
+    Draw traced rays: one LineCollection per bundle and one scatter per kind of point.
+    :param ax_image, ax_object: axes of the image side and of the object side
+    :param rays: result of trace_rays
+    :param ccd_z, ccd_h: sensor position and size
+    """
+    # one row of heights per object distance
+    zo, yo, zi, yi = (np.atleast_1d(rays[key]).reshape(-1, np.atleast_1d(rays[key]).shape[-1])
+                      for key in ('zo', 'yo', 'zi', 'yi'))
+
+    # vertical dotted line from the image (object) of the first height to the others, at each distance
+    image_extent = np.stack([np.stack([zi, np.broadcast_to(yi[:, :1], yi.shape)], axis=-1),
+                             np.stack([zi, yi], axis=-1)], axis=-2).reshape(-1, 2, 2)
+    object_extent = np.stack([np.stack([zo, np.broadcast_to(yo[:, :1], yo.shape)], axis=-1),
+                              np.stack([zo, yo], axis=-1)], axis=-2).reshape(-1, 2, 2)
+    ax_image.add_collection(LineCollection(image_extent, colors='blue', linestyles=':', linewidths=2))
+    ax_object.add_collection(LineCollection(object_extent, colors='red', linestyles=':', linewidths=2))
+
+    ax_image.add_collection(LineCollection(rays['image_rays'].reshape(-1, 2, 2), colors='blue', alpha=0.25))
+    ax_object.add_collection(LineCollection(rays['object_rays'].reshape(-1, 2, 2), colors='red', alpha=0.25))
+
+    ax_image.scatter(zi.ravel(), yi.ravel(), color='blue', label='Image')
+    ax_object.scatter(zo.ravel(), yo.ravel(), color='red', label='Object')
+
+    # rays intersecting the sensor
+    ccd_y = rays['ccd_y'].ravel()
+    ccd_y = ccd_y[(-ccd_h / 2 < ccd_y) & (ccd_y < ccd_h / 2)]
+    if len(ccd_y):
+        ax_image.scatter(np.full(len(ccd_y), ccd_z), ccd_y, marker='.', color='green', alpha=0.99,
+                         label=r'$Ray_{sensor}$')
@@ -0,0 +1,197 @@
+"""
+Sensor view of the pinhole camera page, computed in memory.
+
+The faux capture is composited, distorted, cropped and exposed as PIL images and
+numpy arrays end to end: no intermediate image is written to disk, so a slider
+move costs no PNG encode/decode and concurrent sessions cannot overwrite each
+other's files. Arrays that can be reused from one rerun to the next are kept in
+a per-session `buffers` dict (st.session_state in the app). The remap tables of the
+lens distortion only depend on the image size and the coefficients, so they are
+computed once and shared.
+"""
+
+from functools import lru_cache
+
+import cv2 as cv
+import numpy as np
+from PIL import Image, ImageFilter, ImageEnhance
+
+
+class DefocusPyramid:
+    """
+    Gaussian blurs of any radius served from area-downsampled copies of an image.
+    The copies (factors 1, 2, 4, ... max_factor) are made once. A blur of standard
+    deviation s is computed on the copy downsampled by the largest power of two
+    f <= s / 2, with a Gaussian reduced to account for the box averaging (variance
+    (f^2 - 1) / 12) and for the bilinear upsampling back to full size (variance
+    (f^2 - 1) / 6). Against an exact Gaussian of standard deviation s the error
+    stays below 3 grey levels (mean about 0.25) away from the image border, for
+    radii 1 to 64; PIL's GaussianBlur (box blur approximation) is within about 4.
+    The last cache_size results are kept, so returning to a radius is free.
+    """
+
+    def __init__(self, image, max_factor=32, cache_size=4):
+        self.mode = image.mode
+        array = np.asarray(image)
+        self.shape = array.shape[:2]
+        # pad to a multiple of the largest factor so that every level aligns exactly
+        pad = [(0, -n % max_factor) for n in self.shape] + [(0, 0)] * (array.ndim - 2)
+        padded = np.pad(array, pad, mode='edge')
+        self.padded_size = (padded.shape[1], padded.shape[0])
+        self.levels = {1: padded}
+        factor = 1
+        while factor < max_factor:
+            factor *= 2
+            size = (padded.shape[1] // factor, padded.shape[0] // factor)
+            self.levels[factor] = cv.resize(padded, size, interpolation=cv.INTER_AREA)
+        self._blur = lru_cache(maxsize=cache_size)(self._compute)
+
+    def _compute(self, radius):
+        factor = 1
+        while 2 * factor <= radius / 2 and 2 * factor in self.levels:
+            factor *= 2
+        level = self.levels[factor]
+        if factor == 1:
+            out = cv.GaussianBlur(level, (0, 0), radius, borderType=cv.BORDER_REPLICATE)
+        else:
+            variance = radius ** 2 - (factor ** 2 - 1) / 12 - (factor ** 2 - 1) / 6
+            sigma = np.sqrt(max(variance, 0)) / factor
+            blurred = cv.GaussianBlur(level.astype(np.float32), (0, 0), sigma, borderType=cv.BORDER_REPLICATE)
+            out = cv.resize(blurred, self.padded_size, interpolation=cv.INTER_LINEAR)
+            out = np.clip(np.rint(out, out=out), 0, 255).astype(np.uint8)
+        return Image.fromarray(out[:self.shape[0], :self.shape[1]], self.mode)
+
+    def blur(self, radius):
+        """
+        :param radius: standard deviation of the Gaussian (pixels), as for ImageFilter.GaussianBlur
+        :return: PIL image (shared with later calls for the same radius: treat as read-only)
+        """
+        if radius <= 0:
+            return Image.fromarray(self.levels[1][:self.shape[0], :self.shape[1]], self.mode)
+        return self._blur(float(radius))
+
+
+# id(image) -> (image, DefocusPyramid), for the few images the app blurs
+_pyramids = {}
+
+
+def defocus(image, radius):
+    """
+    Gaussian blur of `image` through its (cached) DefocusPyramid.
+    """
+    entry = _pyramids.get(id(image))
+    if entry is None or entry[0] is not image:
+        if len(_pyramids) >= 4:
+            _pyramids.pop(next(iter(_pyramids)))
+        entry = _pyramids[id(image)] = (image, DefocusPyramid(image))
+    return entry[1].blur(radius)
+
+
+# Helper function to simulate real-world camera capture
+def capture(background, subject, val, focus, exact_blur=False):
+    # Blur background/foreground to simulate a change in focus
+    # (exact_blur: PIL's blur of the full image instead of the cached pyramid)
+    if focus == 0:
+        background = background.filter(ImageFilter.GaussianBlur(radius=val)) if exact_blur else defocus(background, val)
+    else:
+        subject = subject.filter(ImageFilter.GaussianBlur(radius=val)) if exact_blur else defocus(subject, val)
+
+    # Convert images to RGBA
+    subj1 = subject.convert("RGBA")
+    bg1 = background.convert("RGBA")
+    # Center our gaucho image along the background
+    width = (bg1.width - subj1.width) // 2
+    height = (bg1.height - subj1.height) // 2
+    # Paste gaucho at the center
+    bg1.paste(subj1, (width, height), subj1)
+    # the merged ('faux capture') image
+    return bg1
+
+
+@lru_cache(maxsize=8)
+def distortion_maps(size, k_1=0.4, k_2=0.1, inverse=False):
+    """
+    Remap tables of the radial model, computed once per (size, k_1, k_2, inverse).
+    A pixel at normalized position p (centre 0, half size 1, radius r) samples the
+    capture at p * (1 + k_1 r + k_2 r^2). With inverse=True the tables undo that
+    mapping: p samples the distorted image at q, where q * (1 + k_1 |q| + k_2 |q|^2) = p.
+    :param size: (width, height) of the image
+    :return: map_x, map_y float32 arrays for cv.remap (read-only, shared)
+    """
+    width, height = size
+    x_c = width / 2
+    y_c = height / 2
+    x = (np.arange(width) - x_c) / x_c
+    y = (np.arange(height) - y_c) / y_c
+    x, y = np.meshgrid(x, y)
+    radius = np.sqrt(x ** 2 + y ** 2)
+
+    if inverse:
+        # solve rho * (1 + k_1 rho + k_2 rho^2) = r by Newton's method on a fine grid
+        # of radii, then interpolate: the inverse only depends on the radius
+        r = np.linspace(0, radius.max(), 4096)
+        rho = r.copy()
+        for _ in range(20):
+            step = (rho * (1 + k_1 * rho + k_2 * rho ** 2) - r) / (1 + 2 * k_1 * rho + 3 * k_2 * rho ** 2)
+            rho -= step
+            if np.abs(step).max() < 1e-9:
+                break
+        scale_r = np.ones_like(r)
+        scale_r[1:] = rho[1:] / r[1:]
+        scale = np.interp(radius, r, scale_r)
+    else:
+        scale = 1 + k_1 * radius + k_2 * radius ** 2
+
+    map_x = (x * scale * x_c + x_c).astype(np.float32)
+    map_y = (y * scale * y_c + y_c).astype(np.float32)
+    map_x.flags.writeable = False
+    map_y.flags.writeable = False
+    return map_x, map_y
+
+
+def radial_distortion(image, k_1=0.4, k_2=0.1, inverse=False, buffers=None):
+    """
+    Barrel distortion of an RGBA capture (or its correction, with inverse=True).
+    All channels are resampled in one bilinear cv.remap with cached tables.
+    :param image: PIL image (RGBA)
+    :param k_1, k_2: coefficients of the radial model 1 + k_1 r + k_2 r^2
+    :param inverse: undistort an image distorted with the same coefficients
+    :param buffers: per-session dict; the output array is reused across reruns
+    :return: PIL image (RGBA), backed by the buffer until the next call
+    """
+    map_x, map_y = distortion_maps(image.size, k_1, k_2, inverse)
+    image = np.asarray(image)
+    key = 'undistorted' if inverse else 'distorted'
+    buffers = {} if buffers is None else buffers
+    out = buffers.get(key)
+    if out is None or out.shape != image.shape:
+        out = buffers[key] = np.empty(image.shape, dtype=np.uint8)
+    cv.remap(image, map_x, map_y, cv.INTER_LINEAR, dst=out, borderMode=cv.BORDER_CONSTANT, borderValue=0)
+    return Image.fromarray(out, 'RGBA')
+
+
+def sensor_view(background, subject, aperture, focal_length, focus='Foreground', exposure=1.0, undistort=False,
+                buffers=None, exact_blur=False):
+    """
+    Image seen by the sensor for the pinhole camera page settings.
+    :param background, subject: PIL images (subject RGBA)
+    :param aperture: f-number
+    :param focal_length: focal length (mm); below 35 mm the lens distorts radially
+    :param focus: 'Foreground' or 'Background'
+    :param exposure: brightness factor
+    :param undistort: correct the lens distortion (inverse mapping) after applying it
+    :param buffers: per-session dict of reusable arrays
+    :param exact_blur: defocus with PIL's GaussianBlur instead of the cached DefocusPyramid
+    :return: PIL image
+    """
+    image = capture(background, subject, 65 - aperture, 0 if focus == 'Foreground' else 1, exact_blur)
+    width, height = image.size
+    # If we zoom in while keeping the aperture constant, the background becomes more blurred.
+
+    if focal_length < 35:
+        image = radial_distortion(image, 0.4, 0.1, buffers=buffers)
+        if undistort:
+            image = radial_distortion(image, 0.4, 0.1, inverse=True, buffers=buffers)
+
+    image = image.crop((2 * focal_length, 0, width - 2 * focal_length, height - np.floor(3 * focal_length / 2)))
+    return ImageEnhance.Brightness(image).enhance(exposure)
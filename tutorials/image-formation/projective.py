@@ -0,0 +1,124 @@
+"""
+Projective warps of the homography page, cached per slider position.
+
+The transform only depends on the camera angle, the zoom and the image size, so
+it is computed once per (phi, k, height, width). Warps are done by
+cv.warpPerspective (bilinear, black outside the image), first on a preview
+downsampled to `preview_size` pixels on its long side, which is what a slider drag
+redraws; the full resolution warp is only computed on demand. The last
+`cache_size` warps of each kind are kept, so going back to a slider position is
+free.
+"""
+
+from functools import lru_cache
+
+import cv2 as cv
+import numpy as np
+
+PREVIEW_SIZE = 320
+
+
+def camera_quads(phi, k, shape, b=0.5, scale_factor=1):
+    """
+    Corners of the image and where they go when the camera turns by `phi` and moves back by `k`.
+    :param phi: camera angle (degrees)
+    :param k: zoom out (positive) or in (negative)
+    :param shape: image shape (height, width, ...)
+    :param b: half width of the scene at the original camera position (fixed)
+    :param scale_factor: scale of the destination quad (optional)
+    :return: src, dst: (4, 2) arrays of (x, y) corners
+    """
+    height, width = shape[:2]
+    increment = ((k + b) / b) * np.tan((phi / 180) * 3.14)
+    l_side = np.sqrt(((k + b) / b) ** 2 + (k + b) ** 2) + increment
+    r_side = np.sqrt(((k + b) / b) ** 2 + (k + b) ** 2) - increment
+
+    origin_len = height / 2
+    origin_wid = width / 2
+    transform_l = (np.sqrt(1 + b ** 2) / l_side) * origin_len * scale_factor
+    transform_r = (np.sqrt(1 + b ** 2) / r_side) * origin_len * scale_factor
+    transform_wid = origin_wid * (b / (k + b)) * scale_factor
+
+    src = np.array([[0, 0], [0, height], [width, height], [width, 0]], dtype=np.float64)
+    dst = np.array([[origin_wid - transform_wid, origin_len - transform_l],
+                    [origin_wid - transform_wid, origin_len + transform_l],
+                    [origin_wid + transform_wid, origin_len + transform_r],
+                    [origin_wid + transform_wid, origin_len - transform_r]])
+    return src, dst
+
+
+@lru_cache(maxsize=1024)
+def projective_transform(phi, k, height, width):
+    """
+    :return: (3, 3) homography from image pixels to warped pixels (read-only)
+    """
+    src, dst = camera_quads(phi, k, (height, width))
+    matrix = cv.getPerspectiveTransform(src.astype(np.float32), dst.astype(np.float32))
+    matrix.setflags(write=False)
+    return matrix
+
+
+class HomographyWarp:
+    """
+    Warps of one image for the camera positions of the homography page.
+    The preview is warped from an area-downsampled copy of the image, with the
+    transform conjugated by the downsampling (pixel centers aligned), so that it is
+    the full resolution warp seen at the preview size.
+    """
+
+    def __init__(self, image, preview_size=PREVIEW_SIZE, cache_size=8):
+        self.image = np.ascontiguousarray(np.asarray(image))
+        self.shape = self.image.shape[:2]
+        height, width = self.shape
+        scale = min(1.0, preview_size / max(height, width))
+        self.preview_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        self.preview_image = cv.resize(self.image, self.preview_size, interpolation=cv.INTER_AREA)
+        s_x, s_y = width / self.preview_size[0], height / self.preview_size[1]
+        # preview pixel -> image pixel
+        self._to_image = np.array([[s_x, 0, (s_x - 1) / 2], [0, s_y, (s_y - 1) / 2], [0, 0, 1]])
+        self._preview = lru_cache(maxsize=cache_size)(self._warp_preview)
+        self._full = lru_cache(maxsize=cache_size)(self._warp_full)
+
+    def matrix(self, phi, k):
+        return projective_transform(phi, k, *self.shape)
+
+    def _warp(self, image, matrix, size):
+        out = cv.warpPerspective(image, matrix, size, flags=cv.INTER_LINEAR, borderMode=cv.BORDER_CONSTANT,
+                                 borderValue=0)
+        out.setflags(write=False)
+        return out
+
+    def _warp_preview(self, phi, k):
+        matrix = np.linalg.solve(self._to_image, self.matrix(phi, k) @ self._to_image)
+        return self._warp(self.preview_image, matrix, self.preview_size)
+
+    def _warp_full(self, phi, k):
+        return self._warp(self.image, self.matrix(phi, k), self.shape[::-1])
+
+    def preview(self, phi, k):
+        """
+        :return: warped preview (read-only array, preview size)
+        """
+        return self._preview(phi, k)
+
+    def full(self, phi, k):
+        """
+        :return: warped image (read-only array, image size)
+        """
+        return self._full(phi, k)
+
+
+# id(image) -> (image, HomographyWarp), for the few images the app warps
+_warps = {}
+
+
+def homography_warp(image):
+    """
+    The (cached) HomographyWarp of `image`.
+    """
+    entry = _warps.get(id(image))
+    if entry is None or entry[0] is not image:
+        if len(_warps) >= 4:
+            _warps.pop(next(iter(_warps)))
+        entry = _warps[id(image)] = (image, HomographyWarp(image))
+    return entry[1]
@@ -0,0 +1,206 @@
+"""
+Synthetic calibration datasets: batches of chessboard views with known camera.
+
+Views are rendered by inverse mapping, in batches. The pixel grid is undistorted
+once (the lens is shared by all views), giving one viewing ray per pixel; the
+inverse homographies [r_1, r_2, t]^-1 of all views (composed with the texture
+scale) are computed at once, and each view then maps the ray grid onto the board
+texture in two C passes (cv.perspectiveTransform, then a bilinear cv.remap into
+a preallocated stack), with no per-pixel Python work nor large temporaries.
+Poses are random but true perspective (the board is tilted up to `max_tilt`
+degrees about both axes), the whole board is kept inside the image, and the
+views are blurred and made noisy.
+
+A dataset is a directory of compressed stacks (stack_000.npz, ... holding
+`images`, (views, height, width) uint16) and a dataset.json sidecar with the
+ground truth: intrinsic matrix, distortion, pose and projected inner corners of
+every view.
+"""
+
+import json
+import os
+from os import path
+
+import cv2 as cv
+import numpy as np
+
+import calibration
+
+DEFAULT_A = [[800., 0., 320.], [0., 800., 240.], [0., 0., 1.]]
+DEFAULT_DISTORTION = (-0.2, 0.08, 0.0, 0.0, 0.0)
+BLACK, WHITE, BACKGROUND = 0.1, 0.9, 0.5
+# batches of random poses drawn before giving up on fitting the board in the image
+MAX_POSE_BATCHES = 100
+
+
+def object_points(pattern_dim=(9, 6), square=30.0):
+    """
+    Inner corners of the chessboard on its plane (Z = 0), in the order of cv.findChessboardCorners.
+    :param pattern_dim: (columns, rows) of inner corners
+    :param square: side of a square (e.g. mm)
+    :return: (N, 2) array
+    """
+    return np.indices(pattern_dim).T.reshape(-1, 2).astype(np.float64) * square
+
+
+def chessboard_texture(pattern_dim=(9, 6), pixels_per_square=32):
+    """
+    The board: (columns + 1) x (rows + 1) squares, inside a white margin of one square.
+    :return: 2D float32 array; texture pixel (i, j) covers the board point
+        ((j + 0.5) / pixels_per_square - 2, (i + 0.5) / pixels_per_square - 2), in squares
+    """
+    columns, rows = pattern_dim[0] + 3, pattern_dim[1] + 3
+    squares = np.indices((rows, columns)).sum(axis=0) % 2 == 0
+    texture = np.where(squares, BLACK, WHITE).astype(np.float32)
+    texture[[0, -1], :] = WHITE
+    texture[:, [0, -1]] = WHITE
+    return np.kron(texture, np.ones((pixels_per_square, pixels_per_square), dtype=np.float32))
+
+
+def random_poses(views, A, image_size, pattern_dim=(9, 6), square=30.0, max_tilt=40.0, distance=(1.5, 3.0),
+                 margin=10, rng=None, max_batches=MAX_POSE_BATCHES):
+    """
+    Random poses of the chessboard with the whole board (margin included) inside the image.
+    :param A: (3, 3) intrinsic matrix
+    :param image_size: (width, height)
+    :param max_tilt: largest rotation (degrees) about the x and y axes; about the optical axis: any
+    :param distance: range of the board distance, in board widths times the focal length in pixels / width
+    :param margin: pixels kept free at the image border
+    :param max_batches: batches of poses drawn before raising ValueError (the board may not fit in the image)
+    :return: rvecs, tvecs: (views, 3) arrays
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    A = np.asarray(A, dtype=np.float64)
+    corners = np.array([[-2, -2], [pattern_dim[0] + 1, -2], [pattern_dim[0] + 1, pattern_dim[1] + 1],
+                        [-2, pattern_dim[1] + 1]], dtype=np.float64) * square
+    center = (np.array(pattern_dim, dtype=np.float64) - 1) / 2 * square
+    width = (pattern_dim[0] + 3) * square
+    rvecs, tvecs = np.empty((0, 3)), np.empty((0, 3))
+    for _ in range(max_batches):
+        if len(rvecs) >= views:
+            break
+        # draw a batch, keep the poses that fit in the image
+        n = 2 * (views - len(rvecs)) + 8
+        tilt = np.radians(rng.uniform(-max_tilt, max_tilt, (n, 2)))
+        spin = rng.uniform(-np.pi, np.pi, n)
+        R = np.matmul(calibration.rotation_matrices(np.column_stack([tilt, np.zeros(n)])),
+                      calibration.rotation_matrices(np.column_stack([np.zeros((n, 2)), spin])))
+        z = rng.uniform(*distance, n) * width * A[0, 0] / image_size[0]
+        offset = rng.uniform(-0.25, 0.25, (n, 2)) * z[:, None] * np.array(image_size) / A[[0, 1], [0, 1]]
+        t = np.column_stack([offset, z]) - np.matmul(R[:, :, :2], center)
+        r = calibration.rotation_vectors(R)
+        projected = calibration.project_points(corners, A, np.zeros(5), r, t)
+        inside = np.all((projected >= margin) & (projected <= np.array(image_size) - 1 - margin), axis=(1, 2))
+        rvecs, tvecs = np.concatenate([rvecs, r[inside]]), np.concatenate([tvecs, t[inside]])
+    if len(rvecs) < views:
+        raise ValueError("[error] only {} of {} poses keep the board inside the {}x{} image after {} batches"
+                         .format(len(rvecs), views, *image_size, max_batches))
+    return rvecs[:views], tvecs[:views]
+
+
+def undistorted_rays(A, distortion, image_size, iterations=20):
+    """
+    Normalized coordinates (x, y) of the undistorted viewing ray of every pixel (fixed point iteration,
+    as cv.undistortPoints).
+    :return: (height, width, 2) float32 array
+    """
+    A = np.asarray(A, dtype=np.float64)
+    k_1, k_2, p_1, p_2, k_3 = distortion
+    u, v = np.meshgrid(np.arange(image_size[0], dtype=np.float64), np.arange(image_size[1], dtype=np.float64))
+    y_d = (v - A[1, 2]) / A[1, 1]
+    x_d = (u - A[0, 2] - A[0, 1] * y_d) / A[0, 0]
+    x, y = x_d.copy(), y_d.copy()
+    for _ in range(iterations):
+        r2 = x ** 2 + y ** 2
+        radial = 1 + r2 * (k_1 + r2 * (k_2 + r2 * k_3))
+        x = (x_d - 2 * p_1 * x * y - p_2 * (r2 + 2 * x ** 2)) / radial
+        y = (y_d - p_1 * (r2 + 2 * y ** 2) - 2 * p_2 * x * y) / radial
+    return np.dstack([x, y]).astype(np.float32)
+
+
+def render_views(A, distortion, rvecs, tvecs, image_size, pattern_dim=(9, 6), square=30.0, blur=1.0, noise=0.01,
+                 pixels_per_square=32, rng=None, rays=None):
+    """
+    Images of the chessboard seen in the given poses.
+    :param A, distortion: camera
+    :param rvecs, tvecs: (views, 3) poses
+    :param image_size: (width, height)
+    :param blur: standard deviation (pixels) of the Gaussian blur (optics, focus)
+    :param noise: standard deviation of the Gaussian noise, in fractions of the full scale
+    :param rays: undistorted_rays of the camera, to reuse them between batches
+    :return: (views, height, width) uint16 array
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    rays = undistorted_rays(A, distortion, image_size) if rays is None else rays
+    texture = chessboard_texture(pattern_dim, pixels_per_square)
+    R = calibration.rotation_matrices(rvecs)
+    # board plane -> normalized image: [r_1, r_2, t]; its inverse maps the rays onto the board,
+    # then to texture pixels (in squares, with the margin of two squares)
+    homographies = np.concatenate([R[:, :, :2], np.asarray(tvecs, dtype=np.float64)[:, :, None]], axis=2)
+    scale = pixels_per_square / square
+    to_texture = np.array([[scale, 0, 2 * pixels_per_square - 0.5], [0, scale, 2 * pixels_per_square - 0.5],
+                           [0, 0, 1]])
+    mappings = np.matmul(to_texture, np.linalg.inv(homographies))
+    # the rays of the image border must all meet the board plane in front of the camera
+    border = np.concatenate([rays[0], rays[-1], rays[:, 0], rays[:, -1]])
+    if np.any(np.matmul(border, mappings[:, 2, :2].T) + mappings[:, 2, 2] <= 0):
+        raise AssertionError("[error] the horizon of the chessboard plane is inside the image")
+
+    images = np.empty((len(R), image_size[1], image_size[0]), dtype=np.float32)
+    maps = np.empty(rays.shape, dtype=np.float32)
+    for image, mapping in zip(images, mappings):
+        # one perspective division and one bilinear lookup per pixel, in C
+        cv.perspectiveTransform(rays, mapping, dst=maps)
+        cv.remap(texture, maps, None, cv.INTER_LINEAR, dst=image, borderMode=cv.BORDER_CONSTANT,
+                 borderValue=BACKGROUND)
+        if blur > 0:
+            cv.GaussianBlur(image, (0, 0), blur, dst=image, borderType=cv.BORDER_REPLICATE)
+    if noise > 0:
+        images += noise * rng.standard_normal(images.shape, dtype=np.float32)
+    return np.clip(np.rint(images * 65535), 0, 65535).astype(np.uint16)
+
+
+def generate_dataset(directory, views, A=DEFAULT_A, distortion=DEFAULT_DISTORTION, image_size=(640, 480),
+                     pattern_dim=(9, 6), square=30.0, blur=1.0, noise=0.01, max_tilt=40.0, batch=16, seed=0):
+    """
+    Render `views` random views in batches and write them as compressed stacks with a ground truth sidecar.
+    :param directory: output directory (created if needed)
+    :param batch: views per stack (bounds the memory used)
+    :param seed: seed of the poses and the noise
+    :return: path of the dataset.json sidecar
+    """
+    rng = np.random.default_rng(seed)
+    A = np.asarray(A, dtype=np.float64)
+    rvecs, tvecs = random_poses(views, A, image_size, pattern_dim, square, max_tilt, rng=rng)
+    rays = undistorted_rays(A, distortion, image_size)
+    os.makedirs(directory, exist_ok=True)
+    stacks = []
+    for start in range(0, views, batch):
+        images = render_views(A, distortion, rvecs[start:start + batch], tvecs[start:start + batch], image_size,
+                              pattern_dim, square, blur, noise, rng=rng, rays=rays)
+        stacks.append('stack_{:03d}.npz'.format(start // batch))
+        np.savez_compressed(path.join(directory, stacks[-1]), images=images)
+
+    corners = calibration.project_points(object_points(pattern_dim, square), A, distortion, rvecs, tvecs)
+    sidecar = {
+        'image_size': list(image_size), 'pattern_dim': list(pattern_dim), 'square': square,
+        'blur': blur, 'noise': noise, 'max_tilt': max_tilt, 'seed': seed, 'stacks': stacks,
+        'A': A.tolist(), 'distortion': list(distortion),
+        'rvecs': rvecs.tolist(), 'tvecs': tvecs.tolist(), 'corners': corners.tolist(),
+    }
+    file = path.join(directory, 'dataset.json')
+    with open(file, 'w') as f:
+        json.dump(sidecar, f)
+    return file
+
+
+def load_dataset(directory):
+    """
+    :return: images (views, height, width) uint16, ground truth dict of dataset.json (arrays as numpy arrays)
+    """
+    with open(path.join(directory, 'dataset.json')) as f:
+        truth = json.load(f)
+    for key in ('A', 'distortion', 'rvecs', 'tvecs', 'corners'):
+        truth[key] = np.asarray(truth[key])
+    images = np.concatenate([np.load(path.join(directory, stack))['images'] for stack in truth['stacks']])
+    return images, truth
@@ -0,0 +1,164 @@
+"""
+Convolution kernels shared by the Convolution, Image Operators and Pyramids tutorials.
+
+Every kernel is built from 1-D vectors (outer products, or a sum of two for the
+Laplacian of Gaussian) in float64, normalized, then cast to the requested type:
+smoothing kernels (Gaussian, box, binomial) sum to one, derivative kernels (LoG,
+DoG, Sobel of any order) sum to zero. Kernels are kept in one LRU cache keyed by
+(type, size, sigma, dtype, other parameters), so a rerun of a page with the same
+sliders does not rebuild them. The cached arrays are shared: they are read-only.
+
+The tutorials import this module by adding the `tutorials` directory to sys.path.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+CACHE_SIZE = 256
+
+
+def _centered(size):
+    return np.arange(size, dtype=np.float64) - (size - 1) / 2
+
+
+def _check(size, sigma=None):
+    if int(size) != size or size < 1:
+        raise ValueError("[error] kernel size wrong: {}".format(size))
+    if sigma is not None and not sigma > 0:
+        raise ValueError("[error] kernel sigma wrong: {}".format(sigma))
+
+
+def _gaussian_1d(size, sigma):
+    g = np.exp(-_centered(size) ** 2 / (2 * sigma ** 2))
+    return g / g.sum()
+
+
+def _binomial_1d(size):
+    # row of Pascal's triangle
+    b = np.ones(1)
+    for _ in range(size - 1):
+        b = np.convolve(b, [1.0, 1.0])
+    return b
+
+
+def _derivative_1d(size, order, normalize):
+    # binomial smoothing differenced `order` times, as cv2.getDerivKernels
+    if not 0 <= order < size:
+        raise ValueError("[error] derivative order wrong: {} (kernel size {})".format(order, size))
+    d = _binomial_1d(size - order)
+    for _ in range(order):
+        d = np.convolve(d, [-1.0, 1.0])
+    return d / 2 ** (size - order - 1) if normalize else d
+
+
+def _log(size, sigma):
+    x = _centered(size)
+    g = _gaussian_1d(size, sigma)
+    g2 = (x ** 2 / sigma ** 4 - 1 / sigma ** 2) * g
+    kernel = np.outer(g2, g) + np.outer(g, g2)
+    return kernel - kernel.mean()
+
+
+_BUILDERS = {
+    'gaussian_1d': lambda size, sigma: _gaussian_1d(size, sigma),
+    'box_1d': lambda size, sigma: np.full(size, 1 / size),
+    'binomial_1d': lambda size, sigma: _binomial_1d(size) / 2 ** (size - 1),
+    'gaussian': lambda size, sigma: np.outer(_gaussian_1d(size, sigma), _gaussian_1d(size, sigma)),
+    'box': lambda size, sigma: np.outer(np.ones(size), np.ones(size)) / size ** 2,
+    'binomial': lambda size, sigma: np.outer(_binomial_1d(size), _binomial_1d(size)) / 4 ** (size - 1),
+    'log': _log,
+    'dog': lambda size, sigma, ratio: (np.outer(_gaussian_1d(size, ratio * sigma), _gaussian_1d(size, ratio * sigma))
+                                       - np.outer(_gaussian_1d(size, sigma), _gaussian_1d(size, sigma))),
+    'sobel': lambda size, sigma, dx, dy, normalize: np.outer(_derivative_1d(size, dy, normalize),
+                                                             _derivative_1d(size, dx, normalize)),
+}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _kernel(kind, size, sigma, dtype, *params):
+    kernel = _BUILDERS[kind](size, sigma, *params).astype(dtype)
+    kernel.setflags(write=False)
+    return kernel
+
+
+def _cached(kind, size, sigma, dtype, *params):
+    _check(size, sigma)
+    return _kernel(kind, int(size), None if sigma is None else float(sigma), np.dtype(dtype), *params)
+
+
+def cache_info():
+    """
+    :return: hits, misses, maxsize and currsize of the kernel cache
+    """
+    return _kernel.cache_info()
+
+
+def gaussian_1d(size, sigma, dtype=np.float64):
+    """
+    :return: (size,) sampled Gaussian of standard deviation sigma, sum 1
+    """
+    return _cached('gaussian_1d', size, sigma, dtype)
+
+
+def box_1d(size, dtype=np.float64):
+    """
+    :return: (size,) moving average, sum 1
+    """
+    return _cached('box_1d', size, None, dtype)
+
+
+def binomial_1d(size, dtype=np.float64):
+    """
+    :return: (size,) binomial coefficients (e.g. [1, 4, 6, 4, 1] / 16), sum 1
+    """
+    return _cached('binomial_1d', size, None, dtype)
+
+
+def gaussian(size, sigma, dtype=np.float64):
+    """
+    :return: (size, size) Gaussian, outer product of gaussian_1d, sum 1
+    """
+    return _cached('gaussian', size, sigma, dtype)
+
+
+def box(size, dtype=np.float64):
+    """
+    :return: (size, size) moving average, sum 1
+    """
+    return _cached('box', size, None, dtype)
+
+
+def binomial(size, dtype=np.float64):
+    """
+    :return: (size, size) binomial kernel, outer product of binomial_1d, sum 1
+    """
+    return _cached('binomial', size, None, dtype)
+
+
+def log(size, sigma, dtype=np.float64):
+    """
+    :return: (size, size) Laplacian of Gaussian (negative center), sum 0
+    """
+    return _cached('log', size, sigma, dtype)
+
+
+def dog(size, sigma, ratio=1.6, dtype=np.float64):
+    """
+    Difference of Gaussians G(ratio * sigma) - G(sigma), approximating (ratio - 1) sigma^2 times the LoG.
+    :return: (size, size) kernel, sum 0
+    """
+    return _cached('dog', size, sigma, dtype, float(ratio))
+
+
+def sobel(dx, dy, size=3, normalize=True, dtype=np.float64):
+    """
+    Sobel kernel of derivative orders dx (along columns) and dy (along rows), as cv2.getDerivKernels.
+    :param size: odd kernel size, larger than the orders
+    :param normalize: scale the binomial vectors to a unit sum of absolute values (False: integer kernel,
+        e.g. [[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]] for dx=1, dy=0, size=3)
+    :return: (size, size) kernel, outer product of the vectors of the two orders
+    """
+    if size % 2 == 0:
+        raise ValueError("[error] Sobel kernel size must be odd: {}".format(size))
+    return _cached('sobel', size, None, dtype, int(dx), int(dy), bool(normalize))
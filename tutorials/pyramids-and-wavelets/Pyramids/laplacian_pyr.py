@@ -4,6 +4,12 @@ import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 import math
+import sys
+from os import path
+
+# kernels shared with the other tutorials
+sys.path.insert(0, path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
+import kernels
 
 def gaussian_pyr(img, levels):
     output = np.zeros((img.shape[0], img.shape[1] + int(img.shape[1]/2), img.shape[2]))
@@ -45,7 +51,7 @@ def laplacian_pyr(img, levels):
 
 # bluring with binomial kernel
 def blur(img):
-    binomial_kernel = np.array([0.0625, 0.25, 0.375, 0.25, 0.0625])
+    binomial_kernel = kernels.binomial_1d(5)
     partial = cv2.filter2D(img, -1, binomial_kernel)
     return cv2.filter2D(partial, -1, binomial_kernel.reshape((5, 1)))
 